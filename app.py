@@ -1,13 +1,32 @@
+import os
+import uuid
 import streamlit as st
 import pandas as pd
-from core.data_loader import load_screaming_frog, load_gsc, merge_data
-from core.processing import compute_centroid
-from core.projection import reduce_umap, centre_on_centroid
-from ui.visuals import plot_radial_topical_map
-from utils.logger import log
-import time
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from core.data_loader import (
+    load_screaming_frog_chunked, load_gsc, merge_data, crawl_rows, detect_sf_columns, read_header,
+    SF_METRIC_COLUMNS, INPUT_EXTENSIONS,
+)
+from core.cache import DatasetCache, cache_key, file_digest
+from core.history import DriftHistory
+from core.metrics import PageMetrics
+from core.link_graph import load_inlinks_graph, add_link_authority
+from core.neighbours import NeighbourIndex, topk_pairs
+from core.pipeline import StageCache, STAGE_WORKERS
+from core.registry import DatasetRegistry, owned_bytes
+from core.warmup import WARM_UP, start_warm_up, warm_up_status
+from core.processing import centroid_basis, reweight, add_zones
+from core.quantize import PRECISIONS, quantize_dataset, quantization_report
+from core.projection import centre_on_centroid, PROJECTION_BACKENDS
+from core.radial_layout import compute_radial_layout
+from core.projection_store import ProjectionStore, site_id, embedding_fingerprint, embedding_hashes
+from ui.visuals import radial_controls, build_radial_chart, show_radial_chart
+from ui.layout import sidebar, cache_panel, memory_panel, projection_backend, embedding_precision, diagnostics_panel
+from utils.instrument import start_profile, stop_profile
+from utils.logger import set_log_sink
 
 st.set_page_config(page_title="Semantic Drift Analyser", layout="wide")
+set_log_sink(st.text)
 st.title("🧭 Semantic Drift Analyser")
 st.markdown(
     "*Visualise how your content drifts from your site's core topics*\n\n"
@@ -15,62 +34,260 @@ st.markdown(
 )
 
 
+@st.cache_resource
+def get_dataset_cache():
+    return DatasetCache()
+
+
+@st.cache_resource
+def get_projection_store():
+    return ProjectionStore()
+
+
+@st.cache_resource
+def get_registry():
+    # One per server process: every browser session shares its datasets
+    return DatasetRegistry(get_dataset_cache())
+
+
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else st.session_state.setdefault("session_id", str(uuid.uuid4()))
+
+
+# UMAP's numba kernels compile in the background while files are being chosen
+if WARM_UP:
+    start_warm_up()
+
+cache = get_dataset_cache()
+registry = get_registry()
+session = session_id()
+registry.touch(session)
+cache_panel(cache)
+profile_run, sequential_run = diagnostics_panel(warm_up_status())
+
+
 # --- File upload in collapsible section ---
+# CSV, or Parquet / Arrow IPC with the embeddings as a list-of-floats column
+UPLOAD_TYPES = [ext.lstrip(".") for ext in INPUT_EXTENSIONS]
 with st.expander("📁 Upload Data", expanded=True):
     col1, col2 = st.columns(2)
     with col1:
-        sf_file = st.file_uploader("Screaming Frog export (with embeddings)", type=["csv"])
+        sf_file = st.file_uploader("Screaming Frog export (with embeddings)", type=UPLOAD_TYPES)
     with col2:
-        gsc_file = st.file_uploader("Search Console data", type=["csv"])
+        gsc_file = st.file_uploader("Search Console data", type=UPLOAD_TYPES)
+    inlinks_file = st.file_uploader(
+        "Screaming Frog \"All Inlinks\" export (optional — link authority from the internal link graph)",
+        type=["csv"],
+    )
+
+    # Only URL, embedding and link metrics are loaded unless more are opted into
+    extra_columns = []
+    if sf_file:
+        sf_header = read_header(sf_file)
+        embed_col = detect_sf_columns(sf_header)[1]
+        optional = [
+            c for c in sf_header
+            if c not in SF_METRIC_COLUMNS
+            and c.lower().strip() not in ["address", "url"]
+            and "embedding" not in c.lower()
+        ]
+        extra_columns = st.multiselect("Extra crawl columns to keep", optional)
+    fold_urls = st.checkbox("Treat www/non-www and http/https URLs as the same page", value=False)
 
 if sf_file and gsc_file:
-    # Create a placeholder for status messages
-    status_container = st.empty()
-    
-    # Process data with status updates
-    with status_container.container():
-        with st.status("Processing...", expanded=True) as status:
+    # Each stage is memoised on its real inputs, so visual controls only
+    # re-run the presentation stage and weight changes skip load/UMAP
+    stages = st.session_state.setdefault("stages", StageCache())
+    # cProfile only sees the main thread, so profiled runs execute stages inline
+    stages.start_run(workers=1 if profile_run or sequential_run else STAGE_WORKERS)
+    profiler = start_profile() if profile_run else None
+    weights = sidebar()
+    projection_params = {
+        "backend": projection_backend(PROJECTION_BACKENDS),
+        "n_neighbors": 15, "min_dist": 0.1, "metric": "cosine",
+    }
+    precision = embedding_precision(PRECISIONS)
+
+    with st.status("Processing...", expanded=True) as status:
+
+        # Stages after "load" run on worker threads and report through stages.note
+        def load_stage():
             st.write("Loading files...")
-            sf_df = load_screaming_frog(sf_file)
-            gsc_df = load_gsc(gsc_file)
-            df = merge_data(sf_df, gsc_df)
-            # st.write("DF columns BEFORE processing:", df.columns.tolist())   # ← ADD THIS
-            
-            st.write("Computing drift metrics...")
-            centroid, df = compute_centroid(df)
-            
-            st.write("Mapping semantic space...")
-            df, reducer = reduce_umap(df)
-            df, centroid_coords = centre_on_centroid(df, centroid, reducer)
-            
-            status.update(label="Complete!", state="complete")
-    
-    # Clear the status after a short delay
-    time.sleep(1)
-    status_container.empty()
+            sf_digest, gsc_digest = file_digest(sf_file), file_digest(gsc_file)
+            loader_opts = {"extra_columns": sorted(extra_columns)}
+            merged_key = cache_key(sf_digest, gsc_digest, stage="merged", fold_urls=fold_urls, **loader_opts)
+            # Another session may already hold this upload: its matrix is shared, not reloaded
+            merged, shared = registry.acquire(session, "merged", merged_key, lambda: cache.get(merged_key),
+                                              label=f"merged: {sf_file.name} + {gsc_file.name}")
+            st.write(
+                "🧠 Merged dataset: shared with another session" if shared
+                else f"🗄️ Merged dataset: cache {'hit' if merged is not None else 'miss'}"
+            )
+            return {"merged_key": merged_key, "merged": merged,
+                    "crawl_key": cache_key(sf_digest, stage="crawl", **loader_opts)}
+
+        def crawl_stage():
+            if cached is not None:
+                return None
+            outcome = "shared with another session"
+
+            def load():
+                nonlocal outcome
+                sf, crawl_hit = cache.get_or_compute(
+                    loaded["crawl_key"],
+                    lambda: load_screaming_frog_chunked(sf_file, extra_columns=extra_columns),
+                    label=f"crawl: {sf_file.name}",
+                )
+                outcome = f"cache {'hit' if crawl_hit else 'miss'}"
+                return sf
+
+            sf, _ = registry.acquire(session, "crawl", loaded["crawl_key"], load, label=f"crawl: {sf_file.name}")
+            stages.note(f"{'🗄️' if outcome.startswith('cache') else '🧠'} Crawl: {outcome}")
+            return sf
+
+        def gsc_stage():
+            return None if cached is not None else load_gsc(gsc_file)
+
+        def merge_stage(sf, gsc):
+            if cached is not None:
+                return cached
+            # Registering it writes it to the cache and swaps in the memory-mapped copy
+            merged, _ = registry.acquire(
+                session, "merged", merged_key,
+                lambda: merge_data(sf, gsc, fold_www=fold_urls, fold_protocol=fold_urls),
+                label=f"merged: {sf_file.name} + {gsc_file.name}",
+            )
+            # The merged dataset is what this session reads from now on
+            registry.release(session, "crawl")
+            return merged
+
+        def links_stage(merged):
+            stages.note("Scoring internal link graph...")
+            adjacency, link_stats = load_inlinks_graph(inlinks_file, merged.meta["Address"])
+            inlinks_file.seek(0)
+            stages.note(
+                f"🔗 {link_stats['rows']:,} link rows → {link_stats['edges']:,} page-to-page edges "
+                f"({link_stats['unmatched']:,} to/from URLs outside the crawl)"
+            )
+            linked = add_link_authority(merged.copy(), adjacency)
+            return linked.meta[["PageRank", "Internal Inlinks", "Internal Outlinks", "Link Authority"]]
+
+        def quantize_stage(merged):
+            stages.note(f"Quantizing embeddings ({precision})...")
+            return quantize_dataset(merged, precision)
+
+        def with_links(ds, link_scores):
+            ds = ds.copy()
+            if link_scores is not None:
+                for col in link_scores.columns:
+                    ds.meta[col] = link_scores[col].to_numpy()
+            return ds
+
+        def basis_stage(merged, quantized, link_scores=None):
+            # The only pass over the embeddings; every weight change after this is O(pages)
+            stages.note("Precomputing centroid statistics...")
+            ds = with_links(quantized, link_scores)
+            full_basis = centroid_basis(with_links(merged, link_scores), link_col) if ds.quantized else None
+            return ds, centroid_basis(ds, link_col), full_basis
+
+        def metrics_stage(merged, basis_ds, link_scores=None):
+            stages.note("Computing drift metrics...")
+            ds, basis, full_basis = basis_ds
+            if full_basis is None:
+                return reweight(ds.copy(), basis, **weights, link_col=link_col), None
+            report = quantization_report(with_links(merged, link_scores), ds, **weights, link_col=link_col,
+                                         bases=(full_basis, basis))
+            stages.note(
+                f"🗜️ {precision} embeddings: {report['bytes'] / 1e6:.1f} MB vs {report['full_bytes'] / 1e6:.1f} MB · "
+                f"max distance error {report['max_distance_error']:.1e} · "
+                f"{len(report['zone_changes'])} pages change zone vs float32"
+            )
+            return reweight(ds.copy(), basis, **weights, link_col=link_col), report
+
+        def projection_stage(sf):
+            # Needs only the crawl: the pages merge_data keeps, in its order, so UMAP
+            # runs while the GSC file is parsed and merged
+            stages.note("Mapping semantic space...")
+            pages = cached.copy() if cached is not None else sf.take(crawl_rows(sf.meta))
+            projected, reducer, report = projection_store.project(
+                pages,
+                site=site_id(pages.meta["Address"]),
+                fingerprint=embedding_fingerprint(embed_col, pages.dim),
+                **projection_params,
+            )
+            quality = f", kNN recall {report['knn_recall']:.2f}" if "knn_recall" in report else ""
+            stages.note(
+                f"🗺️ {report['backend']} {report['mode']} ({report['reason']}) in {report['seconds']:.1f}s{quality}: "
+                f"{report['transformed']} pages transformed, {report['reused']} reused"
+            )
+            return projected.meta[["x", "y"]], reducer
+
+        def layout_stage(metrics, projection):
+            # From here on only page metadata is needed — embeddings stay out of the chart/export
+            (centroid, metrics_ds), _ = metrics
+            coords, reducer = projection
+            ds = metrics_ds.copy()
+            ds.meta["x"], ds.meta["y"] = coords["x"].to_numpy(), coords["y"].to_numpy()
+            ds, centroid_coords = centre_on_centroid(ds, centroid, reducer)
+            # Angles, overlap relaxation and zones are computed once here; chart controls only restyle
+            return compute_radial_layout(add_zones(ds.meta))
+
+        upload_key = (sf_file.file_id, gsc_file.file_id, tuple(sorted(extra_columns)), fold_urls)
+        loaded = stages.run("load", upload_key, load_stage)
+        merged_key, cached = loaded["merged_key"], loaded["merged"]
+        projection_store = get_projection_store()
+
+        # Each stage starts once the stages it reads finish: the two uploads parse
+        # concurrently, and UMAP overlaps the GSC merge, link scoring and metrics
+        crawl_f = stages.submit("load_crawl", merged_key, crawl_stage)
+        gsc_f = stages.submit("load_gsc", merged_key, gsc_stage)
+        merge_f = stages.submit("merge", merged_key, merge_stage, after=(crawl_f, gsc_f))
+        projection_key = (merged_key, tuple(projection_params.items()))
+        projection_f = stages.submit("projection", projection_key, projection_stage, after=(crawl_f,))
+
+        # With an inlinks export, PageRank-based authority replaces raw Inlinks in SDI and weights
+        link_col, links_key, links_after = "Inlinks", None, ()
+        if inlinks_file:
+            link_col, links_key = "Link Authority", (merged_key, inlinks_file.file_id)
+            links_after = (stages.submit("links", links_key, links_stage, after=(merge_f,)),)
+
+        quantize_f = stages.submit("quantize", (merged_key, precision), quantize_stage, after=(merge_f,))
+        basis_key = (merged_key, links_key, precision)
+        basis_f = stages.submit("basis", basis_key, basis_stage, after=(merge_f, quantize_f) + links_after)
+        metrics_key = (basis_key, tuple(weights.items()))
+        metrics_f = stages.submit("metrics", metrics_key, metrics_stage, after=(merge_f, basis_f) + links_after)
+        layout_key = (metrics_key, projection_key)
+        layout_f = stages.submit("layout", layout_key, layout_stage, after=(metrics_f, projection_f))
+
+        elapsed = stages.wait(st.write)
+        merged = merge_f.result()
+        (centroid, _), quantization = metrics_f.result()
+        df = layout_f.result()
+        if stages.recomputed():
+            st.write(
+                f"⏱️ {elapsed:.1f}s end-to-end with {stages.workers} worker(s) · "
+                f"{stages.stage_seconds():.1f}s of stage time (the sequential path)"
+            )
+
+        status.update(
+            label="Complete!" if stages.recomputed() else "Complete (all data stages reused)",
+            state="complete",
+            expanded=False,
+        )
 
     # --- Plot ---
-    plot_radial_topical_map(df)
+    controls = radial_controls()
+    chart = stages.run(
+        "presentation",
+        (layout_key, tuple(controls.items())),
+        lambda: build_radial_chart(df, **controls),
+    )
+    show_radial_chart(chart)
 
     # --- Zone distribution metrics ---
     st.subheader("📊 Distribution")
-    
-    # Calculate zones
-    max_dist = df["distance_from_centre"].max()
-    df["normalized_distance"] = df["distance_from_centre"] / max_dist
-    
-    def assign_zone(norm_dist):
-        if norm_dist <= 0.25:
-            return "Core"
-        elif norm_dist <= 0.5:
-            return "Focus"
-        elif norm_dist <= 0.75:
-            return "Expansion"
-        else:
-            return "Peripheral"
-    
-    df["zone"] = df["normalized_distance"].apply(assign_zone)
-    
+
     # Calculate distribution
     zone_distribution = df["zone"].value_counts()
     zone_percentages = (zone_distribution / len(df) * 100).round(1)
@@ -93,13 +310,124 @@ if sf_file and gsc_file:
         top_drift["Drift"] = top_drift["Drift"].round(2)
         st.dataframe(top_drift, use_container_width=True, hide_index=True)
 
+    # --- Derived page metrics (computed only when selected) ---
+    page_metrics = stages.run("page_metrics", (layout_key, link_col), lambda: PageMetrics(df, link_col))
+    with st.expander("📐 Page Metrics", expanded=False):
+        kpis = page_metrics.kpis()
+        for col, (name, value) in zip(st.columns(len(kpis)), kpis.items()):
+            col.metric(name, value)
+        extra_metrics = st.multiselect(
+            "Add to table and export",
+            [c for c in PageMetrics.available() if c not in df.columns],
+            key="page_metric_columns",
+        )
+        if extra_metrics:
+            st.dataframe(page_metrics.frame(["Address"] + extra_metrics).head(500),
+                         use_container_width=True, hide_index=True)
+
+    # --- Quantized vs full-precision metrics ---
+    if quantization is not None and len(quantization["zone_changes"]):
+        with st.expander(f"🗜️ Zone changes from {precision} embeddings", expanded=False):
+            st.dataframe(quantization["zone_changes"], use_container_width=True, hide_index=True)
+
+    # --- Crawl ↔ GSC URL matching ---
+    with st.expander("🔍 URL Match Diagnostics", expanded=False):
+        st.caption("Which canonicalisation rules each crawl URL needed to match its Search Console row.")
+        match_counts = df["URL Match"].value_counts().rename_axis("Rule").reset_index(name="Pages")
+        st.dataframe(match_counts, use_container_width=True, hide_index=True)
+
+    # --- Crawl-over-crawl history ---
+    with st.expander("📈 Drift History", expanded=False):
+        history = DriftHistory()
+        site = site_id(df["Address"])
+        crawl_date = st.date_input("Crawl date", key="history_crawl_date")
+        if st.button(f"Record this crawl for {site}"):
+            hashes = stages.run("history", merged_key, lambda: embedding_hashes(merged.embeddings))
+            history.record(site, crawl_date, df, centroid, hashes, link_col, weights)
+            st.success(f"Recorded {len(df):,} pages for {crawl_date}.")
+
+        shifts = history.centroid_shift(site)
+        if len(shifts) >= 2:
+            st.markdown("**Centroid shift between crawls** (cosine distance)")
+            st.dataframe(shifts, use_container_width=True, hide_index=True)
+            since = st.selectbox("Zone changes since", shifts["crawl_date"].iloc[:-1][::-1])
+            changes = history.zone_changes(site, since=since)
+            st.caption(f"{len(changes):,} pages changed zone between {changes.attrs['since']} and {changes.attrs['until']}")
+            st.dataframe(changes.head(500), use_container_width=True, hide_index=True)
+        else:
+            st.caption(f"{len(shifts)} crawl(s) recorded for {site} — record two to compare.")
+
+    # --- Page-to-page similarity ---
+    with st.expander("🔗 Similar Pages & Cannibalisation", expanded=False):
+        if st.checkbox("Build page similarity index"):
+
+            def neighbours_stage():
+                # The index is persisted next to the cached merged dataset
+                path = cache.artifact_path(merged_key, "neighbours.npz")
+                if path and os.path.exists(path):
+                    index = NeighbourIndex.load(path, merged.embeddings, merged.normalised)
+                else:
+                    index = NeighbourIndex().build(merged.embeddings, merged.normalised)
+                    cache.save_artifact(merged_key, "neighbours.npz", index.save)
+                return index, index.evaluate()
+
+            index, index_report = stages.run("neighbours", merged_key, neighbours_stage)
+            st.caption(
+                f"{index_report['method']} index · recall@10 vs exact {index_report['recall']:.2f} · "
+                f"{index_report['ann_ms_per_query']:.2f} ms/query (exact {index_report['exact_ms_per_query']:.2f} ms)"
+            )
+
+            page = st.selectbox("Page", df["Address"])
+            row = int(df.index[df["Address"] == page][0])
+            similar_idx, similar_sim = index.similar_pages(row, k=10)
+            similar = df.iloc[similar_idx][["Address", "zone", "Clicks"]].copy()
+            similar.columns = ["Similar URL", "Zone", "Clicks"]
+            similar["Similarity"] = similar_sim.round(3)
+            st.dataframe(similar, use_container_width=True, hide_index=True)
+
+            st.markdown("**Cannibalisation candidates** (closest page pairs across the site)")
+            min_similarity = st.slider("Minimum similarity", 0.5, 1.0, 0.9, 0.01)
+            pairs = stages.run("pairs", merged_key, lambda: topk_pairs(df, *index.all_pages_topk(k=10)))
+            candidates = pairs[pairs["Similarity"] >= min_similarity]
+            st.dataframe(candidates.head(500), use_container_width=True, hide_index=True)
+            st.download_button(
+                f"📥 Export {len(candidates)} pairs",
+                candidates.to_csv(index=False).encode("utf-8"),
+                "cannibalisation_candidates.csv",
+                "text/csv",
+            )
+
     # --- Export ---
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         st.download_button(
             "📥 Export Analysis",
-            df.to_csv(index=False).encode("utf-8"),
+            stages.run(
+                "export",
+                (layout_key, tuple(extra_metrics)),
+                lambda: df.join(page_metrics.frame(extra_metrics)).to_csv(index=False).encode("utf-8"),
+            ),
             "semantic_drift_analysis.csv",
             "text/csv",
             use_container_width=True
-        )
\ No newline at end of file
+        )
+
+    st.caption(stages.summary())
+    memory_panel(registry, owned_bytes(stages.results(), registry.shared_columns(session)))
+
+    # --- Instrumentation: per-stage breakdown in the (collapsed) status panel ---
+    breakdown = stages.recorder.table()
+    if not breakdown.empty:
+        status.markdown("**Stage breakdown** (this rerun; nested rows are steps inside a stage)")
+        status.dataframe(breakdown, use_container_width=True, hide_index=True)
+    if profiler is not None:
+        prof_path = os.path.join(cache.root, "last_run.prof")
+        stats = stop_profile(profiler, prof_path)
+        with st.expander("🩺 cProfile (this rerun)", expanded=False):
+            st.code(stats)
+            with open(prof_path, "rb") as fh:
+                st.download_button("📥 Download .prof", fh.read(), "semantic_drift.prof")
+
+else:
+    # Uploads removed: this session no longer holds any shared dataset
+    registry.release(session)
@@ -0,0 +1,63 @@
+"""
+Benchmark: radial chart spec size and build/serialise time — full frame vs slim columns vs level of detail.
+
+    python -m benchmarks.bench_chart --pages 100000
+"""
+import argparse
+import time
+import altair as alt
+import numpy as np
+import pandas as pd
+from ui.visuals import build_radial_chart
+
+
+def make_layout_frame(pages, extra_cols=20, seed=0):
+    """Layout-stage-like frame: chart inputs plus the crawl/GSC columns a real merge carries."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Address": [f"https://example.com/section-{i % 40}/page-{i}" for i in range(pages)],
+        "Clicks": rng.zipf(1.8, pages).clip(0, 100000),
+        "Impressions": rng.integers(0, 100000, pages),
+        "Inlinks": rng.integers(1, 500, pages),
+        "Crawl Depth": rng.integers(0, 8, pages),
+        "distance_from_centre": rng.beta(2, 5, pages),
+        "x": rng.standard_normal(pages),
+        "y": rng.standard_normal(pages),
+    })
+    df["SDI"] = df["Inlinks"] / df["Inlinks"].max() * df["distance_from_centre"]
+    for j in range(extra_cols):
+        df[f"Crawl Column {j}"] = "x" * 40
+    return df
+
+
+def measure(build):
+    t0 = time.perf_counter()
+    chart = build()
+    built = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    spec = chart.to_json()
+    return built, time.perf_counter() - t0, len(spec.encode("utf-8"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--pages", type=int, default=100000)
+    ap.add_argument("--lod-threshold", type=int, default=5000)
+    args = ap.parse_args()
+
+    df = make_layout_frame(args.pages)
+    runs = [
+        # What the chart used to receive: every merged column, every page
+        ("full frame", lambda: alt.Chart(df).mark_circle().encode(x="x", y="y")),
+        ("slim, all points", lambda: build_radial_chart(df, lod_threshold=None)),
+        ("level of detail", lambda: build_radial_chart(df, lod_threshold=args.lod_threshold)),
+    ]
+    print(f"{args.pages:,} pages")
+    with alt.data_transformers.disable_max_rows():
+        for name, build in runs:
+            built, serialised, size = measure(build)
+            print(f"{name:<18} build {built:6.2f}s  to_json {serialised:6.2f}s  spec {size / 1e6:8.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
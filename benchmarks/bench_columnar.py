@@ -0,0 +1,81 @@
+"""
+Benchmark: loading the same crawl from CSV (embedding text) vs Parquet / Arrow IPC (fixed-size-list floats).
+
+    python -m benchmarks.bench_columnar --rows 20000 --dim 1536
+
+Writes one synthetic crawl as CSV, Parquet and uncompressed Arrow IPC and
+times `load_screaming_frog_chunked` on each. Peak memory is tracemalloc
+(Python / numpy) plus the Arrow memory pool's peak; a memory-mapped Arrow
+file's pages are the OS page cache's, so they count towards neither.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from benchmarks.bench_loader import write_crawl_csv
+from core.data_loader import load_screaming_frog_chunked
+
+
+def write_columnar(csv_path, parquet_path, arrow_path):
+    """The CSV's rows with the embedding text turned into a fixed-size list<float32> column."""
+    ds = load_screaming_frog_chunked(csv_path, extra_columns=None)
+    table = pa.Table.from_pandas(ds.meta.drop(columns=["url_rules"]), preserve_index=False)
+    flat = pa.array(np.ascontiguousarray(ds.embeddings).ravel())
+    table = table.append_column("OpenAI Embeddings 1", pa.FixedSizeListArray.from_arrays(flat, ds.dim))
+    # One record batch, as a one-shot export writes it (several batches cost one concatenation)
+    table = table.combine_chunks()
+    pq.write_table(table, parquet_path)
+    feather.write_feather(table, arrow_path, compression="uncompressed")
+    return ds.embeddings
+
+
+# Proxy pools must outlive every buffer they allocated (Arrow-backed strings in the metadata)
+_POOLS = []
+
+
+def profile_load(path):
+    """(dataset, seconds, tracemalloc peak, Arrow pool peak)."""
+    default_pool = pa.default_memory_pool()
+    pool = pa.proxy_memory_pool(default_pool)
+    _POOLS.append(pool)
+    pa.set_memory_pool(pool)
+    tracemalloc.start()
+    try:
+        t0 = time.perf_counter()
+        ds = load_screaming_frog_chunked(path)
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        pa.set_memory_pool(default_pool)
+    return ds, elapsed, peak, pool.max_memory()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--dim", type=int, default=1536)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {fmt: os.path.join(tmp, f"crawl.{fmt}") for fmt in ("csv", "parquet", "arrow")}
+        write_crawl_csv(paths["csv"], args.rows, args.dim)
+        reference = write_columnar(paths["csv"], paths["parquet"], paths["arrow"])
+        print(f"{args.rows:,} pages × {args.dim} dims "
+              f"(float32 matrix {reference.nbytes / 1e6:.0f} MB)")
+
+        for fmt, path in paths.items():
+            ds, secs, peak, arrow_peak = profile_load(path)
+            error = np.abs(ds.embeddings - reference).max()
+            print(f"  {fmt:<8} {os.path.getsize(path) / 1e6:8.1f} MB on disk · {secs:7.2f}s · "
+                  f"peak {peak / 1e6:7.1f} MB + Arrow {arrow_peak / 1e6:7.1f} MB · max |Δ| {error:.1e}")
+            ds = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+End-to-end latency of the app's stage graph: sequential vs the concurrent stage executor.
+
+    python -m benchmarks.bench_executor --sizes 10000x1536 --workers 4
+
+Runs the same DAG the app submits (crawl ∥ GSC parse → merge → centroid,
+with the projection starting from the crawl alone) on a fresh StageCache,
+once with one worker (every stage inline, in order — the pre-executor
+path) and once with --workers threads. Reports the best of --repeat runs.
+"""
+import argparse
+import os
+import tempfile
+from benchmarks.bench_pipeline import parse_sizes, site_files
+from core.data_loader import load_screaming_frog_chunked, load_gsc, merge_data, crawl_rows
+from core.pipeline import StageCache
+from core.processing import compute_centroid, add_zones
+from core.projection import reduce_embeddings, centre_on_centroid, PROJECTION_BACKENDS
+
+
+def run_graph(crawl_path, gsc_path, backend, workers):
+    """One uncached pass through the stage graph; (seconds, summed stage seconds)."""
+    stages = StageCache(workers)
+    stages.start_run()
+    crawl_f = stages.submit("load_crawl", None, lambda: load_screaming_frog_chunked(crawl_path))
+    gsc_f = stages.submit("load_gsc", None, lambda: load_gsc(gsc_path))
+    merge_f = stages.submit("merge", None, merge_data, after=(crawl_f, gsc_f))
+    projection_f = stages.submit(
+        "projection", None,
+        lambda sf: reduce_embeddings(sf.take(crawl_rows(sf.meta)), backend=backend, evaluate=False)[:2],
+        after=(crawl_f,),
+    )
+    metrics_f = stages.submit("metrics", None, compute_centroid, after=(merge_f,))
+
+    def layout(metrics, projection):
+        (centroid, ds), (projected, reducer) = metrics, projection
+        ds = ds.copy()
+        ds.meta["x"], ds.meta["y"] = projected.meta["x"].to_numpy(), projected.meta["y"].to_numpy()
+        return add_zones(centre_on_centroid(ds, centroid, reducer)[0].meta)
+    stages.submit("layout", None, layout, after=(metrics_f, projection_f))
+    return stages.wait(progress=lambda message: None), stages.stage_seconds()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", default="10000x1536", help="comma-separated PAGESxDIM cases")
+    ap.add_argument("--backend", default="umap", choices=list(PROJECTION_BACKENDS))
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "sda-bench"))
+    args = ap.parse_args()
+
+    # Warm-up: numba compile and first-use imports out of the timings
+    run_graph(*site_files(args.data_dir, 300, 16), args.backend, args.workers)
+
+    for pages, dim in parse_sizes(args.sizes):
+        crawl, gsc = site_files(args.data_dir, pages, dim)
+        print(f"{pages}x{dim}:")
+        for workers in (1, args.workers):
+            best = min(run_graph(crawl, gsc, args.backend, workers) for _ in range(args.repeat))
+            print(f"  {workers} worker(s): {best[0]:8.2f}s end-to-end · {best[1]:8.2f}s of stage time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: `incremental_drift` on a re-crawl vs a full `compute_centroid` + `add_zones`.
+
+    python -m benchmarks.bench_history --rows 50000 --dim 1536 --changed 0.05
+
+Records one crawl of a synthetic site, then times the metrics of a second
+crawl in which --changed of the pages have new embeddings:
+  full          — compute_centroid + add_zones (no history)
+  hashes        — embedding_hashes alone
+  unpinned      — incremental_drift, centre follows the crawl (every distance re-measured)
+  + basis       — the same with a precomputed CentroidBasis (the app's basis stage)
+  pinned        — incremental_drift(pin_centre=True): only changed pages are measured
+Hashes are computed inside every incremental case, as the CLI does.
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from core.dataset import PageDataset
+from core.history import DriftHistory, incremental_drift
+from core.processing import centroid_basis, compute_centroid, add_zones
+from core.projection_store import embedding_hashes
+
+
+def timed(fn, repeat=3):
+    """(result, best wall time) over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--changed", type=float, default=0.05, help="share of pages re-embedded in the second crawl")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    meta = pd.DataFrame({
+        "Address": [f"https://example.com/page-{i}/" for i in range(args.rows)],
+        "Inlinks": rng.integers(1, 500, args.rows),
+        "Clicks": rng.integers(0, 100, args.rows),
+    })
+    first = rng.standard_normal((args.rows, args.dim), dtype=np.float32) + 0.2
+    second = first.copy()
+    changed = rng.choice(args.rows, int(args.rows * args.changed), replace=False)
+    second[changed] = rng.standard_normal((len(changed), args.dim), dtype=np.float32) + 0.2
+    print(f"{args.rows:,} pages × {args.dim} dims, {len(changed):,} changed")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = DriftHistory(tmp)
+        site = "example.com"
+        centroid, reference, ds, hashes, _ = incremental_drift(PageDataset(meta.copy(), first), history, site)
+        history.record(site, "2026-09-01", ds.meta, centroid, hashes, reference=reference)
+
+        def dataset():
+            return PageDataset(meta.copy(), second)
+
+        def full():
+            centroid, ds = compute_centroid(dataset())
+            add_zones(ds.meta)
+            return ds
+
+        reference_ds, secs = timed(full)
+        print(f"  {'full':<10} {secs:6.3f}s")
+        _, secs = timed(lambda: embedding_hashes(second))
+        print(f"  {'hashes':<10} {secs:6.3f}s")
+
+        basis = centroid_basis(dataset())
+        cases = {
+            "unpinned": lambda: incremental_drift(dataset(), history, site),
+            "+ basis": lambda: incremental_drift(dataset(), history, site, basis=basis),
+            "pinned": lambda: incremental_drift(dataset(), history, site, pin_centre=True),
+        }
+        for name, fn in cases.items():
+            (_, _, ds, _, report), secs = timed(fn)
+            error = ""
+            if not report["pinned"]:
+                delta = np.abs(ds.meta["distance_from_centre"] - reference_ds.meta["distance_from_centre"]).max()
+                error = f" · max |Δ distance| vs full {delta:.1e}"
+            print(f"  {name:<10} {secs:6.3f}s · reused {report['reused']:,} · "
+                  f"measured {report['recomputed']:,}{error}")
+
+
+if __name__ == "__main__":
+    main()
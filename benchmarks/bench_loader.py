@@ -0,0 +1,75 @@
+"""
+Benchmark: full-file vs chunked Screaming Frog loading vs cache hit (time + peak memory).
+
+    python -m benchmarks.bench_loader --rows 20000 --dim 1536
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from core.cache import DatasetCache
+from core.data_loader import load_screaming_frog, load_screaming_frog_chunked
+
+
+def write_crawl_csv(path, rows, dim, extra_cols=20, seed=0):
+    """Internal All-style export: URL, embedding text, link metrics and filler crawl columns."""
+    rng = np.random.default_rng(seed)
+    emb = rng.standard_normal((rows, dim)).astype(np.float32)
+    df = pd.DataFrame({
+        "Address": [f"https://example.com/page-{i}/" for i in range(rows)],
+        "Inlinks": rng.integers(1, 500, rows),
+        "Crawl Depth": rng.integers(0, 8, rows),
+    })
+    for j in range(extra_cols):
+        df[f"Crawl Column {j}"] = "x" * 40
+    df["OpenAI Embeddings 1"] = ["[" + ",".join(f"{v:.6f}" for v in row) + "]" for row in emb]
+    df.to_csv(path, index=False)
+
+
+def profile(fn, *args, **kwargs):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--chunksize", type=int, default=5000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "internal_all.csv")
+        write_crawl_csv(csv_path, args.rows, args.dim)
+        csv_mb = os.path.getsize(csv_path) / 1e6
+        matrix_mb = args.rows * args.dim * 4 / 1e6
+        print(f"CSV {csv_mb:.1f} MB, final float32 matrix {matrix_mb:.1f} MB")
+
+        runs = [
+            ("load_screaming_frog", load_screaming_frog, {}),
+            ("chunked (in-memory)", load_screaming_frog_chunked, {"chunksize": args.chunksize}),
+            ("chunked (memmap)", load_screaming_frog_chunked,
+             {"chunksize": args.chunksize, "mmap_path": os.path.join(tmp, "emb.f32")}),
+        ]
+        for name, fn, kwargs in runs:
+            ds, elapsed, peak = profile(fn, csv_path, **kwargs)
+            print(f"{name:22s} {elapsed:7.2f}s  peak {peak / 1e6:8.1f} MB "
+                  f"({peak / 1e6 / matrix_mb:.1f}× matrix)  cols={len(ds.meta.columns)}")
+
+        # Cache hit: parquet metadata + memory-mapped .npy, no parsing
+        cache = DatasetCache(os.path.join(tmp, "cache"))
+        cache.put("crawl", ds, label="bench")
+        ds, elapsed, peak = profile(cache.get, "crawl")
+        print(f"{'cache hit':22s} {elapsed:7.2f}s  peak {peak / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Benchmark: IVF neighbour index vs exact search — build time, recall, latency.
+
+    python -m benchmarks.bench_neighbours --rows 50000 --dim 1536
+"""
+import argparse
+import time
+from core.neighbours import NeighbourIndex
+from benchmarks.bench_projection import make_pages
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=30000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--n-probe", type=int, nargs="+", default=[5, 10, 20])
+    args = ap.parse_args()
+
+    ds = make_pages(args.rows, args.dim)
+    for n_probe in args.n_probe:
+        t0 = time.perf_counter()
+        index = NeighbourIndex(method="ivf", n_probe=n_probe).build(ds.embeddings)
+        build = time.perf_counter() - t0
+        report = index.evaluate(k=args.k)
+        print(f"n_probe={n_probe:3d} lists={index.n_lists:4d} build {build:6.2f}s  "
+              f"recall@{args.k} {report['recall']:.3f}  "
+              f"ann {report['ann_ms_per_query']:.2f} ms/q  exact {report['exact_ms_per_query']:.2f} ms/q")
+
+    t0 = time.perf_counter()
+    index.all_pages_topk(k=args.k)
+    print(f"all-pages top-{args.k} join (n_probe={index.n_probe}): {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: in-memory vs out-of-core (memory-mapped, blocked) centroid / distance / SDI.
+
+    python -m benchmarks.bench_out_of_core --rows 500000 --dim 1536 --block-rows 8192
+
+Writes a random float32 matrix to a raw file, then runs `compute_centroid`
+on it loaded into RAM and as a memmap at each block size, reporting time,
+tracemalloc peak and the largest difference from the in-memory result.
+"""
+import argparse
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from benchmarks.bench_loader import profile
+from core.dataset import PageDataset
+from core.processing import compute_centroid
+
+
+def write_matrix(path, rows, dim, seed=0, chunk=20000):
+    rng = np.random.default_rng(seed)
+    mm = np.memmap(path, dtype=np.float32, mode="w+", shape=(rows, dim))
+    for start in range(0, rows, chunk):
+        stop = min(start + chunk, rows)
+        mm[start:stop] = rng.standard_normal((stop - start, dim), dtype=np.float32) + 0.2
+    mm.flush()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=200000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--block-rows", default="2048,8192,32768", help="comma-separated block sizes")
+    ap.add_argument("--workers", type=int, default=None, help="threads for the blocked passes (default: all cores)")
+    ap.add_argument("--skip-in-memory", action="store_true", help="for matrices that don't fit in RAM")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(1)
+    meta = pd.DataFrame({
+        "Address": [f"https://example.com/page-{i}/" for i in range(args.rows)],
+        "Inlinks": rng.integers(1, 500, args.rows),
+        "Clicks": rng.integers(0, 100, args.rows),
+    })
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "embeddings.f32")
+        write_matrix(path, args.rows, args.dim)
+        matrix = np.memmap(path, dtype=np.float32, mode="r", shape=(args.rows, args.dim))
+        print(f"{args.rows:,} × {args.dim} float32 matrix: {matrix.nbytes / 1e6:.0f} MB")
+
+        reference = None
+        if not args.skip_in_memory:
+            ds = PageDataset(meta.copy(), np.array(matrix))
+            (_, out), secs, peak = profile(compute_centroid, ds)
+            reference = out.meta["distance_from_centre"].to_numpy()
+            print(f"  {'in-memory':<18} {secs:7.2f}s  peak {peak / 1e6:8.1f} MB")
+            ds = out = None
+
+        for block_rows in map(int, args.block_rows.split(",")):
+            ds = PageDataset(meta.copy(), matrix)
+            (_, out), secs, peak = profile(compute_centroid, ds, block_rows=block_rows, workers=args.workers)
+            distance = out.meta["distance_from_centre"].to_numpy()
+            error = "" if reference is None else f"  max |Δ distance| {np.abs(distance - reference).max():.1e}"
+            print(f"  {f'memmap × {block_rows}':<18} {secs:7.2f}s  peak {peak / 1e6:8.1f} MB{error}")
+        del matrix
+
+
+if __name__ == "__main__":
+    main()
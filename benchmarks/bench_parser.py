@@ -0,0 +1,65 @@
+"""
+Benchmark: bulk embedding parsing vs the per-row apply + literal_eval path.
+
+    python -m benchmarks.bench_parser --rows 40000 --dim 1536
+"""
+import argparse
+import ast
+import time
+import numpy as np
+import pandas as pd
+from utils.parser import parse_embedding_matrix
+
+
+def make_column(rows, dim, fmt="json", seed=0):
+    rng = np.random.default_rng(seed)
+    emb = rng.standard_normal((rows, dim)).astype(np.float32)
+    sep = ", " if fmt == "json" else "|"
+    text = [sep.join(f"{v:.8f}" for v in row) for row in emb]
+    if fmt == "json":
+        text = [f"[{t}]" for t in text]
+    return pd.Series(text)
+
+
+def legacy_parse(col):
+    """The original loader path: one literal_eval per row, object column of float64 arrays."""
+    parsed = col.apply(lambda v: np.array(ast.literal_eval(v)) if isinstance(v, str) else np.nan)
+    return np.vstack(parsed.dropna().values)
+
+
+def bulk_parse(col):
+    matrix, _, _ = parse_embedding_matrix(col)
+    return matrix
+
+
+def timed(fn, col, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(col)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--format", choices=["json", "pipe"], default="json")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"Generating {args.rows} × {args.dim} {args.format} embeddings...")
+    col = make_column(args.rows, args.dim, args.format)
+
+    bulk_t, bulk = timed(bulk_parse, col, args.repeat)
+    print(f"bulk   parse_embedding_matrix : {bulk_t:8.3f}s  ({bulk.nbytes / 1e6:.1f} MB float32)")
+
+    if args.format == "json":
+        legacy_t, legacy = timed(legacy_parse, col, args.repeat)
+        print(f"legacy apply + literal_eval   : {legacy_t:8.3f}s  ({legacy.nbytes / 1e6:.1f} MB float64)")
+        print(f"speed-up: {legacy_t / bulk_t:.1f}×   max abs diff: {np.abs(legacy - bulk).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
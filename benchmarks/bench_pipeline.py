@@ -0,0 +1,170 @@
+"""
+Benchmark suite: time and peak memory of every pipeline stage on synthetic sites, with JSON baselines.
+
+    python -m benchmarks.bench_pipeline --sizes 1000x256,10000x1536 --save benchmarks/baselines/main.json
+    python -m benchmarks.bench_pipeline --sizes 1000x256,10000x1536 --baseline benchmarks/baselines/main.json
+
+Each size is PAGESxDIM. Sites come from `benchmarks.synthetic` and are kept
+in --data-dir, so later runs skip generation. Stages run in pipeline order
+on the previous stage's output, after one untimed warm-up pass on a tiny
+site; each is repeated --repeat times and the
+fastest run is kept. Against a baseline, a stage is a regression when it is
+more than --threshold slower (or uses that much more memory) and the
+difference is above the noise floor. The exit code is 1 on any regression.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.bench_loader import profile
+from benchmarks.synthetic import write_site
+from core.data_loader import load_screaming_frog_chunked, load_gsc, merge_data
+from core.processing import compute_centroid, add_zones
+from core.projection import reduce_embeddings, centre_on_centroid, PROJECTION_BACKENDS
+from core.radial_layout import compute_radial_layout
+from ui.visuals import build_radial_chart
+
+STAGES = ["parse_crawl", "parse_gsc", "merge", "centroid", "projection", "layout", "chart", "export"]
+
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_MB = 5.0
+
+
+def parse_sizes(text):
+    sizes = []
+    for part in text.split(","):
+        pages, dim = part.lower().split("x")
+        sizes.append((int(pages), int(dim)))
+    return sizes
+
+
+def site_files(data_dir, pages, dim, seed=0):
+    folder = os.path.join(data_dir, f"{pages}x{dim}-s{seed}")
+    crawl, gsc = os.path.join(folder, "crawl.csv"), os.path.join(folder, "gsc.csv")
+    if not (os.path.exists(crawl) and os.path.exists(gsc)):
+        t0 = time.perf_counter()
+        write_site(folder, pages, dim, seed=seed)
+        print(f"  generated {pages:,}×{dim} site in {time.perf_counter() - t0:.1f}s")
+    return crawl, gsc
+
+
+def run_stages(crawl_path, gsc_path, backend):
+    """One pass through the pipeline; {stage: (seconds, peak bytes)}."""
+    results = {}
+
+    def stage(name, fn, *args, **kwargs):
+        out, secs, peak = profile(fn, *args, **kwargs)
+        results[name] = (secs, peak)
+        return out
+
+    sf = stage("parse_crawl", load_screaming_frog_chunked, crawl_path)
+    gsc = stage("parse_gsc", load_gsc, gsc_path)
+    ds = stage("merge", merge_data, sf, gsc)
+    centroid, ds = stage("centroid", compute_centroid, ds)
+    ds, reducer, _ = stage("projection", reduce_embeddings, ds, backend=backend, evaluate=False)
+
+    def layout():
+        centred, _ = centre_on_centroid(ds, centroid, reducer)
+        return compute_radial_layout(add_zones(centred.meta))
+    df = stage("layout", layout)
+    stage("chart", lambda: build_radial_chart(df).to_json())
+    stage("export", lambda: df.to_csv(index=False).encode("utf-8"))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Rows of (case, stage, metric, baseline, current, ratio) that regressed."""
+    regressions = []
+    for case, stages in results["cases"].items():
+        for name, current in stages.items():
+            before = baseline.get("cases", {}).get(case, {}).get(name)
+            if before is None:
+                continue
+            for metric, floor in (("seconds", MIN_SECONDS), ("peak_mb", MIN_MB)):
+                old, new = before[metric], current[metric]
+                if new - old > floor and new > old * (1 + threshold):
+                    regressions.append((case, name, metric, old, new, new / old if old else float("inf")))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", default="1000x256,10000x1536", help="comma-separated PAGESxDIM cases")
+    ap.add_argument("--backend", default="umap", choices=list(PROJECTION_BACKENDS))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "sda-bench"))
+    ap.add_argument("--save", help="write results to this JSON file (e.g. a new baseline)")
+    ap.add_argument("--baseline", help="compare against this JSON file")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown / memory growth (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    # Warm-up pass: keeps numba's UMAP compile and first-use imports (Altair schema,
+    # Arrow kernels) out of the first case's timings
+    run_stages(*site_files(args.data_dir, 300, 16, args.seed), args.backend)
+
+    results = {"environment": environment(), "backend": args.backend, "cases": {}}
+    for pages, dim in parse_sizes(args.sizes):
+        case = f"{pages}x{dim}"
+        print(f"{case}:")
+        crawl, gsc = site_files(args.data_dir, pages, dim, args.seed)
+        best = {}
+        for _ in range(args.repeat):
+            for name, (secs, peak) in run_stages(crawl, gsc, args.backend).items():
+                if name not in best or secs < best[name][0]:
+                    best[name] = (secs, peak)
+        results["cases"][case] = {
+            name: {"seconds": round(secs, 4), "peak_mb": round(peak / 1e6, 2)} for name, (secs, peak) in best.items()
+        }
+        for name in STAGES:
+            secs, peak = best[name]
+            print(f"  {name:<12} {secs:8.3f}s  peak {peak / 1e6:8.1f} MB")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as fh:
+            json.dump(results, fh, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        if baseline.get("backend") != args.backend:
+            print(f"\nNote: baseline used backend {baseline.get('backend')}, this run {args.backend}")
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\nCompared with {args.baseline} (commit {baseline['environment'].get('commit') or '?'}, "
+              f"threshold {args.threshold:.0%})")
+        for case, name, metric, old, new, ratio in regressions:
+            print(f"  REGRESSION {case} {name} {metric}: {old:g} → {new:g} ({ratio:.2f}×)")
+        if regressions:
+            return 1
+        print("  no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Benchmark: projection backends — wall time and kNN recall per site size.
+
+    python -m benchmarks.bench_projection --sizes 2000 10000 --dim 1536
+"""
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from core.dataset import PageDataset
+from core.projection import PROJECTION_BACKENDS, reduce_embeddings
+
+
+def make_pages(rows, dim, topics=12, seed=0):
+    """Clustered embeddings with one URL section per topic."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    topic = rng.integers(0, topics, rows)
+    emb = centres[topic] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    meta = pd.DataFrame({"Address": [f"https://example.com/topic-{t}/page-{i}" for i, t in enumerate(topic)]})
+    return PageDataset(meta, emb)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000])
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--backends", nargs="+", default=list(PROJECTION_BACKENDS))
+    ap.add_argument("--sample-size", type=int, default=5000)
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore")
+
+    print(f"{'pages':>8} {'backend':>18} {'seconds':>9} {'kNN recall@10':>14}")
+    for size in args.sizes:
+        ds = make_pages(size, args.dim)
+        for backend in args.backends:
+            _, _, report = reduce_embeddings(ds.copy(), backend=backend, sample_size=args.sample_size)
+            print(f"{size:8d} {backend:>18} {report['seconds']:9.2f} {report['knn_recall']:14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: cold start — module import time and time to the first UMAP result, with and without warm-up.
+
+    python -m benchmarks.bench_startup --rows 5000 --dim 256 --upload-seconds 60
+
+Every case runs in a fresh interpreter (nothing imported or compiled yet):
+  import        — importing the modules app.py imports (what the first page
+                  load waits for, on top of Streamlit itself)
+  cold          — imports, then the projection stage on a synthetic site:
+                  the first analysis after a restart
+  warm-up       — imports, `start_warm_up()`, --upload-seconds of idle time
+                  (the user choosing files), then the projection stage
+
+Times are reported from process start; "after upload" is what the user
+waits once the files are in.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+APP_MODULES = [
+    "core.data_loader", "core.cache", "core.history", "core.metrics", "core.link_graph", "core.neighbours",
+    "core.pipeline", "core.registry", "core.processing", "core.quantize", "core.projection",
+    "core.radial_layout", "core.projection_store", "ui.visuals", "ui.layout", "utils.instrument",
+]
+
+CASE = """
+import importlib, json, time
+t0 = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+out = {{"import": time.perf_counter() - t0}}
+if {mode!r} != "import":
+    import numpy as np, pandas as pd
+    from core.dataset import PageDataset
+    if {mode!r} == "warm-up":
+        from core.warmup import start_warm_up
+        start_warm_up()
+    time.sleep({upload})
+    rng = np.random.default_rng(0)
+    ds = PageDataset(pd.DataFrame({{"Address": [f"https://example.com/p{{i}}/" for i in range({rows})]}}),
+                     rng.standard_normal(({rows}, {dim}), dtype=np.float32))
+    t1 = time.perf_counter()
+    from core.projection import reduce_embeddings
+    reduce_embeddings(ds, backend={backend!r}, evaluate=False)
+    out["after_upload"] = time.perf_counter() - t1
+    out["first_result"] = time.perf_counter() - t0
+print(json.dumps(out), flush=True)
+# numba's TBB layer can hang interpreter shutdown once kernels ran off the main thread
+import os; os._exit(0)
+"""
+
+
+def run_case(mode, args):
+    upload = args.upload_seconds if mode != "import" else 0
+    code = CASE.format(modules=APP_MODULES, mode=mode, upload=upload, rows=args.rows, dim=args.dim,
+                       backend=args.backend)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode:
+        return {"error": proc.stderr.strip().splitlines()[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=5000, help="above 4096 UMAP uses NNDescent, as real sites do")
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--backend", default="umap")
+    ap.add_argument("--upload-seconds", type=float, default=60.0, help="idle time before the analysis starts")
+    ap.add_argument("--cases", default="import,cold,warm-up")
+    args = ap.parse_args()
+
+    for mode in args.cases.split(","):
+        out = run_case(mode, args)
+        if "error" in out:
+            print(f"  {mode:<8} failed: {out['error']}")
+            continue
+        line = f"  {mode:<8} imports {out['import']:6.2f}s"
+        if "first_result" in out:
+            line += f" · after upload {out['after_upload']:6.2f}s · first result {out['first_result']:6.2f}s from start"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Synthetic site generator: a matching Screaming Frog crawl export and GSC export.
+
+    python -m benchmarks.synthetic out/ --pages 100000 --dim 1536
+
+Pages fall into clustered topics (Zipf-sized, one URL section each) plus a
+share of off-topic outliers. Inlinks are heavy-tailed and highest for
+shallow pages and topic hubs; clicks are zero-inflated and log-normal,
+correlated with inlinks. The GSC export carries the URL variants seen in
+real exports (upper case, missing trailing slash), misses some crawled
+pages and adds some GSC-only URLs.
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+
+def topic_centres(rng, dim, topics):
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    return centres / np.linalg.norm(centres, axis=1, keepdims=True)
+
+
+def topic_embeddings(topic, centres, start, seed=0, spread=0.6):
+    """
+    float32 embeddings for pages `start`..`start + len(topic)`: topic centre +
+    noise (pure noise for outliers, topic -1). Rows only depend on their
+    block, so a large site can be generated block by block.
+    """
+    dim = centres.shape[1]
+    rng = np.random.default_rng([seed, start])
+    emb = rng.standard_normal((len(topic), dim)).astype(np.float32) * (spread / np.sqrt(dim))
+    on_topic = topic >= 0
+    emb[on_topic] += centres[topic[on_topic]]
+    return emb
+
+
+def site_frame(pages, topics=20, outliers=0.05, seed=0):
+    """Crawl-side page table (no embeddings) with a `topic` column (-1 = outlier)."""
+    rng = np.random.default_rng(seed)
+    sizes = 1.0 / np.arange(1, topics + 1)
+    topic = rng.choice(topics, pages, p=sizes / sizes.sum())
+    topic[rng.random(pages) < outliers] = -1
+    section = np.where(topic >= 0, np.char.add("topic-", topic.astype(str)), "misc")
+    depth = np.clip(rng.poisson(2.5, pages) + 1, 1, 10)
+    # Topic hubs: the first page of each topic sits at depth 1 and gets linked from everywhere
+    _, hubs = np.unique(topic, return_index=True)
+    depth[hubs] = 1
+    inlinks = np.ceil((rng.pareto(1.5, pages) + 1) * 40 / depth).astype(np.int64)
+    inlinks[hubs] *= 20
+    clicks = np.where(
+        rng.random(pages) < 0.4, 0,
+        np.round(rng.lognormal(1.0, 1.5, pages) * np.log1p(inlinks)),
+    ).astype(np.int64)
+    return pd.DataFrame({
+        "Address": [f"https://example.com/{s}/page-{i}/" for i, s in enumerate(section)],
+        "Status Code": 200,
+        "Indexability": "Indexable",
+        "Title 1": [f"Page {i} about {s}" for i, s in enumerate(section)],
+        "Word Count": rng.integers(150, 3000, pages),
+        "Inlinks": inlinks,
+        "Crawl Depth": depth,
+        "Clicks": clicks,
+        "topic": topic,
+    })
+
+
+def embedding_text(emb):
+    """Screaming Frog's "[v1,v2,...]" cell text for each row."""
+    body = np.array([",".join(row) for row in np.round(emb, 6).astype(str).tolist()], dtype=object)
+    return "[" + body + "]"
+
+
+def write_crawl_csv(path, meta, centres, seed=0, chunk=5000):
+    """Internal All-style export, generated and written in blocks so memory stays flat."""
+    topic = meta["topic"].to_numpy()
+    crawl = meta.drop(columns=["Clicks", "topic"])
+    with open(path, "w", newline="") as fh:
+        for start in range(0, len(crawl), chunk):
+            part = crawl.iloc[start:start + chunk].copy()
+            emb = topic_embeddings(topic[start:start + chunk], centres, start, seed)
+            part["OpenAI Embeddings 1"] = embedding_text(emb)
+            part.to_csv(fh, header=start == 0, index=False)
+
+
+def write_gsc_csv(path, meta, queries_per_page=1, missing=0.05, extra=0.05, seed=0):
+    """Performance export ("Top pages" style); with queries_per_page > 1, a page × query dump."""
+    rng = np.random.default_rng(seed + 1)
+    keep = rng.random(len(meta)) >= missing
+    urls = meta["Address"].to_numpy()[keep].astype(object)
+    clicks = meta["Clicks"].to_numpy()[keep]
+
+    # URL variants a canonicaliser has to undo
+    variant = rng.random(len(urls))
+    urls[variant < 0.1] = [u.upper() for u in urls[variant < 0.1]]
+    urls[(variant >= 0.1) & (variant < 0.3)] = [u.rstrip("/") for u in urls[(variant >= 0.1) & (variant < 0.3)]]
+
+    n_extra = int(len(meta) * extra)
+    urls = np.concatenate([urls, [f"https://example.com/gsc-only/page-{i}/" for i in range(n_extra)]])
+    clicks = np.concatenate([clicks, rng.integers(0, 20, n_extra)])
+
+    if queries_per_page > 1:
+        urls = np.repeat(urls, queries_per_page)
+        clicks = rng.binomial(np.repeat(clicks, queries_per_page), 1 / queries_per_page)
+    impressions = clicks + np.round(rng.lognormal(4.0, 1.2, len(clicks))).astype(np.int64)
+    gsc = pd.DataFrame({
+        "Top pages": urls,
+        "Clicks": clicks,
+        "Impressions": impressions,
+        "CTR": [f"{c:.1%}" for c in clicks / impressions],
+        "Position": np.round(rng.gamma(2.0, 6.0, len(clicks)) + 1, 1),
+    })
+    gsc.to_csv(path, index=False)
+
+
+def write_site(out_dir, pages, dim, topics=20, queries_per_page=1, seed=0):
+    """Write crawl.csv + gsc.csv for one synthetic site; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    meta = site_frame(pages, topics, seed=seed)
+    centres = topic_centres(np.random.default_rng([seed, dim]), dim, topics)
+    crawl_path = os.path.join(out_dir, "crawl.csv")
+    gsc_path = os.path.join(out_dir, "gsc.csv")
+    write_crawl_csv(crawl_path, meta, centres, seed)
+    write_gsc_csv(gsc_path, meta, queries_per_page, seed=seed)
+    return crawl_path, gsc_path
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("out", help="directory for crawl.csv + gsc.csv")
+    ap.add_argument("--pages", type=int, default=10000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--topics", type=int, default=20)
+    ap.add_argument("--queries-per-page", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    paths = write_site(args.out, args.pages, args.dim, args.topics, args.queries_per_page, args.seed)
+    for path in paths:
+        print(f"{path}  {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Headless batch run of the drift pipeline over many sites.
+
+    python cli.py sites/ --out results/ --workers 4 --threads 2
+    python cli.py manifest.csv --out results/
+
+A sites directory holds one sub-directory per site with the Screaming Frog
+export (the file with an embeddings column), the GSC export and optionally
+an "All Inlinks" CSV (file name containing "inlinks"). Crawl and GSC
+exports may be CSV, Parquet or Arrow IPC. A manifest is a
+CSV with `site`, `crawl`, `gsc` and optional `inlinks` columns.
+
+Each site runs load → merge → links → metrics → projection → zones in its
+own worker process and writes <out>/<site>/pages.parquet. With --history
+each run is also appended to the drift history store (core/history.py) and
+only pages whose embeddings changed since the last recorded crawl are
+re-measured.
+
+--out-of-core keeps each site's embedding matrix in a memory-mapped file
+and streams the centroid / distance / SDI passes over it in row blocks.
+
+--metrics-log writes every stage and inner step (wall / CPU time, memory,
+rows, dims) as JSON lines; --profile writes a cProfile file per site.
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from core.data_loader import load_screaming_frog_chunked, load_gsc, merge_data, detect_sf_columns, read_header, INPUT_EXTENSIONS
+from core.link_graph import load_inlinks_graph, add_link_authority
+from core.history import DriftHistory, incremental_drift
+from core.processing import compute_centroid, add_zones
+from core.quantize import PRECISIONS, quantize_dataset, quantization_report
+from core.projection import centre_on_centroid, reduce_embeddings, PROJECTION_BACKENDS
+from core.projection_store import ProjectionStore, site_id, embedding_fingerprint, embedding_hashes
+from core.radial_layout import compute_radial_layout
+from utils.instrument import span, start_recording, start_profile, stop_profile, set_metrics_log
+from utils.logger import log
+
+# Thread pools read these when numpy/BLAS/numba are first imported
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                   "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS", "NUMBA_NUM_THREADS"]
+
+# --- 1. Discover sites ---
+
+def _is_crawl_export(path):
+    try:
+        detect_sf_columns(read_header(path))
+        return True
+    except ValueError:
+        return False
+
+
+def discover_sites(source):
+    """List of {site, crawl, gsc, inlinks} jobs from a sites directory or a manifest CSV."""
+    if os.path.isfile(source):
+        manifest = pd.read_csv(source)
+        missing = {"site", "crawl", "gsc"} - set(manifest.columns)
+        if missing:
+            raise KeyError(f"Manifest missing columns {sorted(missing)}.")
+        base = os.path.dirname(os.path.abspath(source))
+        jobs = []
+        for row in manifest.to_dict("records"):
+            inlinks = row.get("inlinks")
+            jobs.append({
+                "site": str(row["site"]),
+                "crawl": os.path.join(base, row["crawl"]),
+                "gsc": os.path.join(base, row["gsc"]),
+                "inlinks": os.path.join(base, inlinks) if isinstance(inlinks, str) and inlinks else None,
+            })
+        return jobs
+
+    jobs = []
+    for site in sorted(os.listdir(source)):
+        folder = os.path.join(source, site)
+        if not os.path.isdir(folder):
+            continue
+        files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(INPUT_EXTENSIONS))
+        inlinks = next((f for f in files if "inlinks" in os.path.basename(f).lower() and f.lower().endswith(".csv")), None)
+        crawl = next((f for f in files if f != inlinks and _is_crawl_export(f)), None)
+        gsc = next((f for f in files if f not in (crawl, inlinks) and not _is_crawl_export(f)), None)
+        if crawl is None or gsc is None:
+            print(f"[discover_sites WARNING] Skipping {site}: needs a crawl export and a GSC export.")
+            continue
+        jobs.append({"site": site, "crawl": crawl, "gsc": gsc, "inlinks": inlinks})
+    return jobs
+
+
+# --- 2. Per-site pipeline (runs in a worker process) ---
+
+# A worker's threadpoolctl limiter, set once by `_limit_threads` (restore_original_limits() undoes it)
+_thread_limits = None
+
+
+def _limit_threads(threads):
+    """Process-pool initializer: cap this worker's BLAS / OpenMP threads; returns the limiter."""
+    # Env vars cover libraries not yet loaded; threadpoolctl caps BLAS already in memory
+    from threadpoolctl import threadpool_limits
+    global _thread_limits
+    _thread_limits = threadpool_limits(limits=threads)
+    return _thread_limits
+
+
+def run_site(job, out_dir, backend="umap", use_store=True, weights=None, fold_urls=False,
+             history=False, pin_centre=False, crawl_date=None, profile_dir=None, precision="float32",
+             out_of_core=False, threads=1):
+    """Run the whole pipeline for one site. Returns a per-stage timing report (never raises)."""
+    timings, t_start = {}, time.perf_counter()
+    recorder = start_recording(job["site"])
+    profiler = start_profile() if profile_dir else None
+    report = {"site": job["site"], "pages": 0, "status": "ok", "timings": timings, "spans": recorder.spans}
+
+    def timed(stage, fn):
+        with span(stage) as record:
+            out = fn()
+        timings[stage] = record["wall_s"]
+        return out
+
+    site_dir = os.path.join(out_dir, job["site"])
+    os.makedirs(site_dir, exist_ok=True)
+    # Out of core, the matrix lives in a file next to the results and is streamed in blocks
+    mmap_path = os.path.join(site_dir, "embeddings.f32") if out_of_core else None
+    merged_path = os.path.join(site_dir, "merged.f32") if out_of_core else None
+    try:
+        log(f"{job['site']}: loading")
+        sf = timed("load", lambda: load_screaming_frog_chunked(job["crawl"], mmap_path=mmap_path))
+        with open(job["gsc"], "rb") as fh:
+            gsc = timed("load_gsc", lambda: load_gsc(fh))
+        ds = timed("merge", lambda: merge_data(sf, gsc, fold_www=fold_urls, fold_protocol=fold_urls,
+                                                      mmap_path=merged_path))
+
+        link_col = "Inlinks"
+        if job.get("inlinks"):
+            adjacency, _ = timed("links", lambda: load_inlinks_graph(job["inlinks"], ds.meta["Address"]))
+            ds = add_link_authority(ds, adjacency)
+            link_col = "Link Authority"
+
+        hashes = None
+        if history:
+            # From the float32 rows: hashing a quantized matrix dequantises it whole, and its
+            # hashes would never match those recorded by a float32 run
+            hashes = timed("hashes", lambda: embedding_hashes(ds.embeddings))
+
+        if precision != "float32":
+            # Metrics run on the compact matrix; the float32 one is dropped after the error check
+            full = ds
+            ds = timed("quantize", lambda: quantize_dataset(full, precision))
+            check = quantization_report(full, ds, **(weights or {}), link_col=link_col)
+            report["max_distance_error"] = check["max_distance_error"]
+            report["zone_changes"] = len(check["zone_changes"])
+            log(f"{job['site']}: {precision} embeddings {check['bytes'] / 1e6:.0f} MB "
+                f"(float32 {check['full_bytes'] / 1e6:.0f} MB), max distance error "
+                f"{check['max_distance_error']:.1e}, {len(check['zone_changes'])} zone changes")
+            sf = gsc = full = check = None
+
+        if history:
+            store = DriftHistory()
+            site = job["site"]
+            centroid, reference, ds, hashes, drift = timed("metrics", lambda: incremental_drift(
+                ds, store, site, **(weights or {}), link_col=link_col, hashes=hashes, pin_centre=pin_centre,
+            ))
+            report["reused"] = drift["reused"]
+        else:
+            centroid, ds = timed("metrics", lambda: compute_centroid(ds, **(weights or {}), link_col=link_col,
+                                                                     workers=threads))
+
+        log(f"{job['site']}: projecting {len(ds)} pages ({backend})")
+        params = {"backend": backend, "n_neighbors": 15, "min_dist": 0.1, "metric": "cosine"}
+        # The projection needs the real matrix: a quantized one is dequantised for this stage only
+        if use_store:
+            embed_col = detect_sf_columns(read_header(job["crawl"]))[1]
+            projected, reducer, _ = timed("projection", lambda: ProjectionStore().project(
+                ds.full_precision(), site=site_id(ds.meta["Address"]),
+                fingerprint=embedding_fingerprint(embed_col, ds.dim), **params,
+            ))
+        else:
+            projected, reducer, _ = timed("projection", lambda: reduce_embeddings(
+                ds.full_precision(), evaluate=False, **params))
+        ds.meta, projected = projected.meta, None
+
+        def zones():
+            centred, _ = centre_on_centroid(ds, centroid, reducer)
+            return compute_radial_layout(add_zones(centred.meta))
+        df = timed("zones", zones)
+        if history:
+            timed("history", lambda: store.record(site, crawl_date or pd.Timestamp.today(), df, centroid, hashes,
+                                                  link_col, weights, reference=reference))
+
+        timed("write", lambda: df.to_parquet(os.path.join(site_dir, "pages.parquet"), index=False))
+        np.save(os.path.join(site_dir, "centroid.npy"), centroid)
+        report["pages"] = len(df)
+    except Exception as exc:
+        report["status"] = f"failed: {type(exc).__name__}: {exc}"
+        report["traceback"] = traceback.format_exc()
+    if mmap_path:
+        sf = ds = None
+        for path in (mmap_path, merged_path):
+            with contextlib.suppress(OSError):
+                os.remove(path)
+    if profiler is not None:
+        stop_profile(profiler, os.path.join(profile_dir, f"{job['site']}.prof"))
+    report["total"] = time.perf_counter() - t_start
+    return report
+
+
+# --- 3. Summary ---
+
+def timing_summary(reports):
+    """Per-site table: pages, seconds per stage, total and status (plus reuse / quantization checks)."""
+    optional = [k for k in ["reused", "max_distance_error", "zone_changes"] if any(k in r for r in reports)]
+    rows = [{"site": r["site"], "pages": r["pages"], **{k: r.get(k, "-") for k in optional},
+             **{k: round(v, 2) for k, v in r["timings"].items()},
+             "total": round(r["total"], 2), "status": r["status"]} for r in reports]
+    table = pd.DataFrame(rows).fillna("-")
+    stages = [c for c in ["load", "load_gsc", "merge", "links", "hashes", "quantize", "metrics", "projection",
+                          "zones", "history", "write"] if c in table.columns]
+    return table[["site", "pages", *optional, *stages, "total", "status"]].to_string(index=False)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("source", help="sites directory or manifest CSV")
+    ap.add_argument("--out", default="results", help="output directory (one sub-directory per site)")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    ap.add_argument("--threads", type=int, default=1, help="BLAS / numba threads per worker")
+    ap.add_argument("--backend", default="umap", choices=list(PROJECTION_BACKENDS))
+    ap.add_argument("--fold-urls", action="store_true", help="match www/non-www and http/https URLs")
+    ap.add_argument("--no-store", action="store_true", help="always refit instead of reusing saved per-site maps")
+    ap.add_argument("--precision", default="float32", choices=list(PRECISIONS),
+                    help="embedding storage for the drift metrics (int8 / float16 cut memory 4× / 2×)")
+    ap.add_argument("--out-of-core", action="store_true",
+                    help="memory-map each site's embeddings and compute the drift metrics in row blocks")
+    ap.add_argument("--history", action="store_true", help="append each run to the drift history store")
+    ap.add_argument("--pin-centre", action="store_true",
+                    help="with --history, measure from the last recorded centre so unchanged pages are reused")
+    ap.add_argument("--crawl-date", help="crawl date recorded in the history (default: today)")
+    ap.add_argument("--metrics-log", help="append per-stage metrics as JSON lines to this file ('-' = stderr)")
+    ap.add_argument("--profile", metavar="DIR", help="write a cProfile .prof file per site to DIR")
+    args = ap.parse_args(argv)
+
+    jobs = discover_sites(args.source)
+    if not jobs:
+        print(f"No sites found in {args.source}.")
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+
+    # Spawned workers inherit these before importing numpy / numba
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(args.threads)
+    if args.metrics_log:
+        target = args.metrics_log if args.metrics_log == "-" else os.path.abspath(args.metrics_log)
+        os.environ["SDA_METRICS_LOG"] = target
+        set_metrics_log(target)
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+
+    print(f"Running {len(jobs)} sites on {args.workers} workers × {args.threads} threads")
+    t0 = time.perf_counter()
+    reports = []
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_limit_threads,
+        initargs=(args.threads,),
+    ) as pool:
+        futures = [pool.submit(run_site, job, args.out, args.backend, not args.no_store,
+                               fold_urls=args.fold_urls, history=args.history,
+                               pin_centre=args.pin_centre, crawl_date=args.crawl_date,
+                               profile_dir=args.profile, precision=args.precision,
+                               out_of_core=args.out_of_core, threads=args.threads) for job in jobs]
+        for future in as_completed(futures):
+            report = future.result()
+            reports.append(report)
+            log(f"{report['site']}: {report['status']} in {report['total']:.1f}s")
+            if "traceback" in report:
+                print(report["traceback"], file=sys.stderr)
+
+    reports.sort(key=lambda r: r["site"])
+    print()
+    print(timing_summary(reports))
+    failed = sum(r["status"] != "ok" for r in reports)
+    print(f"\n{len(reports) - failed}/{len(reports)} sites in {time.perf_counter() - t0:.1f}s → {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from core.dataset import PageDataset
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "SDA_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "semantic-drift-analyzer"),
+)
+DEFAULT_MAX_BYTES = int(os.environ.get("SDA_CACHE_MAX_MB", 2048)) * 1024 * 1024
+
+# Bumped whenever loader / merge output changes, so older entries are never served
+CACHE_FORMAT = 2
+
+
+def file_digest(file, block_size=1 << 20):
+    """SHA-256 of a path or file-like object's full content (file is rewound)."""
+    h = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as fh:
+            for block in iter(lambda: fh.read(block_size), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    file.seek(0)
+    for block in iter(lambda: file.read(block_size), b""):
+        h.update(block)
+    file.seek(0)
+    return h.hexdigest()
+
+
+def cache_key(*digests, **options):
+    """Combine file digests and loader options into one content-addressed key."""
+    payload = json.dumps({"files": digests, "options": options, "format": CACHE_FORMAT}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class DatasetCache:
+    """
+    Persistent cache of parsed crawl / merged PageDatasets keyed by content hash.
+
+    Each entry is a directory holding:
+      embeddings.npy — float32 matrix, opened memory-mapped on a hit
+      meta.parquet   — every other column
+      entry.json     — label, size and last-used time (drives LRU eviction)
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        ds = self.open(key)
+        if ds is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return ds
+
+    def open(self, key):
+        """`get` without counting a hit or miss — for re-reading an entry, not a lookup."""
+        path = self._path(key)
+        info = self._read_info(path)
+        if info is None:
+            return None
+
+        meta = pd.read_parquet(os.path.join(path, "meta.parquet"))
+        matrix = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+
+        info["last_used"] = time.time()
+        self._write_info(path, info)
+        return PageDataset(meta, matrix, normalised=info.get("normalised", False))
+
+    def put(self, key, ds, label=""):
+        path = self._path(key)
+        # Unique per call: sessions of one process may cache the same dataset at once
+        tmp = tempfile.mkdtemp(prefix=f"{key}.tmp-", dir=self.root)
+        try:
+            np.save(os.path.join(tmp, "embeddings.npy"), ds.embeddings)
+            ds.meta.to_parquet(os.path.join(tmp, "meta.parquet"), index=False)
+        except Exception as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            print(f"[DatasetCache WARNING] Could not cache '{label}': {e}")
+            return
+
+        now = time.time()
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        self._write_info(tmp, {
+            "key": key, "label": label, "rows": len(ds), "bytes": size,
+            "normalised": ds.normalised, "created": now, "last_used": now,
+        })
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            # A concurrent put got there first with the same content
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def get_or_compute(self, key, compute, label=""):
+        """Return (dataset, hit) — `compute()` only runs on a miss and its result is stored."""
+        ds = self.get(key)
+        if ds is not None:
+            return ds, True
+        ds = compute()
+        self.put(key, ds, label=label)
+        return ds, False
+
+    def artifact_path(self, key, name):
+        """Path of an extra file kept alongside a cached dataset; None if `key` isn't cached."""
+        path = self._path(key)
+        return os.path.join(path, name) if self._read_info(path) is not None else None
+
+    def save_artifact(self, key, name, write):
+        """Call `write(path)` for a file stored with dataset `key` and count it toward its size."""
+        path = self.artifact_path(key, name)
+        if path is None:
+            return None
+        write(path)
+        entry = self._path(key)
+        info = self._read_info(entry)
+        info["bytes"] = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+        self._write_info(entry, info)
+        return path
+
+    def entries(self):
+        """One row per cached dataset, most recently used first."""
+        rows = []
+        for name in os.listdir(self.root):
+            if ".tmp-" in name:
+                continue
+            info = self._read_info(self._path(name))
+            if info is not None:
+                rows.append(info)
+        cols = ["key", "label", "rows", "bytes", "created", "last_used"]
+        df = pd.DataFrame(rows, columns=cols)
+        for col in ["created", "last_used"]:
+            df[col] = pd.to_datetime(df[col], unit="s")
+        return df.sort_values("last_used", ascending=False).reset_index(drop=True)
+
+    def total_bytes(self):
+        return int(self.entries()["bytes"].sum())
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache fits in `max_bytes`."""
+        entries = self.entries().sort_values("last_used")
+        total = entries["bytes"].sum()
+        for _, row in entries.iterrows():
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._path(row["key"]), ignore_errors=True)
+            total -= row["bytes"]
+
+    def clear(self):
+        # Only dataset entries — other stores (e.g. projections/) may share the root
+        for key in self.entries()["key"]:
+            shutil.rmtree(self._path(key), ignore_errors=True)
+
+    @staticmethod
+    def _read_info(path):
+        try:
+            with open(os.path.join(path, "entry.json")) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_info(path, info):
+        with open(os.path.join(path, "entry.json"), "w") as fh:
+            json.dump(info, fh)
@@ -1,81 +1,477 @@
+import os
+import time
+import uuid
 import pandas as pd
 import numpy as np
-import ast
-from utils.normalise import normalise_url
+import pyarrow as pa
+from utils.normalise import canonicalise_urls, describe_rules, UrlTable, URL_RULES
 import chardet
-from utils.parser import parse_embedding
+from utils.parser import parse_embedding_matrix, arrow_embedding_block, is_arrow_embedding
+from core.dataset import PageDataset
+from utils.instrument import instrumented, annotate
 
+# Crawl columns the pipeline reads besides URL + embedding
+SF_METRIC_COLUMNS = ["Inlinks", "Crawl Depth"]
+
+# Search Console columns merged onto every page (0 when missing)
+GSC_METRICS = ["Clicks", "Impressions", "CTR", "Position"]
+
+# Columnar inputs accepted next to CSV, by file extension (else sniffed from the first bytes)
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+INPUT_EXTENSIONS = (".csv", *PARQUET_EXTENSIONS, *ARROW_EXTENSIONS)
+
+
+def detect_sf_columns(columns):
+    """Return (url_col, embed_col) for a Screaming Frog header."""
+    columns = list(columns)
+
+    # --- Detect URL column ---
+    url_col = next((c for c in columns if c.lower().strip() in ['address', 'url']), None)
+    if not url_col:
+        raise ValueError(f"No Address/URL column found. Columns: {columns}")
+
+    # --- Detect Embedding column ---
+    embed_col = next((c for c in columns if 'embedding' in c.lower()), None)
+    if not embed_col:
+        raise ValueError(f"No embedding column found. Columns: {columns}")
+
+    return url_col, embed_col
+
+
+def _rewind(file):
+    if hasattr(file, "seek"):
+        file.seek(0)
+
+
+def input_format(file):
+    """'parquet', 'arrow' (IPC file / stream, Feather v2) or 'csv' for a path or upload."""
+    ext = os.path.splitext(str(getattr(file, "name", file)).lower())[1]
+    if ext in PARQUET_EXTENSIONS:
+        return "parquet"
+    if ext in ARROW_EXTENSIONS:
+        return "arrow"
+    if ext == ".csv":
+        return "csv"
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as fh:
+            magic = fh.read(6)
+    else:
+        _rewind(file)
+        magic = file.read(6)
+        _rewind(file)
+    if magic[:4] == b"PAR1":
+        return "parquet"
+    if magic == b"ARROW1" or magic[:4] == b"\xff\xff\xff\xff":
+        return "arrow"
+    return "csv"
+
+
+def _arrow_source(file):
+    # Paths are memory-mapped: uncompressed IPC columns are then read without copying
+    if isinstance(file, (str, os.PathLike)):
+        return pa.memory_map(os.fspath(file))
+    _rewind(file)
+    return pa.py_buffer(file.getvalue() if hasattr(file, "getvalue") else file.read())
+
+
+def _arrow_reader(file):
+    try:
+        return pa.ipc.open_file(_arrow_source(file))
+    except pa.ArrowInvalid:
+        return pa.ipc.open_stream(_arrow_source(file))
+
+
+def read_header(file):
+    """Column names of a CSV, Parquet or Arrow IPC export (path or upload) without reading its rows."""
+    fmt = input_format(file)
+    if fmt == "csv":
+        columns = pd.read_csv(file, nrows=0).columns
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        columns = pd.Index(pq.read_schema(file).names)
+    else:
+        columns = pd.Index(_arrow_reader(file).schema.names)
+    _rewind(file)
+    return columns
+
+
+def read_batches(file, columns, batch_rows=5000):
+    """
+    (schema, record batches) of a Parquet or Arrow IPC export, reading only
+    `columns`. Parquet is decoded `batch_rows` at a time; IPC batches are
+    the file's own, memory-mapped for paths, so their buffers aren't copied.
+    """
+    if input_format(file) == "parquet":
+        import pyarrow.parquet as pq
+        _rewind(file)
+        parquet = pq.ParquetFile(file, memory_map=isinstance(file, (str, os.PathLike)))
+        schema = parquet.schema_arrow
+        batches = parquet.iter_batches(batch_size=batch_rows, columns=columns)
+    else:
+        reader = _arrow_reader(file)
+        schema = reader.schema
+        if isinstance(reader, pa.ipc.RecordBatchFileReader):
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = iter(reader)
+        batches = (batch.select(columns) for batch in batches)
+    return schema, batches
+
+
+@instrumented("load_crawl")
 def load_screaming_frog(file):
     """
     Loads Screaming Frog Internal All export, cleans URLs,
-    and ensures embeddings are parsed into numeric float arrays.
+    and parses embeddings into one float32 matrix.
+    Returns a PageDataset (raw embedding text is not kept). Parquet / Arrow
+    exports go through `load_screaming_frog_chunked`, which reads them natively.
     """
+    if input_format(file) != "csv":
+        # Unwrapped: this call already runs inside the "load_crawl" span
+        return load_screaming_frog_chunked.__wrapped__(file)
     df = pd.read_csv(file)
+    url_col, embed_col = detect_sf_columns(df.columns)
 
-    # --- Detect URL column ---
-    url_col = next((c for c in df.columns if c.lower().strip() in ['address', 'url']), None)
-    if not url_col:
-        raise ValueError(f"No Address/URL column found. Columns: {df.columns.tolist()}")
-
-    df['Address'] = df[url_col].apply(normalise_url)
+    df['Address'], df['url_rules'] = canonicalise_urls(df[url_col])
 
-    # --- Detect Embedding column ---
-    embed_col = next((c for c in df.columns if 'embedding' in c.lower()), None)
-    if not embed_col:
-        raise ValueError(f"No embedding column found. Columns: {df.columns.tolist()}")
+    # --- Parse embeddings in bulk into one contiguous float32 matrix ---
+    matrix, row_ids, bad_rows = parse_embedding_matrix(df[embed_col])
+    if bad_rows:
+        first = next(iter(bad_rows.items()))
+        print(
+            f"[load_screaming_frog WARNING] Dropped {len(bad_rows)} rows with malformed "
+            f"embeddings (e.g. row {first[0]}: {first[1]})."
+        )
 
-    # --- Parse embeddings into np.ndarray(float64) ---
-    df['embedding'] = df[embed_col].apply(parse_embedding)
-    df = df.dropna(subset=['embedding']).reset_index(drop=True)
+    df = df.loc[row_ids].drop(columns=[embed_col]).reset_index(drop=True)
 
     # --- Optional sanity check ---
-    if not len(df) or not isinstance(df['embedding'].iloc[0], np.ndarray):
-        raise ValueError("Embedding parsing failed – resulting arrays are invalid.")
+    if not len(df):
+        raise ValueError("Embedding parsing failed – no valid rows in crawl export.")
 
-    return df
+    return PageDataset(df, matrix)
+
+
+@instrumented("load_crawl")
+def load_screaming_frog_chunked(file, extra_columns=None, chunksize=5000, mmap_path=None):
+    """
+    Streaming variant of `load_screaming_frog` for multi-GB crawl exports.
 
-def load_gsc(path):
-    # Detect encoding first (read small sample)
-    raw = path.read()
-    result = chardet.detect(raw)
-    encoding = result["encoding"] or "utf-8"
+    Reads only URL, embedding, Inlinks, Crawl Depth and `extra_columns`,
+    normalises/filters URLs per chunk and writes each chunk's embeddings
+    straight into the output matrix, so the raw embedding text of at most
+    one chunk is alive at a time.
 
-    from io import BytesIO
-    df = pd.read_csv(BytesIO(raw), encoding=encoding)
+    With `mmap_path` the matrix is written to that file and returned as a
+    read-only memmap (peak RAM ≈ one chunk); otherwise it is assembled in
+    memory (peak ≈ 2× the final float32 matrix).
+
+    Parquet and Arrow IPC exports are read column-selectively with
+    pyarrow; a list-of-floats embedding column becomes the matrix straight
+    from its float buffer (`_crawl_from_arrow`), while a text one is parsed
+    in `chunksize` batches like the CSV.
+
+    Returns the same PageDataset as `load_screaming_frog` minus unused
+    crawl columns: meta holds Address, metric + extra columns.
+    """
+    fmt = input_format(file)
+    header = read_header(file)
+    url_col, embed_col = detect_sf_columns(header)
+
+    extra_columns = list(extra_columns or [])
+    missing = [c for c in extra_columns if c not in header]
+    if missing:
+        raise ValueError(f"Requested columns not in crawl export: {missing}")
+
+    meta_cols = [c for c in SF_METRIC_COLUMNS + extra_columns if c in header and c != url_col]
+    meta_cols = list(dict.fromkeys(meta_cols))
+    usecols = list(dict.fromkeys([url_col, embed_col] + meta_cols))
+
+    if fmt == "csv":
+        chunks = pd.read_csv(file, usecols=usecols, chunksize=chunksize)
+    else:
+        schema, batches = read_batches(file, usecols, chunksize)
+        if is_arrow_embedding(schema.field(embed_col).type):
+            return _crawl_from_arrow(batches, url_col, embed_col, meta_cols, mmap_path)
+        chunks = (batch.to_pandas() for batch in batches)
+
+    writer = _EmbeddingWriter(mmap_path)
+    meta_chunks = []
+    dim = None
+    n_invalid = n_malformed = 0
+
+    for chunk in chunks:
+        # --- URL normalisation + the same validity filter merge_data applies ---
+        t0 = time.perf_counter()
+        address, url_rules = canonicalise_urls(chunk[url_col])
+        annotate(canonicalise_s=time.perf_counter() - t0)
+        valid = address.notna() & (address != "") & address.str.startswith("http", na=False)
+        n_invalid += int((~valid).sum())
+        chunk = chunk[valid]
+        address = address[valid]
+        url_rules = pd.Series(url_rules[valid.to_numpy()], index=address.index)
+        if chunk.empty:
+            continue
+
+        t0 = time.perf_counter()
+        matrix, row_ids, bad_rows = parse_embedding_matrix(chunk[embed_col], dim=dim)
+        annotate(parse_s=time.perf_counter() - t0)
+        n_malformed += len(bad_rows)
+        if not len(matrix):
+            continue
+        dim = matrix.shape[1]
+        writer.append(matrix)
+
+        meta = chunk.loc[row_ids, meta_cols]
+        meta.insert(0, "Address", address.loc[row_ids].to_numpy())
+        meta["url_rules"] = url_rules.loc[row_ids].to_numpy()
+        meta_chunks.append(meta)
+
+    if n_invalid:
+        print(f"[load_screaming_frog_chunked] Removed {n_invalid} invalid rows (empty or non-URL).")
+    if n_malformed:
+        print(f"[load_screaming_frog_chunked WARNING] Dropped {n_malformed} rows with malformed embeddings.")
+    matrix = writer.finish(dim)
+    if not meta_chunks:
+        raise ValueError("Embedding parsing failed – no valid rows in crawl export.")
+
+    return PageDataset(pd.concat(meta_chunks, ignore_index=True), matrix)
+
+
+def _crawl_from_arrow(batches, url_col, embed_col, meta_cols, mmap_path=None):
+    """
+    Crawl PageDataset from Arrow record batches with a list-of-floats
+    embedding column — the chunk loop of `load_screaming_frog_chunked`
+    without the text parsing: each batch's float buffer is used as its block
+    of the matrix as is. A single batch with every row valid yields a matrix
+    that is a view on the Arrow memory (on the mapped file for an
+    uncompressed IPC path); several batches are concatenated once.
+    """
+    writer = _EmbeddingWriter(mmap_path)
+    meta_chunks = []
+    dim = None
+    n_invalid = n_malformed = 0
+
+    for batch in batches:
+        t0 = time.perf_counter()
+        address, url_rules = canonicalise_urls(batch.column(url_col).to_pandas())
+        annotate(canonicalise_s=time.perf_counter() - t0)
+        valid = np.array(address.notna() & (address != "") & address.str.startswith("http", na=False), dtype=bool)
+        n_invalid += int((~valid).sum())
+
+        block, ok = arrow_embedding_block(batch.column(embed_col), dim=dim)
+        n_malformed += int((valid & ~ok).sum())
+        keep = valid & ok
+        if not keep.any():
+            continue
+        dim = block.shape[1]
+        writer.append(block if keep.all() else block[keep])
+
+        meta = batch.select(meta_cols).to_pandas()
+        meta.insert(0, "Address", address.to_numpy())
+        meta["url_rules"] = url_rules
+        meta_chunks.append(meta if keep.all() else meta[keep])
+
+    if n_invalid:
+        print(f"[load_screaming_frog_chunked] Removed {n_invalid} invalid rows (empty or non-URL).")
+    if n_malformed:
+        print(f"[load_screaming_frog_chunked WARNING] Dropped {n_malformed} rows with malformed embeddings.")
+    matrix = writer.finish(dim)
+    if not meta_chunks:
+        raise ValueError("Embedding parsing failed – no valid rows in crawl export.")
+
+    return PageDataset(pd.concat(meta_chunks, ignore_index=True), matrix)
+
+
+class _EmbeddingWriter:
+    """Accumulates float32 embedding blocks in RAM or in a raw file for memmapping."""
+
+    def __init__(self, mmap_path=None):
+        self.mmap_path = mmap_path
+        self.blocks = []
+        self.rows = 0
+        self._fh = open(mmap_path, "wb") if mmap_path else None
+
+    def append(self, block):
+        block = np.ascontiguousarray(block, dtype=np.float32)
+        if self._fh is not None:
+            self._fh.write(block.tobytes())
+        else:
+            self.blocks.append(block)
+        self.rows += len(block)
+
+    def finish(self, dim):
+        if self._fh is not None:
+            self._fh.close()
+            if not self.rows:
+                return np.empty((0, dim or 0), dtype=np.float32)
+            return np.memmap(self.mmap_path, dtype=np.float32, mode="r", shape=(self.rows, dim))
+
+        if not self.blocks:
+            return np.empty((0, dim or 0), dtype=np.float32)
+        matrix = np.concatenate(self.blocks) if len(self.blocks) > 1 else self.blocks[0]
+        self.blocks = []
+        return matrix
+
+
+@instrumented("load_gsc")
+def load_gsc(path, chunksize=200_000, sample_bytes=1 << 16):
+    """
+    Stream a Search Console export and aggregate it to one row per canonical page.
+
+    Encoding is detected on the first `sample_bytes` only. Page×query or
+    page×date dumps are folded as they stream: Clicks and Impressions are
+    summed, CTR is re-derived from them and Position is impression-weighted
+    (plain mean for pages without impressions), so memory is bounded by the
+    number of distinct pages, not input rows. Parquet / Arrow IPC exports
+    are read column-selectively and folded per `chunksize` record batch.
+    """
+    fmt = input_format(path)
+    if fmt == "csv":
+        # --- Detect encoding on a bounded sample ---
+        if isinstance(path, (str, os.PathLike)):
+            with open(path, "rb") as fh:
+                sample = fh.read(sample_bytes)
+        else:
+            _rewind(path)
+            sample = path.read(sample_bytes)
+            _rewind(path)
+        encoding = chardet.detect(sample)["encoding"] or "utf-8"
+        if encoding.lower() == "ascii":
+            encoding = "utf-8"  # an ASCII sample says nothing about the rest of the file
+
+        header = pd.read_csv(path, nrows=0, encoding=encoding, encoding_errors="replace").columns
+        _rewind(path)
+    else:
+        encoding, header = fmt, read_header(path)
 
     # --- Identify URL column ---
-    if "Page" in df.columns:
+    if "Page" in header:
         page_col = "Page"
-    elif "Top pages" in df.columns:
+    elif "Top pages" in header:
         page_col = "Top pages"
-    elif "Top Pages" in df.columns:
+    elif "Top Pages" in header:
         page_col = "Top Pages"
     else:
         raise KeyError("Expected 'Page' or 'Top pages' column in GSC export.")
 
-    df.rename(columns={page_col: "Page"}, inplace=True)
-    df["Page"] = df["Page"].apply(normalise_url)
-
-    # --- Clean numeric columns ---
-    num_cols = ["Clicks", "Impressions", "Position"]
-    for col in num_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    metrics = [c for c in GSC_METRICS if c in header]
+    # CTR is re-derived from clicks / impressions whenever both exist
+    derive_ctr = "Clicks" in metrics and "Impressions" in metrics
+    read_cols = [page_col, *(c for c in metrics if not (c == "CTR" and derive_ctr))]
+    partials = []
+    n_rows = 0
+    if fmt == "csv":
+        chunks = pd.read_csv(path, usecols=read_cols, chunksize=chunksize,
+                             encoding=encoding, encoding_errors="replace")
+    else:
+        chunks = (batch.to_pandas() for batch in read_batches(path, read_cols, chunksize)[1])
+    for chunk in chunks:
+        n_rows += len(chunk)
+        partials.append(_aggregate_gsc_chunk(chunk.rename(columns={page_col: "Page"})))
+        # Fold partials together every few chunks so memory tracks distinct pages
+        if len(partials) >= 8:
+            partials = [_combine_gsc(partials)]
+
+    df = _combine_gsc(partials) if partials else pd.DataFrame(columns=["Page", *metrics, "url_rules"])
+    df = _finalise_gsc(df, metrics)
+    annotate(input_rows=n_rows)
+    print(f"[load_gsc] Aggregated {n_rows} rows into {len(df)} pages ({encoding}).")
+    return df
 
-    # --- CTR cleanup (strip '%' and convert to float) ---
-    if "CTR" in df.columns:
-        df["CTR"] = (
-            df["CTR"]
-            .astype(str)
-            .str.replace("%", "", regex=False)
-            .astype(float)
-            .fillna(0)
-        )
 
-    return df
+def _aggregate_gsc_chunk(chunk):
+    """Per-page sums for one chunk: the additive pieces `_finalise_gsc` turns into metrics."""
+    page, url_rules = canonicalise_urls(chunk["Page"])
+    part = pd.DataFrame({"Page": page.to_numpy(), "rows": 1})
 
+    # --- Clean numeric columns ---
+    for col in ["Clicks", "Impressions", "Position"]:
+        if col in chunk:
+            part[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(0).to_numpy()
+    # --- CTR cleanup (strip '%' and convert to float) ---
+    if "CTR" in chunk:
+        part["CTR"] = pd.to_numeric(
+            chunk["CTR"].astype(str).str.replace("%", "", regex=False), errors="coerce"
+        ).fillna(0).to_numpy()
+    if "Position" in part and "Impressions" in part:
+        part["weighted_position"] = part["Position"] * part["Impressions"]
+    # Rule bits as 0/1 columns, so "any variant needed rule X" survives summing
+    for rule, bit in URL_RULES.items():
+        part[f"rule:{rule}"] = (url_rules & bit) > 0
+    return part.groupby("Page", sort=False).sum()
+
+
+def _combine_gsc(partials):
+    return pd.concat(partials).groupby(level=0, sort=False).sum()
+
+
+def _finalise_gsc(df, metrics):
+    """Turn summed pieces into per-page Clicks / Impressions / CTR / Position."""
+    df = df.copy()
+    rows = df.pop("rows") if "rows" in df else 1
+    if "Position" in metrics:
+        weighted = df.pop("weighted_position") if "weighted_position" in df else None
+        mean_position = df["Position"] / rows
+        if weighted is not None:
+            df["Position"] = (weighted / df["Impressions"]).where(df["Impressions"] > 0, mean_position)
+        else:
+            df["Position"] = mean_position
+    if "Clicks" in metrics and "Impressions" in metrics:
+        df["CTR"] = (100 * df["Clicks"] / df["Impressions"]).where(df["Impressions"] > 0, 0.0)
+        metrics = [*metrics, "CTR"] if "CTR" not in metrics else metrics
+    elif "CTR" in metrics:
+        df["CTR"] = df["CTR"] / rows
+
+    url_rules = np.zeros(len(df), dtype=np.uint8)
+    for rule, bit in URL_RULES.items():
+        col = df.pop(f"rule:{rule}") if f"rule:{rule}" in df else None
+        if col is not None:
+            url_rules[col.to_numpy() > 0] |= bit
+    df = df.reset_index()
+    df["url_rules"] = url_rules
+    return df[["Page", *metrics, "url_rules"]]
+
+
+def crawl_rows(sf_df):
+    """
+    Positions of the crawl rows `merge_data` keeps: a non-empty http(s)
+    Address, first row per Address. Expects canonical URLs (as the loaders
+    produce), so the merged pages are known before the GSC file is read.
+    """
+    # --- REMOVE invalid SF rows (critical fix) ---
+    address = sf_df["Address"]
+    valid = (address.notna() & (address.str.strip() != "") & address.str.startswith("http")).fillna(False).to_numpy(dtype=bool)
+    if not valid.all():
+        print(f"[merge_data] Removed {int((~valid).sum())} invalid SF rows (empty or non-URL).")
+
+    # --- Deduplicate SF rows by Address (critical fix) ---
+    dupes = valid & address.duplicated(keep=False).to_numpy()
+    if dupes.any():
+        print(f"[merge_data WARNING] {int(dupes.sum())} duplicated SF rows detected. Deduplicating.")
+        valid = valid & ~address.duplicated(keep="first").to_numpy()
+    return np.flatnonzero(valid)
+
+
+@instrumented("merge")
+def merge_data(sf, gsc_df, fold_www=False, fold_protocol=False, mmap_path=None):
+    """
+    Left-join GSC metrics onto the crawl PageDataset by canonical URL.
+
+    Both sides' URLs are interned into one integer-keyed URL table and the
+    join is an integer lookup (first GSC row per URL). `fold_www` /
+    `fold_protocol` also treat www./non-www and http/https as the same page.
+    A "URL Match" column records which canonicalisation rules each match
+    relied on, or which disabled folding rule would have matched a miss.
+    Returns a PageDataset whose embedding rows follow the merged metadata.
+    A memory-mapped crawl matrix stays memory-mapped: dropped rows are
+    gathered block by block into `mmap_path` (default: beside its file).
+    """
+    # Track each crawl row's matrix position through filtering and the join
+    sf_df = sf.meta.copy(deep=False)
+    sf_df["_row"] = np.arange(len(sf_df))
 
-def merge_data(sf_df, gsc_df):
     # --- 1. Ensure the GSC URL column is standardised ---
     gsc_url_cols = [
         c for c in gsc_df.columns
@@ -94,66 +490,99 @@ def merge_data(sf_df, gsc_df):
         print(f"[merge_data] Renaming '{gsc_url_col}' → 'Page'")
         gsc_df = gsc_df.rename(columns={gsc_url_col: "Page"})
 
-    # --- 2. URL normalisation ---
-    sf_df["Address"] = sf_df["Address"].astype(str).str.strip().str.lower()
-    gsc_df["Page"] = gsc_df["Page"].astype(str).str.strip().str.lower()
-
-    # --- 3. REMOVE invalid SF rows (critical fix) ---
-    before = len(sf_df)
-    sf_df = sf_df[
-        sf_df["Address"].notna() &
-        (sf_df["Address"].str.strip() != "") &
-        (sf_df["Address"].str.startswith("http"))
-    ]
-    after = len(sf_df)
-    if after < before:
-        print(f"[merge_data] Removed {before - after} invalid SF rows (empty or non-URL).")
-
-    # --- 4. Deduplicate SF rows by Address (critical fix) ---
-    if sf_df["Address"].duplicated().any():
-        dupes = sf_df[sf_df["Address"].duplicated(keep=False)]
-        print(f"[merge_data WARNING] {len(dupes)} duplicated SF rows detected. Deduplicating.")
-        sf_df = sf_df.drop_duplicates(subset=["Address"], keep="first")
-
-    # --- 5. Perform merge ---
-    df = sf_df.merge(gsc_df, left_on="Address", right_on="Page", how="left")
+    # --- 2. URL canonicalisation (already done by the loaders) ---
+    if "url_rules" not in sf_df:
+        sf_df["Address"], sf_df["url_rules"] = canonicalise_urls(sf_df["Address"])
+    if "url_rules" not in gsc_df:
+        gsc_df = gsc_df.copy()
+        gsc_df["Page"], gsc_df["url_rules"] = canonicalise_urls(gsc_df["Page"])
+
+    # --- 3./4. Drop invalid and duplicate SF rows ---
+    sf_df = sf_df.iloc[crawl_rows(sf_df)]
+
+    # --- 5. Integer-keyed join through an interned URL table ---
+    sf_rules = sf_df.pop("url_rules").to_numpy(dtype=np.uint8)
+    gsc_rules = gsc_df["url_rules"].to_numpy(dtype=np.uint8)
+    gsc_rows, sf_fold, gsc_fold = _join_rows(sf_df["Address"], gsc_df["Page"], fold_www, fold_protocol)
+    matched = gsc_rows >= 0
+    n_repeats = int(gsc_df["Page"].dropna().duplicated().sum())
+    if n_repeats:
+        print(f"[merge_data WARNING] {n_repeats} GSC rows repeat a URL; keeping the first.")
+
+    gsc_part = gsc_df.drop(columns=["url_rules"]).reset_index(drop=True).reindex(gsc_rows)
+    # GSC metric columns win over crawl columns of the same name; other overlaps keep the crawl value
+    gsc_part = gsc_part.drop(columns=[c for c in gsc_part.columns if c in sf_df and c not in GSC_METRICS])
+    df = sf_df.drop(columns=[c for c in gsc_part.columns if c in sf_df]).reset_index(drop=True)
+    df = pd.concat([df, gsc_part.reset_index(drop=True)], axis=1)
 
     # --- 6. Diagnostics ---
     total_sf = len(sf_df)
-    matched = df["Page"].notna().sum()
-    print(f"[merge_data] Matched {matched}/{total_sf} URLs")
-
-    # ------------------------------------------------------------------
-    #         7. Normalise GSC metric columns (_x, _y → canonical)
-    # ------------------------------------------------------------------
-    metrics = ["Clicks", "Impressions", "CTR", "Position"]
-
-    for m in metrics:
-        if f"{m}_y" in df.columns:
-            df[m] = df[f"{m}_y"]
-        elif f"{m}_x" in df.columns:
-            df[m] = df[f"{m}_x"]
-        elif m not in df.columns:
+    print(f"[merge_data] Matched {int(matched.sum())}/{total_sf} URLs")
+
+    # A rule bridged the pair only if it changed one side's URL and not the other's
+    safe_rows = np.maximum(gsc_rows, 0)
+    match_rules = (sf_rules | sf_fold) ^ (gsc_rules | gsc_fold)[safe_rows]
+    labels = np.array([describe_rules(m) for m in range(128)], dtype=object)
+    df["URL Match"] = np.where(matched, labels[match_rules], "unmatched")
+    if not (fold_www and fold_protocol) and (~matched).any():
+        # Which disabled folding rule would have matched the misses
+        folded_rows, sf_fold, gsc_fold = _join_rows(sf_df["Address"], gsc_df["Page"], True, True)
+        near = ~matched & (folded_rows >= 0)
+        if near.any():
+            needed = (sf_fold[near] ^ gsc_fold[folded_rows[near]]) & (URL_RULES["www"] | URL_RULES["protocol"])
+            df.loc[near, "URL Match"] = [f"unmatched (would match with {describe_rules(m)} folding)" for m in needed]
+    for rule, count in df["URL Match"].value_counts().items():
+        print(f"[merge_data]   {rule}: {count}")
+
+    # --- 7. Safe fill of GSC metric columns ---
+    for m in GSC_METRICS:
+        if m not in df.columns:
             df[m] = 0  # created late, but required
-
-        # Drop suffix variants
-        for col in [f"{m}_x", f"{m}_y"]:
-            if col in df.columns:
-                df.drop(columns=[col], inplace=True, errors="ignore")
-
-    # --- 8. Safe fill ---
-    for m in metrics:
         df[m] = pd.to_numeric(df[m], errors="coerce").fillna(0)
 
-    return df
-
+    rows = df.pop("_row").to_numpy()
+    if np.array_equal(rows, np.arange(len(sf))):
+        return PageDataset(df, sf.embeddings, sf.normalised)
+    if isinstance(sf.embeddings, np.memmap) and sf.embeddings.filename:
+        return PageDataset(df, _gather_rows(sf.embeddings, rows, mmap_path), sf.normalised)
+    return PageDataset(df, sf.embeddings[rows], sf.normalised)
 
 
-
-def parse_embedding(value):
-    try:
-        if isinstance(value, str):
-            return np.array(ast.literal_eval(value))
-    except Exception:
-        return np.nan
-    return np.nan
+def _gather_rows(matrix, rows, mmap_path=None, block_rows=8192):
+    """
+    `matrix[rows]` for a memmap, written block by block to a new memmap so
+    the matrix never sits in RAM whole. The file is written under a
+    temporary name and renamed into place, so concurrent merges can't
+    interleave.
+    """
+    if not len(rows):
+        return matrix[rows]
+    path = mmap_path or os.path.splitext(matrix.filename)[0] + ".merged.f32"
+    tmp = f"{path}.tmp-{uuid.uuid4().hex}"
+    writer = _EmbeddingWriter(tmp)
+    for start in range(0, len(rows), block_rows):
+        writer.append(matrix[rows[start:start + block_rows]])
+    writer.finish(matrix.shape[1])
+    os.replace(tmp, path)
+    return np.memmap(path, dtype=np.float32, mode="r", shape=(len(rows), matrix.shape[1]))
+
+
+@instrumented("merge.join")
+def _join_rows(sf_urls, gsc_urls, fold_www, fold_protocol):
+    """
+    GSC row position for each crawl URL (-1 = no match), via integer ids from
+    one URL table. Also returns the folding-rule masks of both sides.
+    """
+    sf_fold = np.zeros(len(sf_urls), dtype=np.uint8)
+    gsc_fold = np.zeros(len(gsc_urls), dtype=np.uint8)
+    if fold_www or fold_protocol:
+        sf_urls, sf_fold = canonicalise_urls(sf_urls, fold_www=fold_www, fold_protocol=fold_protocol)
+        gsc_urls, gsc_fold = canonicalise_urls(gsc_urls, fold_www=fold_www, fold_protocol=fold_protocol)
+    table = UrlTable()
+    sf_ids, gsc_ids = table.intern_many(sf_urls, gsc_urls)
+
+    # First GSC row per URL id: write positions in reverse so the earliest wins
+    first = np.full(len(table), -1, dtype=np.int64)
+    rows = np.flatnonzero(gsc_ids >= 0)[::-1]
+    first[gsc_ids[rows]] = rows
+    return np.where(sf_ids >= 0, first[np.maximum(sf_ids, 0)], -1), sf_fold, gsc_fold
@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from core.quantize import QuantizedMatrix
+
+
+@dataclass
+class PageDataset:
+    """
+    One crawl's pages: metadata rows plus a single shared embedding matrix.
+
+    `embeddings[i]` belongs to `meta.iloc[i]`. The matrix is float32 and
+    C-contiguous (a read-only memmap when it comes from the cache), and is
+    never copied per row — operations that keep every row share it. It can
+    also be a `QuantizedMatrix` (see core/quantize.py), which supports the
+    mat-vec products the drift metrics need.
+    """
+
+    meta: pd.DataFrame
+    embeddings: np.ndarray
+    normalised: bool = False
+    _norms: np.ndarray = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if not isinstance(self.embeddings, (np.memmap, QuantizedMatrix)):
+            self.embeddings = np.ascontiguousarray(self.embeddings, dtype=np.float32)
+        if self.embeddings.ndim != 2:
+            raise ValueError(f"Embeddings must be 2-D, got shape {self.embeddings.shape}")
+        if len(self.meta) != len(self.embeddings):
+            raise ValueError(
+                f"Metadata has {len(self.meta)} rows but embedding matrix has {len(self.embeddings)}."
+            )
+        self.meta = self.meta.reset_index(drop=True)
+
+    def __len__(self):
+        return len(self.meta)
+
+    @property
+    def dim(self):
+        return self.embeddings.shape[1]
+
+    @property
+    def quantized(self):
+        return isinstance(self.embeddings, QuantizedMatrix)
+
+    @property
+    def norms(self):
+        """Row L2 norms, computed once (einsum: no n × d temporary, so memmaps stay on disk)."""
+        if self._norms is None and self.quantized:
+            self._norms = self.embeddings.norms
+        elif self._norms is None:
+            self._norms = np.ones(len(self), dtype=np.float32) if self.normalised \
+                else np.sqrt(np.einsum("ij,ij->i", self.embeddings, self.embeddings))
+        return self._norms
+
+    def copy(self):
+        """New metadata frame (columns can be added freely), same embedding matrix."""
+        return PageDataset(self.meta.copy(deep=False), self.embeddings, self.normalised, self._norms)
+
+    def take(self, rows):
+        """Subset / reorder by positional row indices."""
+        rows = np.asarray(rows)
+        if len(rows) == len(self) and np.array_equal(rows, np.arange(len(self))):
+            return self.copy()
+        norms = None if self._norms is None else self._norms[rows]
+        return PageDataset(self.meta.iloc[rows], self.embeddings[rows], self.normalised, norms)
+
+    def full_precision(self):
+        """Same pages with a float32 matrix (dequantised if needed) — for projection / neighbours."""
+        if not self.quantized:
+            return self.copy()
+        return PageDataset(self.meta.copy(deep=False), self.embeddings.dequantize(), self.normalised, self._norms)
+
+    def normalise(self):
+        """Unit-length rows (cosine similarity becomes a plain dot product)."""
+        if self.normalised:
+            return self.copy()
+        unit = self.embeddings / np.maximum(self.norms, 1e-12)[:, None]
+        return PageDataset(self.meta.copy(deep=False), unit, normalised=True)
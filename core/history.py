@@ -0,0 +1,224 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from core.cache import DEFAULT_CACHE_DIR
+from core.processing import weighted_centroid, reweight, add_zones
+from core.projection_store import embedding_hashes
+from utils.instrument import instrumented
+
+DEFAULT_HISTORY_DIR = os.environ.get("SDA_HISTORY_DIR", os.path.join(DEFAULT_CACHE_DIR, "history"))
+
+
+class DriftHistory:
+    """
+    Append-only record of drift runs per site, partitioned by crawl date:
+
+      <site>/crawl_date=YYYY-MM-DD/run-<ms>.parquet — per-page hash, link value, distance, SDI, zone
+      <site>/crawl_date=YYYY-MM-DD/run-<ms>.json    — centroid, weights, link column, page count
+
+    Files are never rewritten. Recording a crawl date again adds a newer run,
+    which queries prefer; older runs stay on disk.
+    """
+
+    def __init__(self, root=DEFAULT_HISTORY_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _site_dir(self, site):
+        return os.path.join(self.root, site.replace(":", "_"))
+
+    def sites(self):
+        return sorted(os.listdir(self.root))
+
+    # ------------------------------------------------------------------
+    #         Write
+    # ------------------------------------------------------------------
+    def record(self, site, crawl_date, meta, centroid, hashes, link_col="Inlinks", weights=None, reference=None):
+        """
+        Append one run. `meta` needs Address, distance_from_centre, SDI, zone and
+        `link_col`; `reference` is the centre distances were measured from when
+        it is not this crawl's own centroid (see `incremental_drift`).
+        """
+        crawl_date = str(pd.Timestamp(crawl_date).date())
+        part = os.path.join(self._site_dir(site), f"crawl_date={crawl_date}")
+        os.makedirs(part, exist_ok=True)
+        run = f"run-{int(time.time() * 1000)}"
+
+        pages = pd.DataFrame({
+            "Address": meta["Address"].to_numpy(),
+            "hash": np.asarray(hashes),
+            "link": meta[link_col].to_numpy(dtype=np.float64),
+            "distance_from_centre": meta["distance_from_centre"].to_numpy(dtype=np.float64),
+            "SDI": meta["SDI"].to_numpy(dtype=np.float64),
+            "zone": meta["zone"].astype(str).to_numpy(),
+        })
+        info = {
+            "site": site,
+            "crawl_date": crawl_date,
+            "run": run,
+            "recorded_at": time.time(),
+            "pages": len(pages),
+            "link_col": link_col,
+            "weights": weights or {},
+            "centroid": np.asarray(centroid, dtype=np.float64).tolist(),
+            "reference": np.asarray(centroid if reference is None else reference, dtype=np.float64).tolist(),
+        }
+        # Parquet first, JSON last: a run only counts once its JSON exists
+        tmp = os.path.join(part, f".{run}.tmp")
+        pages.to_parquet(tmp, index=False)
+        os.replace(tmp, os.path.join(part, f"{run}.parquet"))
+        with open(os.path.join(part, f".{run}.json.tmp"), "w") as fh:
+            json.dump(info, fh)
+        os.replace(os.path.join(part, f".{run}.json.tmp"), os.path.join(part, f"{run}.json"))
+        return info
+
+    # ------------------------------------------------------------------
+    #         Read
+    # ------------------------------------------------------------------
+    def runs(self, site):
+        """Every recorded run for a site (oldest first), without per-page data."""
+        site_dir = self._site_dir(site)
+        rows = []
+        if os.path.isdir(site_dir):
+            for part in sorted(os.listdir(site_dir)):
+                if not part.startswith("crawl_date="):
+                    continue
+                for name in sorted(os.listdir(os.path.join(site_dir, part))):
+                    if name.startswith("run-") and name.endswith(".json"):
+                        with open(os.path.join(site_dir, part, name)) as fh:
+                            rows.append(json.load(fh))
+        return pd.DataFrame(rows, columns=["crawl_date", "run", "recorded_at", "pages", "link_col", "centroid", "reference"])
+
+    def crawls(self, site):
+        """Latest run per crawl date (oldest first)."""
+        runs = self.runs(site)
+        return runs.sort_values(["crawl_date", "run"]).drop_duplicates("crawl_date", keep="last").reset_index(drop=True)
+
+    def load(self, site, crawl_date=None, on_or_before=False):
+        """
+        (pages DataFrame, run info) for a crawl date — the latest crawl when
+        None, the latest crawl not after it when `on_or_before`. None if absent.
+        """
+        crawls = self.crawls(site)
+        if crawl_date is not None:
+            crawl_date = str(pd.Timestamp(crawl_date).date())
+            crawls = crawls[crawls["crawl_date"] <= crawl_date] if on_or_before \
+                else crawls[crawls["crawl_date"] == crawl_date]
+        if crawls.empty:
+            return None
+        info = crawls.iloc[-1].to_dict()
+        path = os.path.join(self._site_dir(site), f"crawl_date={info['crawl_date']}", f"{info['run']}.parquet")
+        return pd.read_parquet(path), info
+
+    def centroid_shift(self, site):
+        """Cosine distance of each crawl's centroid from the previous and from the first crawl."""
+        crawls = self.crawls(site)
+        if crawls.empty:
+            return pd.DataFrame(columns=["crawl_date", "pages", "shift_from_previous", "shift_from_first"])
+        centroids = np.array(crawls["centroid"].tolist(), dtype=np.float64)
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        from_previous = np.r_[np.nan, 1 - np.sum(centroids[1:] * centroids[:-1], axis=1)]
+        return pd.DataFrame({
+            "crawl_date": crawls["crawl_date"],
+            "pages": crawls["pages"],
+            "shift_from_previous": from_previous,
+            "shift_from_first": 1 - centroids @ centroids[0],
+        })
+
+    def zone_changes(self, site, since=None, until=None):
+        """
+        Pages whose zone differs between the crawl at `until` (latest if None)
+        and the last crawl on or before `since` (the previous crawl if None).
+        New and removed pages are included with a missing zone on one side.
+        """
+        current = self.load(site, until, on_or_before=True)
+        if current is None:
+            raise ValueError(f"No recorded crawls for {site}.")
+        now, now_info = current
+        if since is None:
+            earlier = self.crawls(site)
+            earlier = earlier[earlier["crawl_date"] < now_info["crawl_date"]]
+            since = earlier["crawl_date"].iloc[-1] if len(earlier) else None
+        before = self.load(site, since, on_or_before=True) if since is not None else None
+        if before is None or before[1]["crawl_date"] == now_info["crawl_date"]:
+            raise ValueError(f"No crawl of {site} recorded before {now_info['crawl_date']} to compare with.")
+        then, then_info = before
+
+        cols = ["Address", "zone", "distance_from_centre", "SDI"]
+        joined = then[cols].merge(now[cols], on="Address", how="outer", suffixes=(" before", " now"))
+        changed = joined[joined["zone before"].fillna("—") != joined["zone now"].fillna("—")].copy()
+        changed["SDI change"] = changed["SDI now"] - changed["SDI before"]
+        changed.attrs.update(since=then_info["crawl_date"], until=now_info["crawl_date"])
+        return changed.sort_values("SDI change", ascending=False, na_position="last", ignore_index=True)
+
+
+@instrumented("centroid")
+def incremental_drift(ds, history, site, alpha=0.6, beta=0.3, gamma=0.1, link_col="Inlinks",
+                      hashes=None, basis=None, pin_centre=False, tolerance=1e-6):
+    """
+    `compute_centroid` + `add_zones`, reusing the site's last recorded run.
+
+    Distances are measured from a reference centre. By default that is this
+    crawl's centroid, so recorded distances are only reusable when it moved
+    less than `tolerance` (cosine) since the last run. With `pin_centre` the
+    reference stays the last run's centre — distances are comparable across
+    crawls and every page with an unchanged embedding hash keeps its recorded
+    distance, so only new/changed pages are projected. SDI and zones are
+    column maths and always follow the current link values.
+
+    Pass the run's `CentroidBasis` (the app's basis stage) as `basis` and
+    the centroid costs O(d); distances from an unpinned centre then come
+    from its dot products in O(n), so only the pages re-measured against a
+    pinned centre read the matrix. Pass `hashes` when already computed.
+
+    Returns (centroid, reference, ds, hashes, report). Record the run with
+    `history.record(..., reference=reference)`.
+    """
+    df = ds.meta
+    emb = ds.embeddings
+    hashes = embedding_hashes(emb) if hashes is None else np.asarray(hashes)
+    if basis is not None:
+        centroid = basis.centroid(alpha, beta, gamma)
+    else:
+        centroid = weighted_centroid(ds, alpha, beta, gamma, link_col)
+    reference = centroid
+
+    previous = history.load(site) if history is not None else None
+    reuse = np.zeros(len(ds), dtype=bool)
+    shift = None
+    if previous is not None:
+        prev_pages, prev_info = previous
+        prev_reference = np.asarray(prev_info["reference"], dtype=np.float64)
+        prev_reference /= np.linalg.norm(prev_reference)
+        shift = float(1 - centroid @ prev_reference)
+        if pin_centre or shift <= tolerance:
+            reference = prev_reference
+            match = prev_pages.drop_duplicates("Address").set_index("Address").reindex(df["Address"].to_numpy())
+            reuse = match["hash"].to_numpy() == hashes
+
+    rows = np.flatnonzero(~reuse)
+    if basis is not None and reference is centroid:
+        # Every distance from the basis dot products: O(n), no embedding access
+        reweight(ds, basis, alpha, beta, gamma, link_col)
+    else:
+        distance = np.empty(len(ds), dtype=np.float64)
+        if reuse.any():
+            distance[reuse] = match["distance_from_centre"].to_numpy()[reuse]
+        if len(rows) == len(ds):
+            distance[:] = 1 - (emb @ reference.astype(np.float32)) / ds.norms
+        elif len(rows):
+            sub = emb[rows]
+            norms = ds._norms[rows] if ds._norms is not None else np.linalg.norm(sub, axis=1)
+            distance[rows] = 1 - (sub @ reference.astype(np.float32)) / norms
+        df["distance_from_centre"] = distance
+        df["SDI"] = (df[link_col] / df[link_col].max()) * df["distance_from_centre"]
+    add_zones(df)
+    report = {
+        "reused": int(reuse.sum()),
+        "recomputed": int(len(rows)),
+        "centroid_shift": shift,
+        "pinned": reference is not centroid,
+    }
+    return centroid, reference, ds, hashes, report
@@ -1,12 +1,191 @@
 import numpy as np
 import pandas as pd
 
-def get_kpis(df):
-    cohesion = df['similarity'].mean()
-    focus_drift = (df['distance'] <= df['distance'].quantile(0.5)).sum() / len(df)
-    avg_ndi = df['NDI'].mean()
-    return {
-        "Topical Cohesion": round(cohesion, 3),
-        "Focus-Drift Ratio": round(focus_drift, 3),
-        "Average NDI": round(avg_ndi, 3)
-    }
+# Orbit zones by normalised distance (upper bound inclusive)
+ZONES = [(0.25, "Core"), (0.5, "Focus"), (0.75, "Expansion"), (np.inf, "Peripheral")]
+
+# name → (dependencies, fn(PageMetrics) → array or scalar)
+PAGE_METRICS = {}
+SITE_KPIS = {}
+
+
+def page_metric(name, *deps, registry=PAGE_METRICS):
+    """Register a derived page column. Names starting with "_" are shared intermediates."""
+    def register(fn):
+        registry[name] = (deps, fn)
+        return fn
+    return register
+
+
+def site_kpi(name, *deps):
+    return page_metric(name, *deps, registry=SITE_KPIS)
+
+
+class PageMetrics:
+    """
+    Lazily evaluated page metrics over one page table.
+
+    Inputs are the table's own columns (distance_from_centre, the link
+    column, Crawl Depth, …). Every derived column declares what it depends on and
+    is computed at most once, in one vectorised pass, the first time
+    something asks for it — so intermediates such as normalised links or
+    percentiles are shared, and `frame` only materialises the columns a
+    view or export actually requests.
+    """
+
+    def __init__(self, df, link_col="Inlinks"):
+        self.df = df
+        self.link_col = link_col
+        self._values = {}
+
+    @staticmethod
+    def available():
+        """Public derived page columns (intermediates excluded)."""
+        return [name for name in PAGE_METRICS if not name.startswith("_")]
+
+    def __getitem__(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name in PAGE_METRICS:
+            deps, fn = PAGE_METRICS[name]
+        elif name in SITE_KPIS:
+            deps, fn = SITE_KPIS[name]
+        elif name in self.df.columns:
+            return self.df[name].to_numpy()
+        else:
+            raise KeyError(f"Unknown page metric or column '{name}'.")
+        for dep in deps:
+            self[dep]
+        value = fn(self)
+        self._values[name] = value
+        return value
+
+    def frame(self, columns):
+        """DataFrame of exactly `columns` (table columns and/or derived metrics)."""
+        return pd.DataFrame({c: self[c] for c in columns}, index=self.df.index)
+
+    def add(self, columns):
+        """Write the requested derived columns into the page table; returns it."""
+        for c in columns:
+            self.df[c] = self[c]
+        return self.df
+
+    def kpis(self):
+        return {name: round(float(self[name]), 3) for name in SITE_KPIS}
+
+
+def minmax(x):
+    """Rescale to 0–1 (0 everywhere for a constant column)."""
+    x = np.nan_to_num(np.asarray(x, dtype=np.float64))
+    span = x.max() - x.min() if len(x) else 0.0
+    return (x - x.min()) / span if span else np.zeros_like(x)
+
+
+def zscore(x):
+    """Standard score with population std (0 everywhere for a constant column)."""
+    x = np.nan_to_num(np.asarray(x, dtype=np.float64))
+    std = x.std()
+    return (x - x.mean()) / std if std else np.zeros_like(x)
+
+
+def zone_labels(normalized_distance):
+    """Vectorised orbit zone for each normalised distance."""
+    nd = np.asarray(normalized_distance, dtype=np.float64)
+    return np.select([nd <= bound for bound, _ in ZONES], [label for _, label in ZONES],
+                     default=ZONES[-1][1]).astype(object)
+
+
+# --- Shared intermediates ---
+
+@page_metric("_link")
+def _link(m):
+    return np.nan_to_num(m.df[m.link_col].to_numpy(dtype=np.float64))
+
+
+@page_metric("_link_norm", "_link")
+def _link_norm(m):
+    top = m["_link"].max() if len(m["_link"]) else 0
+    return m["_link"] / top if top else np.zeros_like(m["_link"])
+
+
+@page_metric("_distance_pct", "distance")
+def _distance_pct(m):
+    return np.percentile(m["distance"], [25, 50, 75])
+
+
+@page_metric("_ia_pct", "IA")
+def _ia_pct(m):
+    return np.percentile(m["IA"], [25, 75])
+
+
+# --- Page columns ---
+
+@page_metric("distance")
+def _distance(m):
+    # Cosine distance to the weighted centroid; a table from `add_similarity_metrics` has it as "distance"
+    col = "distance_from_centre" if "distance_from_centre" in m.df.columns else "distance"
+    return m.df[col].to_numpy(dtype=np.float64)
+
+
+@page_metric("similarity", "distance")
+def _similarity(m):
+    return 1 - m["distance"]
+
+
+@page_metric("SDI", "_link_norm", "distance")
+def _sdi(m):
+    return m["_link_norm"] * m["distance"]
+
+
+@page_metric("normalized_distance", "distance")
+def _normalized_distance(m):
+    top = m["distance"].max()
+    return m["distance"] / top if top else np.zeros_like(m["distance"])
+
+
+@page_metric("zone", "normalized_distance")
+def _zone(m):
+    return zone_labels(m["normalized_distance"])
+
+
+@page_metric("IA", "_link", "Crawl Depth")
+def _ia(m):
+    depth = np.nan_to_num(m["Crawl Depth"].astype(np.float64))
+    return minmax(m["_link"]) * minmax(1 / (1 + depth))
+
+
+@page_metric("NDI", "IA", "distance")
+def _ndi(m):
+    return zscore(m["IA"]) * zscore(m["distance"])
+
+
+@page_metric("NavBoost Category", "IA", "distance", "_ia_pct", "_distance_pct")
+def _navboost(m):
+    ia, dist = m["IA"], m["distance"]
+    (ia25, ia75), (d25, _, d75) = m["_ia_pct"], m["_distance_pct"]
+    return np.select([
+        (ia >= ia75) & (dist >= d75),
+        (ia <= ia25) & (dist <= d25),
+        (ia <= ia25) & (dist >= d75),
+    ], ["Misaligned Core", "Underlinked Core", "Junk Drift"], default="Healthy Core").astype(object)
+
+
+# --- Site KPIs ---
+
+@site_kpi("Topical Cohesion", "similarity")
+def _cohesion(m):
+    return m["similarity"].mean()
+
+
+@site_kpi("Focus-Drift Ratio", "distance", "_distance_pct")
+def _focus_drift(m):
+    return (m["distance"] <= m["_distance_pct"][1]).mean()
+
+
+@site_kpi("Average NDI", "NDI")
+def _average_ndi(m):
+    return m["NDI"].mean()
+
+
+def get_kpis(df, link_col="Inlinks"):
+    return PageMetrics(df, link_col).kpis()
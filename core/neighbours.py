@@ -0,0 +1,228 @@
+import time
+import numpy as np
+import pandas as pd
+
+
+def _unit_rows(x):
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def _merge_topk(best_idx, best_sim, cand_idx, cand_sim, k):
+    """Merge candidate (idx, sim) blocks into running top-k arrays, row by row."""
+    idx = np.concatenate([best_idx, cand_idx], axis=1)
+    sim = np.concatenate([best_sim, cand_sim], axis=1)
+    if sim.shape[1] > k:
+        part = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        idx = np.take_along_axis(idx, part, axis=1)
+        sim = np.take_along_axis(sim, part, axis=1)
+    return idx, sim
+
+
+def _sort_topk(idx, sim):
+    order = np.argsort(-sim, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(sim, order, axis=1)
+
+
+class NeighbourIndex:
+    """
+    Cosine top-k search over page embeddings.
+
+    Small sites use exact blocked brute force. Above `exact_threshold`
+    pages an IVF index is built: spherical k-means splits pages into
+    `n_lists` inverted lists and each query only scans its `n_probe`
+    nearest lists. Row ids are positions in the PageDataset.
+    """
+
+    def __init__(self, method="auto", n_lists=None, n_probe=10, exact_threshold=20000,
+                 block_size=1024, seed=42):
+        if method not in ("auto", "exact", "ivf"):
+            raise ValueError(f"Unknown neighbour index method '{method}'. Options: auto, exact, ivf")
+        self.method = method
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.exact_threshold = exact_threshold
+        self.block_size = block_size
+        self.seed = seed
+        self.vectors = None
+        self.centroids = None
+        self.list_rows = None
+        self.list_offsets = None
+
+    # ------------------------------------------------------------------
+    #         Build / persist
+    # ------------------------------------------------------------------
+    def build(self, embeddings, normalised=False):
+        self.vectors = np.ascontiguousarray(embeddings, dtype=np.float32) if normalised else _unit_rows(embeddings)
+        n = len(self.vectors)
+        if self.method == "auto":
+            self.method = "exact" if n <= self.exact_threshold else "ivf"
+        if self.method == "ivf":
+            self.n_lists = self.n_lists or max(1, int(np.sqrt(n)))
+            self.centroids = self._spherical_kmeans(self.n_lists)
+            assign = self._nearest_lists(self.vectors, 1)[:, 0]
+            self.list_rows = np.argsort(assign, kind="stable").astype(np.int64)
+            self.list_offsets = np.searchsorted(assign[self.list_rows], np.arange(self.n_lists + 1))
+        return self
+
+    def _spherical_kmeans(self, n_lists, iterations=15):
+        rng = np.random.default_rng(self.seed)
+        n = len(self.vectors)
+        sample = self.vectors[rng.choice(n, size=min(n, 64 * n_lists), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = ~np.bincount(assign, minlength=n_lists).astype(bool)
+            # Re-seed empty lists from random sample rows
+            sums[empty] = sample[rng.choice(len(sample), size=empty.sum(), replace=False)]
+            centroids = _unit_rows(sums)
+        return centroids
+
+    def _nearest_lists(self, queries, n_probe):
+        scores = queries @ self.centroids.T
+        n_probe = min(n_probe, len(self.centroids))
+        return np.argpartition(-scores, n_probe - 1, axis=1)[:, :n_probe]
+
+    def save(self, path):
+        """Store the index structure (not the embeddings) as .npz."""
+        arrays = {
+            "method": np.array(self.method),
+            "n_lists": np.array(self.n_lists or 0),
+            "n_probe": np.array(self.n_probe),
+            "n_pages": np.array(len(self.vectors)),
+        }
+        if self.method == "ivf":
+            arrays.update(centroids=self.centroids, list_rows=self.list_rows, list_offsets=self.list_offsets)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path, embeddings, normalised=False):
+        data = np.load(path)
+        n = int(data["n_pages"])
+        if n != len(embeddings):
+            raise ValueError(f"Saved index covers {n} pages, dataset has {len(embeddings)}.")
+        index = cls(method=str(data["method"]), n_lists=int(data["n_lists"]) or None, n_probe=int(data["n_probe"]))
+        index.vectors = np.ascontiguousarray(embeddings, dtype=np.float32) if normalised else _unit_rows(embeddings)
+        if index.method == "ivf":
+            index.centroids = data["centroids"]
+            index.list_rows = data["list_rows"]
+            index.list_offsets = data["list_offsets"]
+        return index
+
+    # ------------------------------------------------------------------
+    #         Search
+    # ------------------------------------------------------------------
+    def search(self, queries, k=10, query_rows=None, exact=False):
+        """
+        Top-k most similar pages for each query vector.
+
+        `query_rows` (page row ids of the queries) excludes each page from
+        its own results. Returns (indices, similarities), both (q × k),
+        sorted by descending similarity; missing slots are -1 / -inf.
+        """
+        queries = _unit_rows(np.atleast_2d(queries))
+        k = min(k, len(self.vectors) - (query_rows is not None))
+        if exact or self.method == "exact":
+            return self._search_exact(queries, k, query_rows)
+        return self._search_ivf(queries, k, query_rows)
+
+    def _search_exact(self, queries, k, query_rows):
+        out_idx = np.empty((len(queries), k), dtype=np.int64)
+        out_sim = np.empty((len(queries), k), dtype=np.float32)
+        # Keep each (block × n) similarity slab around 64 MB
+        step = max(1, min(self.block_size, (1 << 24) // max(len(self.vectors), 1)))
+        for start in range(0, len(queries), step):
+            block = slice(start, start + step)
+            sims = queries[block] @ self.vectors.T
+            if query_rows is not None:
+                sims[np.arange(sims.shape[0]), query_rows[block]] = -np.inf
+            part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            out_idx[block] = part
+            out_sim[block] = np.take_along_axis(sims, part, axis=1)
+        return _sort_topk(out_idx, out_sim)
+
+    def _search_ivf(self, queries, k, query_rows):
+        n_q = len(queries)
+        best_idx = np.full((n_q, k), -1, dtype=np.int64)
+        best_sim = np.full((n_q, k), -np.inf, dtype=np.float32)
+
+        # Invert the probe table: for each list, which queries scan it
+        probes = self._nearest_lists(queries, self.n_probe)
+        q_ids = np.repeat(np.arange(n_q), probes.shape[1])
+        by_list = probes.ravel()
+        order = np.argsort(by_list, kind="stable")
+        q_sorted, l_sorted = q_ids[order], by_list[order]
+        bounds = np.searchsorted(l_sorted, np.arange(self.n_lists + 1))
+
+        for lst in range(self.n_lists):
+            qs = q_sorted[bounds[lst]:bounds[lst + 1]]
+            members = self.list_rows[self.list_offsets[lst]:self.list_offsets[lst + 1]]
+            if not len(qs) or not len(members):
+                continue
+            for start in range(0, len(qs), self.block_size):
+                qb = qs[start:start + self.block_size]
+                sims = queries[qb] @ self.vectors[members].T
+                if query_rows is not None:
+                    sims[members[None, :] == query_rows[qb][:, None]] = -np.inf
+                cand = np.broadcast_to(members, sims.shape)
+                best_idx[qb], best_sim[qb] = _merge_topk(best_idx[qb], best_sim[qb], cand, sims, k)
+        return _sort_topk(best_idx, best_sim)
+
+    def similar_pages(self, row, k=10):
+        """Top-k pages most similar to page `row`, excluding itself."""
+        idx, sim = self.search(self.vectors[[row]], k=k, query_rows=np.array([row]))
+        return idx[0], sim[0]
+
+    def all_pages_topk(self, k=10, batch_size=20000):
+        """Batched top-k join of every page against the index (self excluded)."""
+        n = len(self.vectors)
+        out_idx, out_sim = [], []
+        for start in range(0, n, batch_size):
+            rows = np.arange(start, min(start + batch_size, n))
+            idx, sim = self.search(self.vectors[rows], k=k, query_rows=rows)
+            out_idx.append(idx)
+            out_sim.append(sim)
+        return np.vstack(out_idx), np.vstack(out_sim)
+
+    def evaluate(self, k=10, n_queries=500, seed=0):
+        """Recall@k and per-query latency of this index against exact search."""
+        rng = np.random.default_rng(seed)
+        rows = rng.choice(len(self.vectors), size=min(n_queries, len(self.vectors)), replace=False)
+
+        t0 = time.perf_counter()
+        exact_idx, _ = self.search(self.vectors[rows], k=k, query_rows=rows, exact=True)
+        exact_t = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ann_idx, _ = self.search(self.vectors[rows], k=k, query_rows=rows)
+        ann_t = time.perf_counter() - t0
+
+        hits = sum(len(np.intersect1d(a, b)) for a, b in zip(exact_idx, ann_idx))
+        return {
+            "method": self.method,
+            "recall": round(hits / exact_idx.size, 3),
+            "ann_ms_per_query": round(1000 * ann_t / len(rows), 3),
+            "exact_ms_per_query": round(1000 * exact_t / len(rows), 3),
+        }
+
+
+def topk_pairs(meta, idx, sim, min_similarity=0.0):
+    """
+    Flatten an all-pages top-k result into unique URL pairs, most similar first
+    (cannibalisation / internal-link candidates).
+    """
+    src = np.repeat(np.arange(len(idx)), idx.shape[1])
+    dst, s = idx.ravel(), sim.ravel()
+    keep = (dst >= 0) & (s >= min_similarity)
+    src, dst, s = src[keep], dst[keep], s[keep]
+
+    # (a, b) and (b, a) are the same pair
+    a, b = np.minimum(src, dst), np.maximum(src, dst)
+    pairs = pd.DataFrame({"a": a, "b": b, "Similarity": s}).drop_duplicates(["a", "b"])
+    urls = meta["Address"].to_numpy()
+    return pd.DataFrame({
+        "URL": urls[pairs["a"].to_numpy()],
+        "Similar URL": urls[pairs["b"].to_numpy()],
+        "Similarity": pairs["Similarity"].to_numpy(),
+    }).sort_values("Similarity", ascending=False, ignore_index=True)
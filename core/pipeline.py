@@ -0,0 +1,132 @@
+import concurrent.futures
+import contextvars
+import os
+import queue
+import time
+from utils.instrument import span, start_recording
+
+# Worker threads for `StageCache.submit`; 1 runs every stage inline, in submission order
+STAGE_WORKERS = int(os.environ.get("SDA_STAGE_WORKERS", 4))
+
+# Pipeline stages in execution order (used for reporting)
+STAGES = ["load", "load_crawl", "load_gsc", "merge", "links", "quantize", "basis", "metrics", "projection", "layout", "page_metrics", "presentation", "export", "history", "neighbours", "pairs"]
+
+
+class StageCache:
+    """
+    Memoises each pipeline stage on the inputs it actually depends on.
+
+    Only the latest result per stage is kept: a rerun with the same key
+    reuses it, anything else recomputes and replaces it. `report` records
+    what happened to each stage during the current run; `recorder` holds
+    the run's instrumentation spans (see utils/instrument.py).
+
+    `submit` schedules a stage on a thread pool behind the stages it reads,
+    so independent stages overlap; `wait` collects them.
+    """
+
+    def __init__(self, workers=STAGE_WORKERS):
+        self._store = {}
+        self._pool = None
+        self.workers = workers
+        self.report = {}
+        self.recorder = None
+        self.pending = []
+        self.notes = queue.SimpleQueue()
+        self.started = None
+
+    def start_run(self, workers=None):
+        self.report = {}
+        self.pending = []
+        self.workers = workers or self.workers
+        self.started = time.perf_counter()
+        self.recorder = start_recording()
+
+    def run(self, stage, key, compute):
+        entry = self._store.get(stage)
+        if entry is not None and entry[0] == key:
+            self.report[stage] = ("reused", 0.0)
+            return entry[1]
+
+        t0 = time.perf_counter()
+        with span(stage):
+            value = compute()
+        self._store[stage] = (key, value)
+        self.report[stage] = ("recomputed", time.perf_counter() - t0)
+        return value
+
+    def submit(self, stage, key, compute, after=()):
+        """
+        `run` the stage on a worker thread once the `after` futures finish,
+        passing their values to `compute` — a stage starts as soon as its
+        own inputs exist. Returns a Future; a failed input fails the stage.
+        """
+        def task():
+            inputs = [f.result() for f in after]
+            return self.run(stage, key, lambda: compute(*inputs))
+
+        if self.workers <= 1:
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(task())
+            except Exception as exc:
+                future.set_exception(exc)
+        else:
+            if self._pool is None or self._pool[0] != self.workers:
+                self._pool = (self.workers, concurrent.futures.ThreadPoolExecutor(self.workers, "sda-stage"))
+            # Spans opened on the worker go to this run's recorder
+            future = self._pool[1].submit(contextvars.copy_context().run, task)
+        future.stage = stage
+        self.pending.append(future)
+        return future
+
+    def note(self, message):
+        """Progress line from a stage; shown by `wait` (workers can't write to the page themselves)."""
+        self.notes.put(message)
+
+    def wait(self, progress=print):
+        """
+        Block until every submitted stage finishes, passing notes and each
+        stage's outcome to `progress` as they happen. Raises the first
+        stage error; returns seconds since `start_run`.
+        """
+        pending = set(self.pending)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=0.1,
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            self._drain(progress)
+            for future in sorted(done, key=self.pending.index):
+                if future.exception() is None:
+                    state, elapsed = self.report[future.stage]
+                    progress(f"♻️ {future.stage} reused" if state == "reused"
+                             else f"✅ {future.stage} ({elapsed:.2f}s)")
+        self._drain(progress)
+        submitted, self.pending = self.pending, []
+        for future in submitted:
+            future.result()
+        return time.perf_counter() - self.started
+
+    def _drain(self, progress):
+        while not self.notes.empty():
+            progress(self.notes.get())
+
+    def stage_seconds(self):
+        """Summed time of the stages recomputed this run — the run's length if nothing overlapped."""
+        return sum(elapsed for state, elapsed in self.report.values() if state == "recomputed")
+
+    def results(self):
+        """The kept result of every stage (for memory accounting)."""
+        return [value for _, value in self._store.values()]
+
+    def recomputed(self):
+        return [s for s, (state, _) in self.report.items() if state == "recomputed"]
+
+    def summary(self):
+        """One-line 'stage: reused / recomputed (time)' summary in pipeline order."""
+        parts = []
+        for stage in STAGES:
+            if stage not in self.report:
+                continue
+            state, elapsed = self.report[stage]
+            parts.append(f"{stage}: ♻️ reused" if state == "reused" else f"{stage}: ⚙️ {elapsed:.2f}s")
+        return " · ".join(parts)
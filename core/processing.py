@@ -1,63 +1,182 @@
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler, StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
+from core.metrics import PageMetrics, zone_labels
+from utils.instrument import instrumented
 
-def compute_centroid(df, alpha=0.6, beta=0.3, gamma=0.1):
+# Rows per block when embeddings are memory-mapped (~50 MB of float32 at 1,536 dims).
+# Extra memory is about one block per worker thread, whatever the site size.
+BLOCK_ROWS = 8192
+
+@instrumented("centroid")
+def compute_centroid(ds, alpha=0.6, beta=0.3, gamma=0.1, link_col="Inlinks", block_rows=None, workers=None):
     """
     Compute the semantic centroid and Structural Drift Index (SDI).
 
     SDI = Normalised internal prominence × semantic distance from topical centre
     alpha/beta/gamma = weights for content, inlinks, and clicks respectively.
+    `link_col` is the link-prominence column — raw "Inlinks" from the crawl,
+    or "Link Authority" once the internal link graph has been scored.
+    Works on the PageDataset's shared matrix (float32 or quantized — only
+    mat-vec products are used); adds columns to `ds.meta`. A memory-mapped
+    matrix is streamed in blocks (see `centroid_basis`).
     """
-    emb_stack = np.vstack(df["embedding"].values)
+    return reweight(ds, centroid_basis(ds, link_col, block_rows, workers), alpha, beta, gamma, link_col)
 
-    # Weighted centroid (embeddings × prominence)
+def weighted_centroid(ds, alpha=0.6, beta=0.3, gamma=0.1, link_col="Inlinks"):
+    """Unit-length prominence-weighted mean embedding (the topical centre)."""
+    df = ds.meta
+    # Weighted centroid (embeddings × prominence) as one mat-vec, no n×d temporaries
     weights = (
         alpha
-        + beta * (df["Inlinks"] / df["Inlinks"].max())
+        + beta * (df[link_col] / df[link_col].max())
         + gamma * (df.get("Clicks", 0) / max(df.get("Clicks", 0).max(), 1))
     )
-    centroid = np.average(emb_stack, axis=0, weights=weights)
-    centroid = centroid / np.linalg.norm(centroid)
+    weights = np.broadcast_to(np.asarray(weights, dtype=np.float32), (len(ds),))
+    centroid = (weights @ ds.embeddings).astype(np.float64) / weights.sum()
+    return centroid / np.linalg.norm(centroid)
+
+@dataclass
+class CentroidBasis:
+    """
+    Sufficient statistics for re-weighting the centroid without touching embeddings.
+
+    The weighted centroid is linear in (α, β, γ): with per-page weights
+    1, normalised links and normalised clicks, it is α·S0 + β·S1 + γ·S2 for
+    the three weighted embedding sums S. Each page's dot product with it is
+    the same combination of its dot products with S0..S2 (`dots`, n × 3),
+    and its length comes from the 3 × 3 Gram matrix of the sums.
+    """
+
+    sums: np.ndarray  # (3, d) float64 — uniform, link-weighted, click-weighted embedding sums
+    dots: np.ndarray  # (n, 3) float64 — each page · each sum
+    gram: np.ndarray  # (3, 3) float64 — sums · sumsᵀ
+    link_col: str
+
+    def centroid(self, alpha, beta, gamma):
+        w = np.array([alpha, beta, gamma], dtype=np.float64)
+        centroid = w @ self.sums
+        return centroid / np.linalg.norm(centroid)
+
+
+def _basis_weights(df, link_col):
+    """(3, n) page weights behind each basis sum — the same terms `weighted_centroid` mixes."""
+    clicks = df.get("Clicks", pd.Series(0, index=df.index)).fillna(0)
+    return np.stack([
+        np.ones(len(df)),
+        (df[link_col] / df[link_col].max()).fillna(0).to_numpy(dtype=np.float64),
+        (clicks / max(clicks.max(), 1)).to_numpy(dtype=np.float64),
+    ]).astype(np.float32)
+
+
+@instrumented("centroid_basis")
+def centroid_basis(ds, link_col="Inlinks", block_rows=None, workers=None):
+    """
+    One O(n·d) pass that makes every later `reweight` O(n).
+
+    With `block_rows` — the default for a memory-mapped matrix — the
+    embeddings are read ahead in row blocks on `workers` threads (default:
+    all cores) and never held in RAM at once.
+    """
+    if block_rows is None and isinstance(ds.embeddings, np.memmap):
+        block_rows = BLOCK_ROWS
+    if block_rows:
+        return _blocked_basis(ds, link_col, block_rows, workers or os.cpu_count() or 1)
+    sums = (_basis_weights(ds.meta, link_col) @ ds.embeddings).astype(np.float64)
+    dots = (ds.embeddings @ sums.T.astype(np.float32)).astype(np.float64)
+    return CentroidBasis(sums, dots, sums @ sums.T, link_col)
+
+
+def _map_blocks(fn, matrix, block_rows, workers):
+    """
+    [fn(start, block) for each row block of `matrix`]. Up to `workers`
+    threads run ahead faulting the next blocks' pages in (one read per
+    page, no copy); `fn` runs on the calling thread, so its BLAS products
+    use BLAS's own threads and nothing is capped process-wide (other
+    stages may be multiplying at the same time).
+    """
+    def read(start):
+        block = np.asarray(matrix[start:start + block_rows])
+        block.reshape(-1)[::max(1, mmap.PAGESIZE // block.itemsize)].sum()
+        return start, block
+
+    out, ahead = [], deque()
+    with ThreadPoolExecutor(workers) as pool:
+        for start in range(0, len(matrix), block_rows):
+            ahead.append(pool.submit(read, start))
+            if len(ahead) > workers:
+                out.append(fn(*ahead.popleft().result()))
+        while ahead:
+            out.append(fn(*ahead.popleft().result()))
+    return out
+
+
+def _blocked_basis(ds, link_col, block_rows, workers):
+    """`centroid_basis` in two streaming passes over row blocks of the matrix."""
+    weights = _basis_weights(ds.meta, link_col)
+    need_norms = ds._norms is None and not ds.normalised
+
+    # --- 1. Weighted sums, accumulated in float64 across blocks (+ row norms) ---
+    def accumulate(start, block):
+        stop = start + len(block)
+        norms = np.sqrt(np.einsum("ij,ij->i", block, block)) if need_norms else None
+        return (weights[:, start:stop] @ block).astype(np.float64), norms
+
+    partial = _map_blocks(accumulate, ds.embeddings, block_rows, workers)
+    sums = np.sum([p[0] for p in partial], axis=0) if partial else np.zeros((3, ds.dim))
+    if need_norms:
+        ds._norms = np.concatenate([p[1] for p in partial]) if partial else np.empty(0, dtype=np.float32)
+
+    # --- 2. Each page's dot product with the three sums ---
+    s32 = sums.T.astype(np.float32)
+    dots = _map_blocks(lambda start, block: block @ s32, ds.embeddings, block_rows, workers)
+    dots = np.concatenate(dots).astype(np.float64) if dots else np.empty((0, 3))
+    return CentroidBasis(sums, dots, sums @ sums.T, link_col)
+
+
+def reweight(ds, basis, alpha=0.6, beta=0.3, gamma=0.1, link_col=None):
+    """
+    Centroid, `distance_from_centre` and SDI for new weights from a
+    `CentroidBasis` — O(n), no embedding access. Returns (centroid, ds).
+    """
+    link_col = link_col or basis.link_col
+    df = ds.meta
+    w = np.array([alpha, beta, gamma], dtype=np.float64)
+    centroid = basis.centroid(alpha, beta, gamma)
 
     # Semantic distance from centre (cosine distance)
-    dot = np.dot(emb_stack, centroid)
-    norms = np.linalg.norm(emb_stack, axis=1)
-    df["distance_from_centre"] = 1 - (dot / norms)
+    dot = (basis.dots @ w) / np.sqrt(w @ basis.gram @ w)
+    df["distance_from_centre"] = 1 - (dot / ds.norms)
 
     # Structural Drift Index (SDI)
-    df["SDI"] = (df["Inlinks"] / df["Inlinks"].max()) * df["distance_from_centre"]
-
-    return centroid, df
-
-def add_similarity_metrics(df, centroid):
-    embeddings = np.vstack(df['embedding'].values)
-    sims = cosine_similarity(embeddings, centroid.reshape(1, -1)).flatten()
-    df['similarity'] = sims
-    df['distance'] = 1 - sims
-    return df
-
-def add_internal_authority(df):
-    df['IA'] = scale(df['Inlinks'].fillna(0)) * scale(1/(1+df['Crawl Depth'].fillna(0)))
-    return df
-
-def add_navboost(df):
-    z_ia = zscore(df['IA'])
-    z_dist = zscore(df['distance'])
-    df['NDI'] = z_ia * z_dist
-    p25, p75 = np.percentile(df['IA'], [25, 75]), np.percentile(df['distance'], [25, 75])
-    df['NavBoost Category'] = np.select([
-        (df['IA'] >= p75[1]) & (df['distance'] >= p75[1]),
-        (df['IA'] <= p25[0]) & (df['distance'] <= p25[0]),
-        (df['IA'] <= p25[0]) & (df['distance'] >= p75[1])
-    ], ["Misaligned Core", "Underlinked Core", "Junk Drift"], default="Healthy Core")
-    return df
-
-def scale(series):
-    s = series.fillna(0).to_numpy().reshape(-1, 1)
-    return MinMaxScaler().fit_transform(s).flatten()
-
-def zscore(series):
-    s = series.fillna(0).to_numpy().reshape(-1, 1)
-    return StandardScaler().fit_transform(s).flatten()
+    df["SDI"] = (df[link_col] / df[link_col].max()) * df["distance_from_centre"]
+
+    return centroid, ds
+
+
+def assign_zone(norm_dist):
+    return zone_labels([norm_dist])[0]
+
+@instrumented("zones")
+def add_zones(df):
+    """Normalised distance (0 = centre, 1 = furthest page) and its orbit zone."""
+    return PageMetrics(df).add(["normalized_distance", "zone"])
+
+def add_similarity_metrics(ds, centroid):
+    c = np.asarray(centroid, dtype=np.float32)
+    sims = (ds.embeddings @ c) / (ds.norms * np.linalg.norm(c))
+    ds.meta['similarity'] = sims
+    ds.meta['distance'] = 1 - sims
+    return ds
+
+def add_internal_authority(ds, link_col="Inlinks"):
+    PageMetrics(ds.meta, link_col).add(["IA"])
+    return ds
+
+def add_navboost(ds, link_col="Inlinks"):
+    PageMetrics(ds.meta, link_col).add(["NDI", "NavBoost Category"])
+    return ds
@@ -1,12 +1,34 @@
-import umap
+import os
+import time
 import numpy as np
+from urllib.parse import urlsplit
+from core.cache import DEFAULT_CACHE_DIR
+from utils.instrument import instrumented
 
-def reduce_umap(df, n_neighbors=15, min_dist=0.1, metric="cosine"):
+# umap and sklearn are imported by the functions that use them: importing umap
+# JIT-compiles pynndescent's kernels, many seconds the app shouldn't spend
+# before its first page. numba reads this before its first import; kernels
+# compiled with cache=True (UMAP's layout optimiser) then persist across restarts.
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(DEFAULT_CACHE_DIR, "numba"))
+
+# name → short description shown in the UI
+PROJECTION_BACKENDS = {
+    "umap": "UMAP on full embeddings (slowest, best local structure)",
+    "pca_umap": "PCA pre-reduction → UMAP",
+    "sampled_umap": "UMAP fitted on a stratified sample, rest batch-transformed",
+    "pca": "Exact PCA",
+    "randomized_pca": "Randomized PCA",
+    "random_projection": "Sparse random projection (fastest, coarsest)",
+}
+
+
+def reduce_umap(ds, n_neighbors=15, min_dist=0.1, metric="cosine"):
     """
     Reduce embedding dimensionality with UMAP.
-    Returns the UMAP reducer and transformed DataFrame.
+    Returns the PageDataset (x/y added to meta) and the UMAP reducer.
     """
-    embeddings = np.vstack(df["embedding"].values)
+    import umap
+    embeddings = ds.embeddings
     reducer = umap.UMAP(
         n_neighbors=n_neighbors,
         min_dist=min_dist,
@@ -14,17 +36,165 @@ def reduce_umap(df, n_neighbors=15, min_dist=0.1, metric="cosine"):
         random_state=42
     )
     proj = reducer.fit_transform(embeddings)
-    df["x"], df["y"] = proj[:, 0], proj[:, 1]
-    return df, reducer
+    ds.meta["x"], ds.meta["y"] = proj[:, 0], proj[:, 1]
+    return ds, reducer
+
+
+@instrumented("projection")
+def reduce_embeddings(ds, backend="umap", n_neighbors=15, min_dist=0.1, metric="cosine",
+                      pca_components=50, sample_size=5000, evaluate=True):
+    """
+    Project embeddings to 2D with any backend in PROJECTION_BACKENDS.
+
+    Returns (ds with x/y in meta, reducer, report). The reducer always supports
+    `.transform`, so `centre_on_centroid` works with every backend. The
+    report holds wall time and, if `evaluate`, the kNN recall of the 2D
+    layout against the original space.
+    """
+    if backend not in PROJECTION_BACKENDS:
+        raise ValueError(f"Unknown projection backend '{backend}'. Options: {list(PROJECTION_BACKENDS)}")
+    from sklearn.decomposition import PCA
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import Normalizer
+    from sklearn.random_projection import SparseRandomProjection
+    if "umap" in backend:
+        import umap
+
+    embeddings = ds.embeddings
+    umap_kwargs = {"n_neighbors": n_neighbors, "min_dist": min_dist, "metric": metric, "random_state": 42}
+    n_pca = min(pca_components, *embeddings.shape)
+
+    t0 = time.perf_counter()
+    if backend == "umap":
+        reducer = umap.UMAP(**umap_kwargs)
+        proj = reducer.fit_transform(embeddings)
+    elif backend == "pca_umap":
+        # Cosine geometry survives PCA when rows are unit-normalised first
+        reducer = make_pipeline(
+            Normalizer(),
+            PCA(n_components=n_pca, random_state=42),
+            umap.UMAP(**umap_kwargs),
+        )
+        proj = reducer.fit_transform(embeddings)
+    elif backend == "sampled_umap":
+        reducer = umap.UMAP(**umap_kwargs)
+        sample = stratified_sample(_url_sections(ds.meta["Address"]), sample_size)
+        reducer.fit(embeddings[sample])
+        proj = np.empty((len(embeddings), 2), dtype=np.float32)
+        proj[sample] = reducer.embedding_
+        rest = np.setdiff1d(np.arange(len(embeddings)), sample)
+        for start in range(0, len(rest), 10000):
+            batch = rest[start:start + 10000]
+            proj[batch] = reducer.transform(embeddings[batch])
+    else:
+        if backend == "pca":
+            step = PCA(n_components=2, svd_solver="full")
+        elif backend == "randomized_pca":
+            step = PCA(n_components=2, svd_solver="randomized", random_state=42)
+        else:
+            step = SparseRandomProjection(n_components=2, random_state=42)
+        reducer = make_pipeline(Normalizer(), step) if metric == "cosine" else step
+        proj = reducer.fit_transform(embeddings)
+    elapsed = time.perf_counter() - t0
+
+    ds.meta["x"], ds.meta["y"] = proj[:, 0], proj[:, 1]
+    report = {"backend": backend, "seconds": round(elapsed, 3), "n": len(embeddings)}
+    if evaluate:
+        report["knn_recall"] = round(knn_recall(embeddings, proj, metric=metric), 3)
+    return ds, reducer, report
+
+
+def stratified_sample(strata, size, seed=42):
+    """Row indices of a sample of `size` spread proportionally across `strata` labels."""
+    strata = np.asarray(strata)
+    n = len(strata)
+    if size >= n:
+        return np.arange(n)
+
+    rng = np.random.default_rng(seed)
+    labels, inverse, counts = np.unique(strata, return_inverse=True, return_counts=True)
+    # At least one page per stratum, the rest proportional to stratum size
+    quota = np.maximum(1, np.floor(counts / n * size)).astype(int)
+    picked = []
+    for label_idx in range(len(labels)):
+        members = np.flatnonzero(inverse == label_idx)
+        picked.append(rng.choice(members, size=min(quota[label_idx], len(members)), replace=False))
+    return np.sort(np.concatenate(picked))
+
 
+def _url_sections(urls):
+    """First path segment of each URL ('/blog/x' → 'blog') — a cheap topical stratum."""
+    return urls.map(lambda u: urlsplit(str(u)).path.strip("/").split("/")[0]).to_numpy()
 
-def centre_on_centroid(df, centroid, reducer):
+
+def knn_recall(embeddings, proj, k=10, metric="cosine", n_queries=1000, seed=42, block_rows=2048):
+    """
+    Neighbourhood preservation: mean fraction of each page's k nearest
+    neighbours in the original space that are also among its k nearest in 2D.
+    Computed on a random sample of `n_queries` pages against all pages.
+
+    One pass over the pages in blocks of `block_rows`, keeping each query's
+    running k nearest: only the query rows are normalised, so a large or
+    memory-mapped matrix is never copied whole.
+    """
+    n = len(embeddings)
+    k = min(k, n - 1)
+    if k < 1:
+        return 1.0
+
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(n, size=min(n_queries, n), replace=False)
+
+    q_high = np.asarray(embeddings[queries], dtype=np.float32)
+    if metric == "cosine":
+        q_high = q_high / np.maximum(np.linalg.norm(q_high, axis=1, keepdims=True), 1e-12)
+    p = np.asarray(proj, dtype=np.float64)
+    q_low = p[queries]
+
+    nearest_high = nearest_low = None
+    for start in range(0, n, block_rows):
+        block = np.asarray(embeddings[start:start + block_rows], dtype=np.float32)
+        sq = np.einsum("ij,ij->i", block, block)
+        if metric == "cosine":
+            # Same order as the distance between unit rows: highest cosine first
+            d_high = -(q_high @ block.T) / np.maximum(np.sqrt(sq), 1e-12)
+        else:
+            d_high = sq[None, :] - 2 * q_high @ block.T
+        p_block = p[start:start + block_rows]
+        d_low = (p_block ** 2).sum(1)[None, :] - 2 * q_low @ p_block.T
+        nearest_high = _merge_nearest(nearest_high, d_high, start, queries, k)
+        nearest_low = _merge_nearest(nearest_low, d_low, start, queries, k)
+
+    overlap = sum(len(np.intersect1d(a, b, assume_unique=True)) for a, b in zip(nearest_high[1], nearest_low[1]))
+    return float(overlap / (len(queries) * k))
+
+
+def _merge_nearest(nearest, dist, start, queries, k):
+    """Each query's (distances, row ids) of its k nearest so far, merged with a block of distances to rows `start`…"""
+    own = (queries >= start) & (queries < start + dist.shape[1])
+    dist[np.flatnonzero(own), queries[own] - start] = np.inf  # not its own neighbour
+    dist, idx = _k_smallest(dist, np.arange(start, start + dist.shape[1]), k)
+    if nearest is None:
+        return dist, idx
+    return _k_smallest(np.hstack([nearest[0], dist]), np.hstack([nearest[1], idx]), k)
+
+
+def _k_smallest(dist, idx, k):
+    """The k smallest distances per row (any order) and their ids; `idx` is per column or per cell."""
+    idx = np.broadcast_to(idx, dist.shape)
+    if dist.shape[1] <= k:
+        return dist, idx
+    part = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(dist, part, axis=1), np.take_along_axis(idx, part, axis=1)
+
+
+@instrumented("centre_on_centroid")
+def centre_on_centroid(ds, centroid, reducer):
     """
     Project the semantic centroid through the same UMAP reducer
     and recenter all points so the centroid is at (0, 0).
     """
-    centroid_proj = reducer.transform([centroid])[0]
-    df["x_centered"] = df["x"] - centroid_proj[0]
-    df["y_centered"] = df["y"] - centroid_proj[1]
-    return df, (0.0, 0.0)
-
+    centroid_proj = reducer.transform(np.asarray([centroid], dtype=np.float32))[0]
+    ds.meta["x_centered"] = ds.meta["x"] - centroid_proj[0]
+    ds.meta["y_centered"] = ds.meta["y"] - centroid_proj[1]
+    return ds, (0.0, 0.0)
@@ -0,0 +1,179 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from urllib.parse import urlsplit
+import numpy as np
+import pandas as pd
+from core.cache import DEFAULT_CACHE_DIR
+from core.projection import reduce_embeddings
+
+DEFAULT_STORE_DIR = os.environ.get("SDA_PROJECTION_DIR", os.path.join(DEFAULT_CACHE_DIR, "projections"))
+
+
+def site_id(urls):
+    """Most common host among the crawl URLs — one saved model per site."""
+    hosts = pd.Series(urls).dropna().map(lambda u: urlsplit(u).netloc)
+    if hosts.empty:
+        raise ValueError("Cannot derive a site id from an empty URL list.")
+    return hosts.value_counts().index[0]
+
+
+def embedding_fingerprint(model, dim):
+    """Identifies the embedding space; a saved reducer is only valid for the same one."""
+    return f"{model}:{int(dim)}"
+
+
+# Fixed seed: hashes must be comparable across runs and processes
+_HASH_SEED = 0x5DA
+
+
+def embedding_hashes(matrix):
+    """
+    Short content hash per embedding row, used to spot changed pages between
+    crawls: the row's raw bits as 64-bit words times fixed random odd
+    multipliers, summed mod 2^64 — one pass over the matrix (memmaps
+    included) with no n × d temporary. Any single changed word changes it.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    words = matrix.view(np.uint64 if matrix.shape[1] % 2 == 0 else np.uint32)
+    multipliers = np.random.default_rng(_HASH_SEED).integers(0, 2**64, words.shape[1], dtype=np.uint64) | np.uint64(1)
+    return np.array([f"{h:016x}" for h in np.einsum("ij,j->i", words, multipliers).tolist()])
+
+
+def _unit_mean(matrix):
+    mean = matrix.mean(axis=0)
+    return mean / (np.linalg.norm(mean) or 1.0)
+
+
+class ProjectionStore:
+    """
+    Saved UMAP reducers per site, so weekly re-crawls stay on the same map.
+
+    Each site directory holds:
+      reducer.pkl  — the fitted umap.UMAP
+      pages.parquet — Address, embedding hash and x/y of every page last seen
+      fit_mean.npy — unit mean embedding at fit time (for drift detection)
+      meta.json    — fingerprint, backend + params, fit time and size
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, site):
+        return os.path.join(self.root, site.replace(":", "_"))
+
+    def load(self, site):
+        path = self._path(site)
+        try:
+            with open(os.path.join(path, "meta.json")) as fh:
+                meta = json.load(fh)
+            with open(os.path.join(path, "reducer.pkl"), "rb") as fh:
+                reducer = pickle.load(fh)
+            pages = pd.read_parquet(os.path.join(path, "pages.parquet"))
+            fit_mean = np.load(os.path.join(path, "fit_mean.npy"))
+        except (OSError, ValueError, pickle.UnpicklingError):
+            return None
+        return {"meta": meta, "reducer": reducer, "pages": pages, "fit_mean": fit_mean}
+
+    def save(self, site, reducer, pages, fit_mean, meta):
+        path = self._path(site)
+        # Unique per call: threads of one process may save the same site at once
+        tmp = tempfile.mkdtemp(prefix=f"{os.path.basename(path)}.tmp-", dir=self.root)
+        with open(os.path.join(tmp, "reducer.pkl"), "wb") as fh:
+            pickle.dump(reducer, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        pages.to_parquet(os.path.join(tmp, "pages.parquet"), index=False)
+        np.save(os.path.join(tmp, "fit_mean.npy"), fit_mean)
+        with open(os.path.join(tmp, "meta.json"), "w") as fh:
+            json.dump(meta, fh)
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            # A concurrent save got there first; its copy is as good as this one
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def sites(self):
+        return sorted(n for n in os.listdir(self.root) if ".tmp-" not in n)
+
+    def delete(self, site):
+        shutil.rmtree(self._path(site), ignore_errors=True)
+
+    def project(self, ds, site, fingerprint, backend="umap", max_changed=0.2, max_drift=0.02,
+                force_refit=False, **params):
+        """
+        Project PageDataset `ds` onto the site's saved map, refitting only when needed.
+
+        Pages whose embedding hash matches the saved one keep their stored
+        coordinates; new or changed pages go through `reducer.transform`.
+        A full refit happens when there is no compatible saved model, when
+        more than `max_changed` of pages are new/changed, or when the mean
+        embedding has drifted more than `max_drift` (cosine) since the fit.
+
+        `backend` and `params` go to `reduce_embeddings` on a refit.
+        Returns (ds with x/y in meta, reducer, report).
+        """
+        params = {"backend": backend, **params}
+        emb = ds.embeddings
+        hashes = embedding_hashes(emb)
+        current_mean = _unit_mean(emb)
+
+        saved = None if force_refit else self.load(site)
+        reason = "forced" if force_refit else None
+        if saved is None and reason is None:
+            reason = "no saved model"
+        elif saved is not None:
+            meta = saved["meta"]
+            if meta["fingerprint"] != fingerprint:
+                reason = f"embedding model changed ({meta['fingerprint']} → {fingerprint})"
+            elif meta.get("params") != params:
+                reason = "projection backend or parameters changed"
+
+        if reason is None:
+            prev = saved["pages"].drop_duplicates("Address").set_index("Address")
+            match = prev.reindex(ds.meta["Address"].to_numpy())
+            reuse = match["hash"].to_numpy() == hashes
+            changed = 1 - reuse.mean()
+            drift = 1 - float(np.dot(current_mean, saved["fit_mean"]))
+            if changed > max_changed:
+                reason = f"{changed:.0%} of pages new or changed (limit {max_changed:.0%})"
+            elif drift > max_drift:
+                reason = f"centre drifted {drift:.3f} since fit (limit {max_drift})"
+
+        if reason is not None:
+            ds, reducer, fit_report = reduce_embeddings(ds, **params)
+            meta = {
+                "fingerprint": fingerprint,
+                "params": params,
+                "fitted_at": time.time(),
+                "n_fit": len(ds),
+            }
+            fit_mean = current_mean
+            report = {"mode": "refit", "reason": reason, "transformed": len(ds), "reused": 0, **fit_report}
+        else:
+            t0 = time.perf_counter()
+            reducer, meta, fit_mean = saved["reducer"], saved["meta"], saved["fit_mean"]
+            coords = match[["x", "y"]].to_numpy(dtype=np.float64, copy=True)
+            if (~reuse).any():
+                coords[~reuse] = reducer.transform(emb[~reuse])
+            ds.meta["x"], ds.meta["y"] = coords[:, 0], coords[:, 1]
+            report = {
+                "mode": "incremental",
+                "reason": f"{changed:.1%} changed, drift {drift:.4f}",
+                "transformed": int((~reuse).sum()),
+                "reused": int(reuse.sum()),
+                "backend": backend,
+                "seconds": round(time.perf_counter() - t0, 3),
+            }
+
+        pages = pd.DataFrame({
+            "Address": ds.meta["Address"].to_numpy(),
+            "hash": hashes,
+            "x": ds.meta["x"].to_numpy(),
+            "y": ds.meta["y"].to_numpy(),
+        })
+        self.save(site, reducer, pages, fit_mean, meta)
+        return ds, reducer, report
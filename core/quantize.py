@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+PRECISIONS = {
+    "float32": "float32 (full precision)",
+    "float16": "float16 (½ memory)",
+    "int8_row": "int8, one scale per page (¼ memory)",
+    "int8_dim": "int8, one scale per dimension (¼ memory)",
+}
+
+# Rows dequantised at a time by the kernels (~50 MB of float32 at 3,072 dims)
+BLOCK_ROWS = 4096
+
+
+class QuantizedMatrix:
+    """
+    Compact stand-in for a float32 embedding matrix.
+
+    `codes` holds float16 values or int8 codes with a per-row or per-dim
+    float32 `scale`; `norms` are the exact row norms of the original
+    matrix. `X @ v` and `w @ X` run in blocks of BLOCK_ROWS rows, so the
+    float32 form never exists in full. Row indexing returns another
+    QuantizedMatrix; `np.asarray(X)` dequantises (for code that needs
+    the real matrix, e.g. UMAP).
+    """
+
+    def __init__(self, codes, scale, mode, norms):
+        self.codes = codes
+        self.scale = scale
+        self.mode = mode
+        self.norms = norms
+
+    shape = property(lambda self: self.codes.shape)
+    ndim = 2
+    dtype = np.dtype(np.float32)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (0 if self.scale is None else self.scale.nbytes) + self.norms.nbytes
+
+    def _block(self, start, stop):
+        block = self.codes[start:stop].astype(np.float32)
+        if self.mode == "int8_row":
+            block *= self.scale[start:stop, None]
+        elif self.mode == "int8_dim":
+            block *= self.scale
+        return block
+
+    def dequantize(self):
+        out = np.empty(self.shape, dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            out[start:start + BLOCK_ROWS] = self._block(start, start + BLOCK_ROWS)
+        return out
+
+    def matmul(self, v):
+        """X @ v for v of shape (d,) or (d, k)."""
+        v = np.asarray(v, dtype=np.float32)
+        if self.mode == "int8_dim":
+            v = v * (self.scale if v.ndim == 1 else self.scale[:, None])  # fold the scale into v once
+        out = np.empty((len(self),) + v.shape[1:], dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            stop = start + BLOCK_ROWS
+            out[start:stop] = self.codes[start:stop].astype(np.float32) @ v
+        if self.mode == "int8_row":
+            out *= self.scale if out.ndim == 1 else self.scale[:, None]
+        return out
+
+    def rmatmul(self, w):
+        """w @ X for w of shape (n,) or (k, n)."""
+        w = np.asarray(w, dtype=np.float32)
+        if self.mode == "int8_row":
+            w = w * self.scale  # fold the scale into the weights once
+        out = np.zeros(w.shape[:-1] + (self.shape[1],), dtype=np.float32)
+        for start in range(0, len(self), BLOCK_ROWS):
+            stop = start + BLOCK_ROWS
+            out += w[..., start:stop] @ self.codes[start:stop].astype(np.float32)
+        if self.mode == "int8_dim":
+            out *= self.scale
+        return out
+
+    def __matmul__(self, other):
+        return self.matmul(other)
+
+    def __rmatmul__(self, other):
+        return self.rmatmul(other)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        # numpy arrays would otherwise dequantise us before `w @ X` reaches __rmatmul__
+        if ufunc is np.matmul and method == "__call__" and len(inputs) == 2 and not kwargs:
+            a, b = inputs
+            return self.matmul(b) if a is self else self.rmatmul(a)
+        inputs = [np.asarray(x) if isinstance(x, QuantizedMatrix) else x for x in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __array__(self, dtype=None, copy=None):
+        out = self.dequantize()
+        return out if dtype is None else out.astype(dtype)
+
+    def __getitem__(self, rows):
+        if np.isscalar(rows):
+            return self._block(rows, rows + 1)[0] if rows >= 0 else self[len(self) + rows]
+        if isinstance(rows, tuple):
+            return np.asarray(self)[rows]
+        scale = self.scale[rows] if self.mode == "int8_row" else self.scale
+        return QuantizedMatrix(self.codes[rows], scale, self.mode, self.norms[rows])
+
+
+def quantize(matrix, mode="int8_row"):
+    """Quantize a float matrix (array or memmap) block by block into a QuantizedMatrix."""
+    if mode not in PRECISIONS or mode == "float32":
+        raise ValueError(f"Unknown quantization mode '{mode}'. Options: {list(PRECISIONS)[1:]}")
+    n, d = matrix.shape
+    norms = np.empty(n, dtype=np.float32)
+    codes = np.empty((n, d), dtype=np.float16 if mode == "float16" else np.int8)
+    scale = None
+    if mode == "int8_dim":
+        scale = np.zeros(d, dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            scale = np.maximum(scale, np.abs(matrix[start:start + BLOCK_ROWS]).max(axis=0))
+        scale = np.where(scale > 0, scale / 127, 1).astype(np.float32)
+    elif mode == "int8_row":
+        scale = np.empty(n, dtype=np.float32)
+
+    for start in range(0, n, BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, n)
+        block = np.asarray(matrix[start:stop], dtype=np.float32)
+        norms[start:stop] = np.linalg.norm(block, axis=1)
+        if mode == "float16":
+            codes[start:stop] = block
+            continue
+        if mode == "int8_row":
+            row_max = np.abs(block).max(axis=1)
+            scale[start:stop] = np.where(row_max > 0, row_max / 127, 1)
+            block = block / scale[start:stop, None]
+        else:
+            block = block / scale
+        codes[start:stop] = np.clip(np.rint(block), -127, 127)
+    return QuantizedMatrix(codes, scale, mode, norms)
+
+
+def quantize_dataset(ds, mode="int8_row"):
+    """Same pages with the embedding matrix swapped for its quantized form ("float32" = unchanged)."""
+    if mode == "float32":
+        return ds.copy()
+    q = quantize(ds.embeddings, mode)
+    return type(ds)(ds.meta.copy(deep=False), q, ds.normalised, q.norms)
+
+
+def quantization_report(full, quantized, alpha=0.6, beta=0.3, gamma=0.1, link_col="Inlinks", bases=None):
+    """
+    Centroid / distance / zone differences between metrics computed on the
+    full-precision and the quantized dataset. Returns a dict with the
+    memory saving, max / mean absolute error in distance_from_centre, the
+    centroid's cosine error and a DataFrame of pages whose zone changes.
+    With `bases` — their (full, quantized) CentroidBasis — the comparison
+    is O(n) and can be repeated for every weight change.
+    """
+    from core.processing import centroid_basis, reweight, add_zones
+
+    results = []
+    for ds, basis in zip((full, quantized), bases or (None, None)):
+        basis = basis if basis is not None else centroid_basis(ds, link_col)
+        centroid, ds = reweight(ds.copy(), basis, alpha, beta, gamma, link_col)
+        results.append((centroid, add_zones(ds.meta)))
+    (c_full, m_full), (c_q, m_q) = results
+
+    error = np.abs(m_q["distance_from_centre"].to_numpy() - m_full["distance_from_centre"].to_numpy())
+    moved = m_full["zone"].to_numpy() != m_q["zone"].to_numpy()
+    zone_changes = pd.DataFrame({
+        "Address": m_full["Address"].to_numpy()[moved],
+        "zone (float32)": m_full["zone"].to_numpy()[moved],
+        "zone (quantized)": m_q["zone"].to_numpy()[moved],
+        "distance error": error[moved],
+    })
+    full_bytes = full.embeddings.nbytes
+    q_bytes = quantized.embeddings.nbytes
+    return {
+        "mode": getattr(quantized.embeddings, "mode", "float32"),
+        "bytes": q_bytes,
+        "full_bytes": full_bytes,
+        "compression": full_bytes / q_bytes,
+        "max_distance_error": float(error.max()) if len(error) else 0.0,
+        "mean_distance_error": float(error.mean()) if len(error) else 0.0,
+        "centroid_error": float(1 - c_full @ c_q),
+        "zone_changes": zone_changes,
+    }
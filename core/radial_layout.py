@@ -1,23 +1,160 @@
 import numpy as np
 import pandas as pd
+from utils.instrument import instrumented
 
-def compute_radial_layout(df, seed=42):
+# Cell offsets that visit every neighbouring pair of grid cells exactly once
+_HALF_NEIGHBOURHOOD = [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]
+
+
+@instrumented("radial_layout")
+def compute_radial_layout(df, cluster_col=None, spacing=None, iterations=4):
     """
     Convert semantic distance data into polar coordinates.
-    r = semantic distance from centroid
-    θ = evenly spaced angle or hash-based angle
-    """
-    np.random.seed(seed)
-    
-    # Normalise radius (semantic distance)
-    df["r"] = df["distance_from_centre"] / df["distance_from_centre"].max()
-    
-    # Spread angles evenly or pseudo-randomly
-    df = df.sort_values("r", ascending=True).reset_index(drop=True)
-    df["theta"] = np.linspace(0, 2 * np.pi, len(df), endpoint=False)
+    r = semantic distance from centroid (normalised 0–1, never moved)
+    θ = direction of the page from the centroid on the projected map
+        (`x_centered` / `y_centered`), so neighbouring topics share a
+        sector; with `cluster_col`, one sector per cluster sized by its
+        page count; with neither, evenly spaced in row order.
 
-    # Convert polar → cartesian (for plotting)
-    df["x_radial"] = df["r"] * np.cos(df["theta"])
-    df["y_radial"] = df["r"] * np.sin(df["theta"])
+    Overlapping pages are then moved apart along their orbit — first
+    spread out within rings of width `spacing` (`spread_rings`), then
+    nudged apart pair by pair (`relax_angles`). Adds r, theta, x_radial,
+    y_radial; row order is kept.
+    """
+    df = df.copy(deep=False)
+    r = df["distance_from_centre"].to_numpy(dtype=np.float64)
+    top = r.max() if len(r) else 0.0
+    r = r / top if top > 0 else np.zeros_like(r)
 
+    if cluster_col is not None:
+        theta = cluster_angles(df[cluster_col].to_numpy(), r)
+    elif {"x_centered", "y_centered"} <= set(df.columns):
+        theta = np.arctan2(df["y_centered"].to_numpy(dtype=np.float64),
+                           df["x_centered"].to_numpy(dtype=np.float64))
+    else:
+        theta = np.linspace(0, 2 * np.pi, len(df), endpoint=False)
+
+    if spacing is None:
+        # About half the mean gap between pages spread over the unit disc, at most 3% of the radius
+        spacing = min(0.5 * np.sqrt(np.pi / max(len(df), 1)), 0.03)
+    theta = relax_angles(r, spread_rings(r, theta, spacing), spacing, iterations)
+
+    df["r"] = r
+    df["theta"] = np.mod(theta, 2 * np.pi)
+    # Convert polar → cartesian (for plotting)
+    df["x_radial"] = r * np.cos(theta)
+    df["y_radial"] = r * np.sin(theta)
     return df
+
+
+def cluster_angles(labels, r, gap=0.02):
+    """One angular sector per cluster (width ∝ its page count, `gap` of the circle between sectors); inner pages first."""
+    codes, uniques = pd.factorize(labels, sort=True)
+    order = np.lexsort((r, codes))
+    theta = np.empty(len(labels))
+    theta[order] = np.linspace(0, 2 * np.pi * (1 - gap), len(labels), endpoint=False)
+    return theta + 2 * np.pi * gap * codes / max(len(uniques), 1)
+
+
+def spread_rings(r, theta, spacing):
+    """
+    Within each ring of width `spacing`, keep the pages' angular order but
+    open every gap to at least `spacing` of arc (less in a ring with more
+    pages than fit: then evenly spaced), shifted so the ring's mean angle
+    stays put. One sort plus a cumulative max: O(n log n).
+    """
+    theta = np.mod(np.asarray(theta, dtype=np.float64), 2 * np.pi)
+    if spacing <= 0 or len(theta) < 2:
+        return theta
+    ring = np.floor(r / spacing).astype(np.int64)
+    order = np.lexsort((theta, ring))
+    ring_s, theta_s = ring[order], theta[order]
+    rings, first, ring_idx, counts = np.unique(ring_s, return_index=True, return_inverse=True, return_counts=True)
+    rank = np.arange(len(theta)) - first[ring_idx]
+
+    # Minimum gap per ring: `spacing` of arc at the ring's inner radius, capped so the ring fits in 2π
+    inner = np.maximum(rings * spacing, spacing)
+    gap = np.minimum(spacing / inner, 2 * np.pi / counts)[ring_idx]
+
+    # θ'_k = max(θ_k, θ'_{k-1} + gap) as k·gap + running max of (θ_l − l·gap), reset per ring by an offset
+    offset = ring_idx * 8 * np.pi
+    spread = rank * gap + np.maximum.accumulate(theta_s - rank * gap + offset) - offset
+    shift = np.bincount(ring_idx, weights=spread - theta_s) / counts
+    out = np.empty_like(theta)
+    out[order] = spread - shift[ring_idx]
+    return out
+
+
+def close_pairs(x, y, spacing):
+    """
+    (i, j) index pairs of points closer than `spacing`, via a spatial hash
+    grid with cells of that size: only points in the same or adjacent cells
+    are compared, so the cost is near-linear in the number of points.
+    """
+    ix = np.floor(x / spacing).astype(np.int64)
+    iy = np.floor(y / spacing).astype(np.int64)
+    ix -= ix.min() if len(ix) else 0
+    iy -= iy.min() if len(iy) else 0
+    stride = (iy.max() if len(iy) else 0) + 3
+    key = ix * stride + iy + 1
+
+    order = np.argsort(key, kind="stable")
+    cells, first, counts = np.unique(key[order], return_index=True, return_counts=True)
+
+    pairs_i, pairs_j = [], []
+    for dx, dy in _HALF_NEIGHBOURHOOD:
+        target = cells + dx * stride + dy
+        pos = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        found = np.flatnonzero(cells[pos] == target)
+        a, b = found, pos[found]
+        n_a, n_b = counts[a], counts[b]
+        total = n_a * n_b
+        if not total.sum():
+            continue
+        # Every (member of cell a, member of cell b) combination, without a Python loop
+        owner = np.repeat(np.arange(len(a)), total)
+        k = np.arange(total.sum()) - np.repeat(np.cumsum(total) - total, total)
+        i = order[first[a][owner] + k // n_b[owner]]
+        j = order[first[b][owner] + k % n_b[owner]]
+        if (dx, dy) == (0, 0):
+            keep = i < j
+            i, j = i[keep], j[keep]
+        close = (x[i] - x[j]) ** 2 + (y[i] - y[j]) ** 2 < spacing ** 2
+        pairs_i.append(i[close])
+        pairs_j.append(j[close])
+    if not pairs_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+
+def relax_angles(r, theta, spacing, iterations=4):
+    """
+    Push overlapping pages apart along their orbit: each close pair gets
+    half the overlap each, projected onto the tangent of its circle, so
+    every radius (= semantic distance) stays exact.
+    """
+    theta = np.asarray(theta, dtype=np.float64).copy()
+    if spacing <= 0 or len(theta) < 2:
+        return theta
+    n = len(theta)
+    reach = np.maximum(r, spacing)  # angular steps near the centre stay bounded
+    for _ in range(iterations):
+        x, y = r * np.cos(theta), r * np.sin(theta)
+        i, j = close_pairs(x, y, spacing)
+        if not len(i):
+            break
+        dx, dy = x[i] - x[j], y[i] - y[j]
+        dist = np.sqrt(dx ** 2 + dy ** 2)
+        # Coincident pages: split them along the orbit
+        same = dist < 1e-12
+        dx[same], dy[same], dist[same] = -np.sin(theta[i[same]]), np.cos(theta[i[same]]), 1.0
+        push = (spacing - np.where(same, 0.0, dist)) / 2 / dist
+        px, py = dx * push, dy * push
+        # Tangential component for each end of the pair (i moves +push, j moves −push)
+        step_i = (px * -np.sin(theta[i]) + py * np.cos(theta[i])) / reach[i]
+        step_j = (px * np.sin(theta[j]) - py * np.cos(theta[j])) / reach[j]
+        # Average rather than sum a page's pushes, so crowded pages don't overshoot into their neighbours
+        moves = np.bincount(i, weights=step_i, minlength=n) + np.bincount(j, weights=step_j, minlength=n)
+        contacts = np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+        theta += moves / np.maximum(contacts, 1)
+    return theta
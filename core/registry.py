@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from core.dataset import PageDataset
+
+# A session not seen for this long (its tab was closed) no longer holds its datasets
+SESSION_TTL = int(os.environ.get("SDA_SESSION_TTL", 1800))
+# A dataset no session holds is dropped after this many idle seconds
+IDLE_TTL = int(os.environ.get("SDA_REGISTRY_IDLE", 300))
+
+
+class DatasetRegistry:
+    """
+    Process-wide registry: one copy of each dataset, shared by every session.
+
+    Datasets are keyed by the same content hash as the DatasetCache. The
+    first session to open one loads it and the matrix is swapped for the
+    cache's read-only memory-mapped copy, so sessions — and other
+    processes on the box — share it through the page cache. Every session
+    gets `ds.copy()`: its own metadata frame over the shared columns
+    (copy-on-write) and matrix, for its per-session results.
+
+    A session holds one dataset per `slot` ("crawl", "merged") until it
+    acquires another key for the slot or `release`s it; the registry
+    counts the sessions holding each dataset and drops it once none has
+    for IDLE_TTL seconds. Sessions unseen for SESSION_TTL seconds (closed
+    tabs, which Streamlit doesn't report) are treated as closed.
+    """
+
+    def __init__(self, cache, session_ttl=SESSION_TTL, idle_ttl=IDLE_TTL):
+        self.cache = cache
+        self.session_ttl = session_ttl
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._entries = {}   # key → {"ds", "label", "ready", "last_used"}
+        self._sessions = {}  # session id → {"slots": {slot: key}, "last_seen": time}
+
+    def acquire(self, session, slot, key, load, label=""):
+        """
+        Return (view, shared) for `key`: `shared` is True when another
+        session already had it open. Otherwise `load()` runs once (other
+        sessions asking meanwhile wait for it); if it returns None nothing
+        is registered and (None, False) is returned.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            shared = entry is not None
+            if not shared:
+                entry = self._entries[key] = {"ds": None, "label": label, "ready": threading.Event(),
+                                              "last_used": time.time()}
+
+        if shared:
+            entry["ready"].wait()
+            if entry["ds"] is None:
+                raise RuntimeError(f"Loading '{entry['label'] or key}' failed in another session.")
+        else:
+            try:
+                ds = load()
+                entry["ds"] = None if ds is None else self._share(key, ds, label)
+            finally:
+                if entry["ds"] is None:
+                    with self._lock:
+                        self._entries.pop(key, None)
+                entry["ready"].set()
+            if entry["ds"] is None:
+                return None, False
+
+        with self._lock:
+            self._session(session)["slots"][slot] = key
+            entry["last_used"] = time.time()
+        return entry["ds"].copy(), shared
+
+    def _share(self, key, ds, label):
+        """The one copy kept: the cache's memory-mapped matrix if possible, else a read-only in-RAM one."""
+        if ds.quantized:
+            return ds
+        # `open`, not `get`: the hit / miss counters are for the app's own lookups
+        mapped = self.cache.open(key)
+        if mapped is None:
+            # Also for memmaps (e.g. a merge gathered next to the crawl): the cache copy outlives them
+            self.cache.put(key, ds, label=label)
+            mapped = self.cache.open(key)
+        if mapped is not None and mapped.embeddings.shape == ds.embeddings.shape:
+            ds = PageDataset(ds.meta, mapped.embeddings, ds.normalised, ds._norms)
+        elif not isinstance(ds.embeddings, np.memmap):
+            ds.embeddings.flags.writeable = False
+        return ds
+
+    def _session(self, session):
+        info = self._sessions.setdefault(session, {"slots": {}, "last_seen": time.time()})
+        info["last_seen"] = time.time()
+        return info
+
+    def touch(self, session):
+        """Mark `session` as alive (call once per rerun) and evict what nobody uses any more."""
+        with self._lock:
+            now = time.time()
+            for key in self._session(session)["slots"].values():
+                if key in self._entries:
+                    self._entries[key]["last_used"] = now
+        self.evict_idle()
+
+    def release(self, session, slot=None):
+        """
+        Stop `session` holding the dataset in `slot` (every slot if None),
+        e.g. the crawl once it is merged or everything when the uploads are
+        removed. A dataset no session holds is dropped after `idle_ttl`.
+        """
+        with self._lock:
+            slots = self._sessions.get(session, {}).get("slots", {})
+            released = list(slots) if slot is None else [slot]
+            for name in released:
+                key = slots.pop(name, None)
+                if key in self._entries:
+                    self._entries[key]["last_used"] = time.time()
+
+    def evict_idle(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            for session, info in list(self._sessions.items()):
+                if now - info["last_seen"] > self.session_ttl:
+                    del self._sessions[session]
+            held = self._held()
+            for key, entry in list(self._entries.items()):
+                if key not in held and entry["ready"].is_set() and now - entry["last_used"] > self.idle_ttl:
+                    del self._entries[key]
+
+    def _held(self):
+        """{key: number of sessions holding it}."""
+        counts = {}
+        for info in self._sessions.values():
+            for key in set(info["slots"].values()):
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def held_by(self, session):
+        with self._lock:
+            return dict(self._sessions.get(session, {}).get("slots", {}))
+
+    def stats(self):
+        """One row per shared dataset: rows, matrix / metadata MB, memory-mapped or not, sessions holding it."""
+        with self._lock:
+            held = self._held()
+            entries = [(key, e) for key, e in self._entries.items() if e["ds"] is not None]
+        now = time.time()
+        rows = [{
+            "label": e["label"] or key[:8],
+            "rows": len(e["ds"]),
+            "matrix_mb": e["ds"].embeddings.nbytes / 1e6,
+            "meta_mb": frame_bytes(e["ds"].meta) / 1e6,
+            "mapped": isinstance(e["ds"].embeddings, np.memmap),
+            "sessions": held.get(key, 0),
+            "idle_s": 0 if key in held else round(now - e["last_used"]),
+        } for key, e in entries]
+        return pd.DataFrame(rows, columns=["label", "rows", "matrix_mb", "meta_mb", "mapped", "sessions", "idle_s"])
+
+    def shared_columns(self, session):
+        """Metadata column names of the datasets `session` holds — shared, so not the session's own memory."""
+        with self._lock:
+            keys = set(self._sessions.get(session, {}).get("slots", {}).values())
+            return {col for key in keys if key in self._entries and self._entries[key]["ds"] is not None
+                    for col in self._entries[key]["ds"].meta.columns}
+
+
+def frame_bytes(df, skip=()):
+    """Memory of a DataFrame's columns (Arrow / numpy buffers), leaving out `skip`."""
+    cols = [c for c in df.columns if c not in skip]
+    return int(df[cols].memory_usage(index=False, deep=False).sum()) if cols else 0
+
+
+def owned_bytes(obj, shared_columns=(), _seen=None):
+    """
+    Rough memory a session holds in `obj` (stage results: tuples, dicts,
+    PageDatasets, DataFrames, arrays), not counting memory-mapped matrices
+    or metadata columns shared through the registry.
+    """
+    seen = set() if _seen is None else _seen
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (tuple, list)):
+        return sum(owned_bytes(o, shared_columns, seen) for o in obj)
+    if isinstance(obj, dict):
+        return sum(owned_bytes(o, shared_columns, seen) for o in obj.values())
+    if isinstance(obj, PageDataset):
+        return owned_bytes(obj.meta, shared_columns, seen) + owned_bytes(obj.embeddings, shared_columns, seen)
+    if isinstance(obj, pd.DataFrame):
+        return frame_bytes(obj, skip=shared_columns)
+    if isinstance(obj, pd.Series):
+        return 0 if obj.name in shared_columns else int(obj.memory_usage(index=False))
+    if isinstance(obj, np.memmap) or (isinstance(obj, np.ndarray) and isinstance(obj.base, np.memmap)):
+        return 0
+    if isinstance(obj, np.ndarray):
+        # Read-only arrays are the registry's shared in-RAM matrices
+        return 0 if not obj.flags.writeable and obj.base is None else obj.nbytes
+    return int(getattr(obj, "nbytes", 0))
@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+import numpy as np
+
+# Compile UMAP in the background when the app starts (SDA_WARMUP=0 to disable)
+WARM_UP = os.environ.get("SDA_WARMUP", "1") != "0"
+
+_lock = threading.Lock()
+_state = {"status": "not started", "seconds": None, "error": None}
+
+
+def warm_up(rows=400, dim=32):
+    """
+    Import umap and run one tiny fit + transform with the app's settings, so
+    numba compiles the kernels the first real projection would wait for.
+    NNDescent is forced on (real sites are past UMAP's exact-kNN cut-off).
+    """
+    from core import projection  # noqa: F401 — sets NUMBA_CACHE_DIR before numba loads
+    import umap
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((rows, dim), dtype=np.float32)
+    reducer = umap.UMAP(n_neighbors=15, min_dist=0.1, metric="cosine", random_state=42,
+                        n_epochs=20, force_approximation_algorithm=True)
+    reducer.fit(X)
+    reducer.transform(X[:10])
+
+
+def _run():
+    t0 = time.perf_counter()
+    try:
+        warm_up()
+        _state["status"] = "ready"
+    except Exception as exc:  # a failed warm-up only costs the first projection its JIT time
+        _state["status"], _state["error"] = "failed", repr(exc)
+    _state["seconds"] = time.perf_counter() - t0
+
+
+def start_warm_up():
+    """Start `warm_up` on a daemon thread, once per process; returns `warm_up_status()`."""
+    with _lock:
+        if _state["status"] == "not started":
+            _state["status"] = "running"
+            threading.Thread(target=_run, name="sda-warm-up", daemon=True).start()
+    return warm_up_status()
+
+
+def warm_up_status():
+    """{"status": not started / running / ready / failed, "seconds", "error"}."""
+    return dict(_state)
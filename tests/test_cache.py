@@ -0,0 +1,30 @@
+import threading
+import numpy as np
+import pandas as pd
+from core.cache import DatasetCache
+from core.dataset import PageDataset
+
+
+def test_concurrent_puts_of_one_key(tmp_path):
+    cache = DatasetCache(str(tmp_path))
+    ds = PageDataset(pd.DataFrame({"Address": [f"https://example.com/p{i}" for i in range(20)]}),
+                     np.random.default_rng(0).standard_normal((20, 8), dtype=np.float32))
+    errors = []
+
+    def put():
+        try:
+            for _ in range(10):
+                cache.put("abc123", ds, label="crawl.csv")
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=put) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert cache.entries()["key"].tolist() == ["abc123"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["abc123"]
+    np.testing.assert_array_equal(cache.get("abc123").embeddings, ds.embeddings)
@@ -0,0 +1,19 @@
+import cli
+from core.history import DriftHistory
+from tests.test_data_loader import gsc_for, write_crawl
+
+
+def test_quantized_history_run_reuses_float32_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "DriftHistory", lambda: DriftHistory(str(tmp_path / "history")))
+    urls = [f"https://example.com/p{i}" for i in range(200)]
+    write_crawl(tmp_path / "crawl.csv", urls, dim=16)
+    gsc_for(urls).to_csv(tmp_path / "gsc.csv", index=False)
+    job = {"site": "example.com", "crawl": str(tmp_path / "crawl.csv"), "gsc": str(tmp_path / "gsc.csv")}
+
+    reports = [
+        cli.run_site(job, str(tmp_path / "out"), backend="pca", use_store=False, history=True, pin_centre=True,
+                     crawl_date=date, precision=precision)
+        for date, precision in [("2026-09-01", "float32"), ("2026-10-01", "int8_row"), ("2026-11-01", "float32")]
+    ]
+    assert [r["status"] for r in reports] == ["ok"] * 3
+    assert [r["reused"] for r in reports] == [0, 200, 200]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from core.data_loader import load_screaming_frog, load_screaming_frog_chunked, merge_data
+from utils.instrument import recording
+
+
+def write_crawl(path, urls, dim=4, seed=0):
+    emb = np.random.default_rng(seed).standard_normal((len(urls), dim)).astype(np.float32)
+    pd.DataFrame({
+        "Address": urls,
+        "Inlinks": np.arange(len(urls)) + 1,
+        "Embeddings": ["[" + ",".join(f"{v:.6f}" for v in row) + "]" for row in emb],
+    }).to_csv(path, index=False)
+    return emb
+
+
+def gsc_for(urls):
+    return pd.DataFrame({"Page": urls, "Clicks": np.arange(len(urls))})
+
+
+def test_merge_keeps_memmap_after_dedup(tmp_path):
+    urls = [f"https://example.com/p{i}/" for i in range(50)]
+    # One tracking-parameter copy of page 3 canonicalises onto it and is dropped
+    emb = write_crawl(tmp_path / "crawl.csv", urls + ["https://example.com/p3/?utm=1"])
+    sf = load_screaming_frog_chunked(tmp_path / "crawl.csv", mmap_path=str(tmp_path / "emb.f32"))
+    assert isinstance(sf.embeddings, np.memmap)
+
+    merged = merge_data(sf, gsc_for(urls), mmap_path=str(tmp_path / "merged.f32"))
+    assert len(merged) == 50
+    assert isinstance(merged.embeddings, np.memmap)
+    np.testing.assert_allclose(merged.embeddings, emb[:50], atol=1e-6)
+
+
+def test_url_match_names_only_the_rules_that_differ(tmp_path):
+    crawl = ["https://example.com/same/", "https://example.com/slash/", "https://example.com/Case",
+             "http://www.example.com/folded"]
+    gsc = ["https://example.com/same/", "https://example.com/slash", "https://example.com/case",
+           "http://example.com/folded"]
+    write_crawl(tmp_path / "crawl.csv", crawl)
+    sf = load_screaming_frog_chunked(tmp_path / "crawl.csv")
+
+    merged = merge_data(sf, gsc_for(gsc))
+    assert merged.meta["URL Match"].tolist() == [
+        "exact", "trailing slash", "case", "unmatched (would match with www folding)",
+    ]
+    merged = merge_data(sf, gsc_for(gsc), fold_www=True, fold_protocol=True)
+    assert merged.meta["URL Match"].tolist()[-1] == "www"
+
+
+def test_columnar_crawl_drops_non_finite_rows(tmp_path):
+    urls = [f"https://example.com/p{i}" for i in range(6)]
+    emb = np.random.default_rng(0).standard_normal((6, 4)).astype(np.float32)
+    emb[1, 2], emb[3, 0] = np.nan, np.inf
+    table = pa.table({"Address": urls, "Inlinks": np.arange(6) + 1})
+
+    fixed = pa.FixedSizeListArray.from_arrays(pa.array(emb.ravel()), 4)
+    feather.write_feather(table.append_column("Embeddings", fixed), tmp_path / "crawl.arrow")
+    # Variable-length float64 lists, no nulls anywhere
+    listed = pa.array(emb.astype(np.float64).tolist(), type=pa.list_(pa.float64()))
+    pq.write_table(table.append_column("Embeddings", listed), tmp_path / "crawl.parquet")
+
+    for name in ("crawl.arrow", "crawl.parquet"):
+        ds = load_screaming_frog_chunked(tmp_path / name)
+        assert ds.meta["Address"].tolist() == [urls[i] for i in (0, 2, 4, 5)], name
+        np.testing.assert_array_equal(ds.embeddings, emb[[0, 2, 4, 5]])
+
+
+def test_columnar_crawl_is_one_load_crawl_span(tmp_path):
+    urls = [f"https://example.com/p{i}" for i in range(4)]
+    emb = pa.FixedSizeListArray.from_arrays(pa.array(np.ones(16, dtype=np.float32)), 4)
+    feather.write_feather(pa.table({"Address": urls, "Inlinks": [1, 2, 3, 4], "Embeddings": emb}),
+                          tmp_path / "crawl.arrow")
+    with recording() as recorder:
+        load_screaming_frog(tmp_path / "crawl.arrow")
+    assert [s["stage"] for s in recorder.spans].count("load_crawl") == 1
@@ -0,0 +1,13 @@
+import numpy as np
+import pandas as pd
+from utils.parser import parse_embedding_matrix
+
+
+def test_parse_embedding_matrix_drops_non_finite_rows():
+    values = pd.Series(["[0.1, 0.2, 0.3]", "[nan, 0.2, 0.3]", "0.1|inf|0.3", "[0.4, -inf, 0.6]",
+                        "[1e39, 0.2, 0.3]", "[0.7, 0.8, 0.9]"], index=list("abcdef"))
+    matrix, row_ids, bad_rows = parse_embedding_matrix(values)
+
+    assert list(row_ids) == ["a", "f"]
+    np.testing.assert_allclose(matrix, [[0.1, 0.2, 0.3], [0.7, 0.8, 0.9]], rtol=1e-6)
+    assert bad_rows == {label: "non-finite value" for label in "bcde"}
@@ -0,0 +1,14 @@
+import numpy as np
+from core.projection import knn_recall
+
+
+def test_knn_recall_blocked_over_memmap(tmp_path):
+    emb = np.random.default_rng(0).standard_normal((500, 2)).astype(np.float32)
+    # A 2D layout identical to the original space keeps every neighbour
+    assert knn_recall(emb, emb, metric="euclidean", n_queries=100, block_rows=64) == 1.0
+
+    mm = np.memmap(tmp_path / "emb.f32", dtype=np.float32, mode="w+", shape=emb.shape)
+    mm[:] = emb
+    proj = emb + np.random.default_rng(1).standard_normal(emb.shape) * 0.2
+    expected = knn_recall(emb, proj, n_queries=100, block_rows=len(emb))
+    assert knn_recall(mm, proj, n_queries=100, block_rows=64) == expected
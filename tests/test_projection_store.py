@@ -0,0 +1,27 @@
+import threading
+import numpy as np
+import pandas as pd
+from core.projection_store import ProjectionStore
+
+
+def test_concurrent_saves_of_one_site(tmp_path):
+    store = ProjectionStore(str(tmp_path))
+    errors = []
+
+    def save(i):
+        try:
+            for _ in range(10):
+                store.save("example.com", {"reducer": i}, pd.DataFrame({"x": [i]}), np.zeros(3), {"run": i})
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=save, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert store.sites() == ["example.com"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["example.com"]
+    assert store.load("example.com")["meta"]["run"] in range(4)
@@ -0,0 +1,40 @@
+import time
+import numpy as np
+import pandas as pd
+from core.cache import DatasetCache
+from core.dataset import PageDataset
+from core.registry import DatasetRegistry
+
+
+def dataset(rows=10, dim=4):
+    return PageDataset(pd.DataFrame({"Address": [f"https://example.com/p{i}" for i in range(rows)]}),
+                       np.random.default_rng(0).standard_normal((rows, dim), dtype=np.float32))
+
+
+def test_release_drops_unheld_datasets_after_idle(tmp_path):
+    registry = DatasetRegistry(DatasetCache(str(tmp_path)), idle_ttl=60)
+    registry.acquire("a", "crawl", "k1", dataset)
+    registry.acquire("a", "merged", "k2", dataset)
+    _, shared = registry.acquire("b", "merged", "k2", dataset)
+    assert shared
+    assert dict(zip(registry.stats()["label"], registry.stats()["sessions"])) == {"k1": 1, "k2": 2}
+
+    registry.release("a", "crawl")
+    registry.release("b")
+    assert registry.held_by("a") == {"merged": "k2"}
+    assert registry.held_by("b") == {}
+
+    registry.evict_idle()
+    assert sorted(registry.stats()["label"]) == ["k1", "k2"]
+    registry.evict_idle(now=time.time() + 61)
+    assert registry.stats()["label"].tolist() == ["k2"]
+
+
+def test_sharing_a_fresh_upload_counts_one_cache_miss(tmp_path):
+    cache = DatasetCache(str(tmp_path))
+    registry = DatasetRegistry(cache)
+    # As the app's crawl stage: look the upload up, load it on a miss
+    ds, shared = registry.acquire("a", "crawl", "k1", lambda: cache.get_or_compute("k1", dataset)[0])
+    assert not shared
+    assert isinstance(ds.embeddings, np.memmap)
+    assert (cache.hits, cache.misses) == (0, 1)
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+from ui.visuals import build_radial_chart
+
+
+def layout_frame(pages, seed=0):
+    rng = np.random.default_rng(seed)
+    angle, radius = rng.uniform(0, 2 * np.pi, pages), rng.uniform(0, 1, pages)
+    return pd.DataFrame({
+        "Address": [f"https://example.com/p{i}" for i in range(pages)],
+        "Clicks": rng.integers(0, 1000, pages),
+        "Inlinks": rng.integers(1, 500, pages),
+        "SDI": rng.uniform(0, 1, pages),
+        "distance_from_centre": radius,
+        "x_radial": radius * np.cos(angle),
+        "y_radial": radius * np.sin(angle),
+    })
+
+
+def test_chart_above_altair_max_rows_without_level_of_detail():
+    for lod_threshold in (None, 10000):
+        spec = build_radial_chart(layout_frame(8000), lod_threshold=lod_threshold).to_dict()
+        pages = sum(len(rows) for rows in spec["datasets"].values() if rows and "Address" in rows[0])
+        assert pages == 8000
@@ -1,10 +1,88 @@
 import streamlit as st
 
 def sidebar():
-    st.sidebar.header("⚙️ Configuration")
-    alpha = st.sidebar.slider("Traffic Weight (α)", 0.0, 1.0, 0.6, 0.05)
-    beta = st.sidebar.slider("Inlinks Weight (β)", 0.0, 1.0, 0.3, 0.05)
-    gamma = st.sidebar.slider("Depth Weight (γ)", 0.0, 1.0, 0.1, 0.05)
+    """Centroid weights for `compute_centroid` / `reweight` (α content, β links, γ clicks)."""
+    st.sidebar.header("⚙️ Centroid Weights")
+    alpha = st.sidebar.slider("Content Weight (α)", 0.0, 1.0, 0.6, 0.05,
+                              help="Every page counts equally towards the topical centre")
+    beta = st.sidebar.slider("Internal Links Weight (β)", 0.0, 1.0, 0.3, 0.05,
+                             help="Pulls the centre towards well-linked pages (Inlinks or Link Authority)")
+    gamma = st.sidebar.slider("Clicks Weight (γ)", 0.0, 1.0, 0.1, 0.05,
+                              help="Pulls the centre towards pages with Search Console clicks")
+    if alpha + beta + gamma == 0:
+        st.sidebar.warning("All weights are 0 — using content weight 1.")
+        alpha = 1.0
     st.sidebar.markdown("---")
-    highlight_navboost = st.sidebar.checkbox("Highlight NavBoost Drift", True)
-    return alpha, beta, gamma, highlight_navboost
+    return {"alpha": alpha, "beta": beta, "gamma": gamma}
+
+
+def projection_backend(backends):
+    """Select box over {name: description} projection backends."""
+    return st.sidebar.selectbox(
+        "Projection Backend",
+        options=list(backends),
+        format_func=lambda name: backends[name],
+        index=0,
+    )
+
+
+def embedding_precision(precisions):
+    """Select box over {mode: description} embedding storage precisions."""
+    return st.sidebar.selectbox(
+        "Embedding Precision (drift metrics)",
+        options=list(precisions),
+        format_func=lambda name: precisions[name],
+        index=0,
+    )
+
+
+def cache_panel(cache):
+    with st.sidebar.expander("🗄️ Dataset Cache", expanded=False):
+        entries = cache.entries()
+        st.caption(
+            f"{len(entries)} datasets · {entries['bytes'].sum() / 1e6:.1f} MB "
+            f"of {cache.max_bytes / 1e6:.0f} MB · {cache.hits} hits / {cache.misses} misses"
+        )
+        if not entries.empty:
+            view = entries[["label", "rows", "bytes", "last_used"]].copy()
+            view["bytes"] = (view["bytes"] / 1e6).round(1)
+            view.columns = ["Dataset", "Rows", "MB", "Last used"]
+            st.dataframe(view, hide_index=True, use_container_width=True)
+        if st.button("Clear cache", disabled=entries.empty):
+            cache.clear()
+            st.rerun()
+
+
+def memory_panel(registry, session_bytes):
+    """Datasets shared by every session vs the memory this session's own results hold."""
+    with st.sidebar.expander("🧠 Memory", expanded=False):
+        shared = registry.stats()
+        st.caption(
+            f"Shared: {len(shared)} datasets · {(shared['matrix_mb'].sum() + shared['meta_mb'].sum()):.1f} MB "
+            f"({shared.loc[shared['mapped'], 'matrix_mb'].sum():.1f} MB memory-mapped) · "
+            f"this session: {session_bytes / 1e6:.1f} MB"
+        )
+        if not shared.empty:
+            view = shared.copy()
+            view[["matrix_mb", "meta_mb"]] = view[["matrix_mb", "meta_mb"]].round(1)
+            view.columns = ["Dataset", "Rows", "Matrix MB", "Metadata MB", "Mapped", "Sessions", "Idle (s)"]
+            st.dataframe(view, hide_index=True, use_container_width=True)
+
+
+def diagnostics_panel(warm_up=None):
+    """Sidebar toggles; returns (profile with cProfile, run stages sequentially)."""
+    with st.sidebar.expander("🩺 Diagnostics", expanded=False):
+        st.caption(
+            "Each stage's wall / CPU time, memory and row counts are listed in the processing panel. "
+            "Set SDA_METRICS_LOG to a file path (or '-') to also write them as JSON lines, "
+            "SDA_TRACEMALLOC=1 to track Python/numpy allocations."
+        )
+        if warm_up is not None:
+            done = f" in {warm_up['seconds']:.1f}s" if warm_up["seconds"] is not None else ""
+            st.caption(f"UMAP warm-up: {warm_up['status']}{done}" + (f" ({warm_up['error']})" if warm_up["error"] else ""))
+        profile = st.checkbox("Profile runs with cProfile", value=False)
+        sequential = st.checkbox(
+            "Run stages sequentially", value=False,
+            help="One stage at a time, as before the concurrent executor — to compare end-to-end latency",
+        )
+        return profile, sequential
@@ -1,25 +1,106 @@
-import altair as alt
 import numpy as np
 import pandas as pd
 import streamlit as st
+from core.radial_layout import compute_radial_layout
+from utils.instrument import instrumented
+
+PALETTES = [
+    "Viridis (uniform)",
+    "Blue-Green-Yellow (semantic flow)",
+    "Red-Blue Divergent (legacy)"
+]
+
+# The only columns the chart encodes or shows in tooltips
+CHART_COLUMNS = ["Address", "Clicks", "Inlinks", "SDI", "distance_from_centre",
+                 "x_radial", "y_radial", "size_scaled", "opacity_scaled"]
+
+# Altair's default max_rows: larger DataFrames raise MaxRowsError when serialised
+LAYER_ROWS = 5000
+
 
 def plot_radial_topical_map(df):
-    st.subheader("🌐 Semantic Drift Visualisation")
+    """Sidebar controls + chart build + display in one call."""
+    controls = radial_controls()
+    show_radial_chart(build_radial_chart(df, **controls))
+
 
-    # --- Controls ---
+def radial_controls():
+    """Sidebar widgets for the radial map; purely visual — no data dependency."""
     chart_size = st.sidebar.slider("Chart Size", 400, 1000, 700, 50)
-    radius_max = 1.0
     size_scale = st.sidebar.slider("Max Bubble Size (Clicks)", 100, 5000, 400, 50)
     opacity_min = st.sidebar.slider("Minimum Bubble Opacity", 0.1, 0.8, 0.2, 0.05)
     show_labels = st.sidebar.checkbox("Show Zone Labels", value=True)
+    opacity_strength = st.sidebar.slider(
+        "Opacity Strength (contrast between weak/strong links)",
+        1.0, 5.0, 3.0, 0.1
+    )
+    palette_choice = st.sidebar.selectbox(
+        "Color Palette for SDI (Drift)",
+        options=PALETTES,
+        index=0
+    )
+    lod_threshold = st.sidebar.number_input(
+        "Draw pages individually up to (density map above)",
+        min_value=1000, max_value=200000, value=5000, step=1000
+    )
+    return {
+        "chart_size": chart_size,
+        "size_scale": size_scale,
+        "opacity_min": opacity_min,
+        "show_labels": show_labels,
+        "opacity_strength": opacity_strength,
+        "palette_choice": palette_choice,
+        "lod_threshold": int(lod_threshold),
+    }
+
+
+def density_grid(df, cells=80, extent=1.2):
+    """Bin pages into a cells × cells grid over the chart area: page count and mean SDI per occupied cell."""
+    edges = np.linspace(-extent, extent, cells + 1)
+    ix = np.clip(np.searchsorted(edges, df["x_radial"].to_numpy(), side="right") - 1, 0, cells - 1)
+    iy = np.clip(np.searchsorted(edges, df["y_radial"].to_numpy(), side="right") - 1, 0, cells - 1)
+    flat = ix * cells + iy
+    counts = np.bincount(flat, minlength=cells * cells)
+    sdi_sum = np.bincount(flat, weights=df["SDI"].fillna(0).to_numpy(), minlength=cells * cells)
+
+    occupied = np.flatnonzero(counts)
+    centres = (edges[:-1] + edges[1:]) / 2
+    return pd.DataFrame({
+        "x_radial": centres[occupied // cells].round(4),
+        "y_radial": centres[occupied % cells].round(4),
+        "pages": counts[occupied],
+        "SDI": (sdi_sum[occupied] / counts[occupied]).round(4),
+        "density": np.log1p(counts[occupied]).round(3),
+    })
+
+
+def top_pages(df, n):
+    """Union of the top `n` pages by SDI, Clicks and Inlinks — always drawn as points."""
+    keep = pd.Index([])
+    for col in ["SDI", "Clicks", "Inlinks"]:
+        keep = keep.union(df[col].fillna(0).nlargest(n).index)
+    return df.loc[keep]
+
 
-    # --- Normalise inputs ---
-    df["r_norm"] = (df["distance_from_centre"] / df["distance_from_centre"].max()) * radius_max
-    df["theta"] = np.linspace(0, 2 * np.pi, len(df), endpoint=False)
+@instrumented("chart")
+def build_radial_chart(df, chart_size=700, size_scale=400, opacity_min=0.2,
+                       show_labels=True, opacity_strength=3.0, palette_choice=PALETTES[0],
+                       lod_threshold=5000, top_n=500, density_cells=80):
+    """
+    Build the layered Altair radial map. No Streamlit calls, safe to memoise.
 
-    # Convert polar → cartesian for plotting
-    df["x_radial"] = df["r_norm"] * np.cos(df["theta"])
-    df["y_radial"] = df["r_norm"] * np.sin(df["theta"])
+    Only CHART_COLUMNS reach the spec. Above `lod_threshold` pages the bulk
+    is drawn as a binned density layer and only the `top_n` pages by SDI,
+    Clicks and Inlinks are drawn individually (None = always draw every page).
+    Page positions come from `compute_radial_layout` (x_radial / y_radial).
+    """
+    import altair as alt  # on first chart, not at app start
+
+    df = df.copy(deep=False)
+
+    # --- Polar layout: normally precomputed once per dataset by the layout stage ---
+    if not {"x_radial", "y_radial"} <= set(df.columns):
+        df = compute_radial_layout(df)
 
     # Visual encodings - MUCH BIGGER DOTS
     clicks_min = df["Clicks"].fillna(0).min()
@@ -45,11 +126,6 @@ def plot_radial_topical_map(df):
     clicks_norm = (df["clicks_log"] / clicks_cap).clip(0, 1)
 
     # Weighted blend: 80% structure (inlinks), 20% engagement (clicks)
-    opacity_strength = st.sidebar.slider(
-        "Opacity Strength (contrast between weak/strong links)",
-        1.0, 5.0, 3.0, 0.1
-    )
-
     # Stronger nonlinear emphasis on link prominence
     link_weight = np.power(inlink_norm, 1 / opacity_strength)
     click_weight = np.power(clicks_norm, 1 / (opacity_strength * 1.5))
@@ -62,6 +138,13 @@ def plot_radial_topical_map(df):
     # Map into 0–1 range with floor from opacity_min
     df["opacity_scaled"] = (contrast_boost * (1 - opacity_min)) + opacity_min
 
+    # --- Slim payload + level of detail ---
+    sdi_max = df["SDI"].max()
+    df = df[CHART_COLUMNS].round(4)
+    density = None
+    if lod_threshold is not None and len(df) > lod_threshold:
+        density = density_grid(df, cells=density_cells)
+        df = top_pages(df, top_n)
 
     # Tooltip fields
     tooltip = [
@@ -110,28 +193,18 @@ def plot_radial_topical_map(df):
         circle_layers.append(circle_layer)
 
     # --- Color scheme selection ---
-    palette_choice = st.sidebar.selectbox(
-        "Color Palette for SDI (Drift)",
-        options=[
-            "Viridis (uniform)",
-            "Blue-Green-Yellow (semantic flow)",
-            "Red-Blue Divergent (legacy)"
-        ],
-        index=0
-    )
-
     if palette_choice == "Viridis (uniform)":
-        color_scale = alt.Scale(scheme="viridis", domain=[0, df["SDI"].max()])
+        color_scale = alt.Scale(scheme="viridis", domain=[0, sdi_max])
     elif palette_choice == "Blue-Green-Yellow (semantic flow)":
         color_scale = alt.Scale(
-            domain=[0, df["SDI"].max()],
+            domain=[0, sdi_max],
             range=["#007AFF", "#00C853", "#FFEA00"]
         )
     else:  # Red-Blue Divergent (legacy)
-        color_scale = alt.Scale(scheme="redblue", reverse=True, domain=[0, df["SDI"].max()])
+        color_scale = alt.Scale(scheme="redblue", reverse=True, domain=[0, sdi_max])
 
     chart = (
-        alt.Chart(df)
+        alt.Chart()
         .mark_circle()
         .encode(
             x=alt.X("x_radial", 
@@ -147,11 +220,33 @@ def plot_radial_topical_map(df):
             opacity=alt.Opacity("opacity_scaled", legend=None),
             tooltip=tooltip,
         )
-        .interactive()
     )
 
+    layers_to_combine = [*circle_layers]
+    if density is not None:
+        # Grid spans the full (-1.2, 1.2) domain, so one cell is chart_size / cells pixels
+        cell_px = chart_size / density_cells
+        density_layer = (
+            alt.Chart()
+            .mark_square(size=cell_px ** 2)
+            .encode(
+                x=alt.X("x_radial", scale=alt.Scale(domain=(-1.2, 1.2))),
+                y=alt.Y("y_radial", scale=alt.Scale(domain=(-1.2, 1.2))),
+                color=alt.Color("SDI:Q", scale=color_scale, legend=None),
+                opacity=alt.Opacity("density:Q", scale=alt.Scale(range=[0.15, 0.85]), legend=None),
+                tooltip=[
+                    alt.Tooltip("pages:Q", title="Pages", format=","),
+                    alt.Tooltip("SDI:Q", title="Mean SDI", format=".3f"),
+                ],
+            )
+        )
+        layers_to_combine.extend(_row_chunks(density_layer, density))
+    points = _row_chunks(chart, df)
+    # Scales are shared across the layer, so one zoom / pan binding moves every chunk
+    points[0] = points[0].interactive()
+    layers_to_combine.extend(points)
+
         # --- Labels (conditional based on toggle) ---
-    layers_to_combine = [*circle_layers, chart]
     
     if show_labels:
         orbit_labels = pd.DataFrame({
@@ -200,6 +295,20 @@ def plot_radial_topical_map(df):
         .configure_view(stroke=None)
         .configure_axis(grid=False, labels=False, ticks=False)
     )
+    return final_chart
+
+
+def _row_chunks(chart, df, rows=LAYER_ROWS):
+    """
+    `chart` once per slice of at most `rows` rows of `df`: the layer may hold
+    every page (`lod_threshold` above 5,000 or None) and still serialise
+    without disabling Altair's max_rows check globally.
+    """
+    return [chart.properties(data=df.iloc[start:start + rows]) for start in range(0, max(len(df), 1), rows)]
+
+
+def show_radial_chart(final_chart):
+    st.subheader("🌐 Semantic Drift Visualisation")
 
     # --- Display chart, centered ---
     col1, col2, col3 = st.columns([1, 6, 1])
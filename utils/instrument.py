@@ -0,0 +1,223 @@
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# JSON-lines metrics: a file path, or "-" for stderr. Unset = no log lines.
+METRICS_LOG = os.environ.get("SDA_METRICS_LOG")
+
+# tracemalloc slows Python-heavy code 2-3×, so allocation tracking is opt-in
+if os.environ.get("SDA_TRACEMALLOC") == "1":
+    tracemalloc.start()
+
+_active = contextvars.ContextVar("sda_recorder", default=None)
+_stack = contextvars.ContextVar("sda_span_stack", default=())
+_log_lock = threading.Lock()
+
+
+def set_metrics_log(target):
+    """Send span records to `target` (path or "-" for stderr) as JSON lines; None turns it off."""
+    global METRICS_LOG
+    METRICS_LOG = target
+
+
+def _rss_mb():
+    """Current resident set size (MB), or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb():
+    """Process high-water RSS (MB)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3  # bytes on macOS, KB elsewhere
+
+
+def _emit(record):
+    if not METRICS_LOG:
+        return
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        if METRICS_LOG == "-":
+            print(line, file=sys.stderr, flush=True)
+        else:
+            with open(METRICS_LOG, "a") as fh:
+                fh.write(line + "\n")
+
+
+class Recorder:
+    """Collects the span records of one run (an app rerun or one CLI site)."""
+
+    def __init__(self, run=None):
+        self.run = run or time.strftime("%Y%m%dT%H%M%S")
+        self.spans = []
+
+    def table(self):
+        """Spans in start order, nested ones indented under their parent."""
+        if not self.spans:
+            return pd.DataFrame()
+        df = pd.DataFrame(sorted(self.spans, key=lambda s: s["start"]))
+        df["stage"] = ["  " * d + "↳ " * (d > 0) + s for s, d in zip(df["stage"], df["depth"])]
+        cols = ["stage", "wall_s", "cpu_s", "rss_delta_mb", "peak_rss_mb", "alloc_peak_mb", "rows", "dims"]
+        internal = {"depth", "parent", "start", "run", "error"}
+        extra = [c for c in df.columns if c not in cols and c not in internal]
+        for col in ["rows", "dims", "edges", "input_rows"]:
+            if col in df.columns:
+                df[col] = df[col].astype("Int64")
+        return df[[c for c in cols if c in df.columns] + extra]
+
+    def totals(self):
+        """Wall seconds per top-level span."""
+        return {s["stage"]: s["wall_s"] for s in self.spans if s["depth"] == 0}
+
+
+def start_recording(run=None):
+    """Collect every span opened from here on (in this thread / context) into a new Recorder."""
+    recorder = Recorder(run)
+    _active.set(recorder)
+    return recorder
+
+
+@contextlib.contextmanager
+def recording(run=None):
+    """`start_recording` for the duration of a block."""
+    recorder = Recorder(run)
+    token = _active.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _active.reset(token)
+
+
+@contextlib.contextmanager
+def span(stage, **fields):
+    """
+    Time a pipeline stage or inner step: wall and CPU time, RSS change,
+    process peak RSS and (with SDA_TRACEMALLOC=1) the peak of Python/numpy
+    allocations inside the block. Yields the record so the block can add
+    counts, e.g. `s["rows"] = len(df)`.
+    """
+    stack = _stack.get()
+    record = {"stage": stage, "depth": len(stack), "parent": stack[-1]["stage"] if stack else None, **fields}
+    token = _stack.set(stack + (record,))
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        if stack and "_child_peak" in stack[-1]:
+            stack[-1]["_child_peak"] = max(stack[-1]["_child_peak"], tracemalloc.get_traced_memory()[1])
+        alloc_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        record["_child_peak"] = 0
+    rss_start = _rss_mb()
+    record["start"] = time.time()
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    except BaseException as exc:
+        record["error"] = type(exc).__name__
+        raise
+    finally:
+        record["wall_s"] = round(time.perf_counter() - wall0, 4)
+        record["cpu_s"] = round(time.process_time() - cpu0, 4)
+        rss_end = _rss_mb()
+        if rss_start is not None and rss_end is not None:
+            record["rss_delta_mb"] = round(rss_end - rss_start, 1)
+        peak_rss = _peak_rss_mb()
+        if peak_rss is not None:
+            record["peak_rss_mb"] = round(peak_rss, 1)
+        if tracing and tracemalloc.is_tracing():
+            # reset_peak is global: fold nested spans' peaks back into the parent
+            peak = max(tracemalloc.get_traced_memory()[1], record.pop("_child_peak"))
+            record["alloc_peak_mb"] = round((peak - alloc_start) / 1e6, 1)
+            if stack and "_child_peak" in stack[-1]:
+                stack[-1]["_child_peak"] = max(stack[-1]["_child_peak"], peak)
+        record.pop("_child_peak", None)
+        _stack.reset(token)
+
+        recorder = _active.get()
+        if recorder is not None:
+            record["run"] = recorder.run
+            recorder.spans.append(record)
+        _emit({"ts": record["start"], "pid": os.getpid(), **record})
+
+
+def annotate(**counts):
+    """Add numbers to the innermost open span (summed if the key exists), e.g. time in a hot loop."""
+    stack = _stack.get()
+    if stack:
+        for key, value in counts.items():
+            stack[-1][key] = round(stack[-1].get(key, 0) + value, 4)
+
+
+def _shape(out):
+    """rows / dims of a stage result: the first PageDataset, DataFrame or sparse matrix in it."""
+    for obj in out if isinstance(out, tuple) else (out,):
+        if hasattr(obj, "embeddings"):
+            return {"rows": len(obj), "dims": obj.dim}
+        if isinstance(obj, pd.DataFrame):
+            return {"rows": len(obj)}
+        if hasattr(obj, "nnz"):
+            return {"rows": obj.shape[0], "edges": int(obj.nnz)}
+    return {}
+
+
+def instrumented(stage):
+    """Decorator: run the function inside `span(stage)` and record the result's rows / dims."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(stage) as record:
+                out = fn(*args, **kwargs)
+                record.update(_shape(out))
+            return out
+        return inner
+    return wrap
+
+
+def start_profile():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profile(profiler, path=None, top=25):
+    """
+    Stop a `start_profile` capture. Writes the .prof file to `path` (for
+    snakeviz / pstats) if given and returns the top `top` functions by
+    cumulative time as text.
+    """
+    profiler.disable()
+    if path:
+        profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+    return out.getvalue()
+
+
+@contextlib.contextmanager
+def profiled(path=None, top=25):
+    """cProfile the block; the yielded dict gets 'stats' (see `stop_profile`) on exit."""
+    result = {"path": path}
+    profiler = start_profile()
+    try:
+        yield result
+    finally:
+        result["stats"] = stop_profile(profiler, path, top)
@@ -1,5 +1,13 @@
-import streamlit as st
 import time
 
+# Where log lines go; the Streamlit app routes them to st.text
+_sink = print
+
+
+def set_log_sink(fn):
+    global _sink
+    _sink = fn
+
+
 def log(msg):
-    st.text(f"[{time.strftime('%H:%M:%S')}] {msg}")
\ No newline at end of file
+    _sink(f"[{time.strftime('%H:%M:%S')}] {msg}")
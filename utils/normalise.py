@@ -1,6 +1,117 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
 def normalise_url(url: str):
     if not isinstance(url, str): return url
     url = url.strip().lower()
     if url.endswith('/'): url = url[:-1]
     if '?' in url: url = url.split('?')[0]
-    return url
\ No newline at end of file
+    return url
+
+URL_DTYPE = "string[pyarrow]"
+
+# Canonicalisation rules → bit in the per-URL rule mask. The first five are
+# applied by the loaders; www/protocol folding only when building join keys.
+URL_RULES = {
+    "whitespace": 1,
+    "case": 2,
+    "fragment": 4,
+    "query": 8,
+    "trailing slash": 16,
+    "www": 32,
+    "protocol": 64,
+}
+
+
+def canonicalise_urls(urls, lowercase_path=True, drop_query=True, fold_www=False, fold_protocol=False):
+    """
+    Vectorised URL canonicalisation.
+
+    Trims whitespace, lowercases the scheme and host (the whole URL when
+    `lowercase_path`), drops the #fragment and (if `drop_query`) the
+    ?query, removes one trailing slash, and optionally folds `www.` hosts
+    and http:// onto https://. Each distinct URL is processed once, with
+    Arrow string kernels.
+
+    Returns (canonical string Series aligned with `urls`, uint8 mask of the
+    URL_RULES that changed each URL).
+    """
+    urls = pd.Series(urls)
+    codes, uniques = pd.factorize(urls)
+    a = pa.array(np.asarray(uniques, dtype=object), type=pa.string(), from_pandas=True)
+    mask = np.zeros(len(a), dtype=np.uint8)
+
+    def apply(rule, new):
+        nonlocal a
+        changed = pc.fill_null(pc.not_equal(new, a), False)
+        mask[changed.to_numpy(zero_copy_only=False)] |= URL_RULES[rule]
+        a = new
+
+    def before(sep):
+        return pc.list_element(pc.split_pattern(a, sep, max_splits=1), 0)
+
+    apply("whitespace", pc.utf8_trim_whitespace(a))
+    if lowercase_path:
+        apply("case", pc.utf8_lower(a))
+    else:
+        parts = pc.extract_regex(a, r"^(?P<origin>[^/?#]*//[^/?#]*)(?P<rest>.*)$")
+        origin = pc.utf8_lower(pc.struct_field(parts, "origin"))
+        joined = pc.binary_join_element_wise(origin, pc.struct_field(parts, "rest"), "")
+        apply("case", pc.coalesce(joined, a))
+    apply("fragment", before("#"))
+    if drop_query:
+        apply("query", before("?"))
+    apply("trailing slash", pc.if_else(pc.ends_with(a, "/"), pc.utf8_slice_codeunits(a, 0, -1), a))
+    if fold_www:
+        apply("www", pc.replace_substring_regex(a, r"^(https?://)www\.", r"\1"))
+    if fold_protocol:
+        apply("protocol", pc.replace_substring_regex(a, r"^http://", "https://"))
+
+    # factorize gives NaN code -1 → the appended null / 0 slot
+    codes = np.where(codes < 0, len(a), codes)
+    canonical = pc.take(pa.concat_arrays([a, pa.nulls(1, pa.string())]), codes)
+    series = pd.Series(pd.arrays.ArrowStringArray(canonical), index=urls.index)
+    return series, np.append(mask, 0)[codes]
+
+
+def normalise_url_series(urls):
+    """Vectorised canonical form of a whole pandas Series (see `canonicalise_urls`)."""
+    return canonicalise_urls(urls)[0]
+
+
+def describe_rules(mask):
+    """Rule names set in a URL_RULES bit mask, e.g. 'case + trailing slash' ('exact' when none)."""
+    names = [name for name, bit in URL_RULES.items() if mask & bit]
+    return " + ".join(names) if names else "exact"
+
+
+class UrlTable:
+    """
+    Interned canonical URLs: each distinct URL gets one integer id, so
+    joins between exports become integer lookups instead of string merges.
+    """
+
+    def __init__(self):
+        self.index = pd.Index([], dtype=URL_DTYPE)
+
+    def __len__(self):
+        return len(self.index)
+
+    def intern(self, urls):
+        """Integer ids for `urls` (canonical strings), adding unseen ones; NA → -1."""
+        return self.intern_many(urls)[0]
+
+    def intern_many(self, *url_columns):
+        """`intern` for several columns in one hashing pass; returns one id array per column."""
+        columns = [pd.Series(urls).astype(URL_DTYPE) for urls in url_columns]
+        # factorize numbers values by first appearance, so existing URLs keep their ids
+        known = len(self.index)
+        codes, uniques = pd.factorize(pd.concat([pd.Series(self.index, dtype=URL_DTYPE), *columns], ignore_index=True))
+        self.index = pd.Index(uniques, dtype=URL_DTYPE)
+        bounds = known + np.cumsum([0] + [len(c) for c in columns])
+        return [codes[start:end].astype(np.int64) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def lookup(self, ids):
+        return self.index.to_numpy()[ids]
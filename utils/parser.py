@@ -1,5 +1,9 @@
 import ast
+import warnings
 import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
 def parse_embedding(val):
     """
@@ -31,3 +35,143 @@ def parse_embedding(val):
 
     # Fallback → empty vector
     return np.array([], dtype=np.float64)
+
+
+def parse_embedding_matrix(values, dim=None, dtype=np.float32):
+    """
+    Parse a whole column of embedding text into one C-contiguous matrix.
+
+    Accepts JSON-style ("[0.1, 0.2]") and pipe-delimited ("0.1|0.2") rows;
+    list/ndarray cells are passed through. All rows must share one
+    dimension — `dim` if given, otherwise the most common row length.
+
+    Returns (matrix, row_ids, bad_rows):
+      matrix   — (n_valid × dim) array of `dtype`
+      row_ids  — index label of the source row for each matrix row
+      bad_rows — {index label: reason} for every row that was dropped
+    """
+    s = pd.Series(values, copy=False)
+    labels = s.index.to_numpy()
+    bad_rows = {}
+
+    # --- 1. Normalise both text formats to bare comma-separated numbers ---
+    is_str = s.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    is_seq = s.map(lambda v: isinstance(v, (list, tuple, np.ndarray))).to_numpy(dtype=bool)
+
+    text = pd.Series("", index=s.index, dtype=object)
+    text[is_str] = s[is_str].str.strip()
+    bracketed = text.str.startswith("[") & text.str.endswith("]")
+    piped = ~bracketed & text.str.contains("|", regex=False)
+    text[bracketed] = text[bracketed].str[1:-1]
+    text[piped] = text[piped].str.replace("|", ",", regex=False)
+    text = text.str.strip(" ,\t")
+
+    # List-like cells are rare; render them through the same text path
+    if is_seq.any():
+        text[is_seq] = s[is_seq].map(
+            lambda v: ",".join(map(repr, np.asarray(v, dtype=np.float64).ravel().tolist()))
+        )
+
+    recognised = (is_str & (bracketed | piped).to_numpy()) | is_seq
+    recognised &= (text != "").to_numpy()
+
+    for label in labels[~recognised]:
+        bad_rows[label] = "empty or unrecognised embedding format"
+
+    # --- 2. Dimension check from separator counts (no float parsing yet) ---
+    dims = np.where(recognised, text.str.count(",").to_numpy() + 1, 0)
+    if dim is None:
+        if not recognised.any():
+            raise ValueError("No parseable embeddings found in column.")
+        dim = int(np.bincount(dims[recognised]).argmax())
+
+    mismatched = recognised & (dims != dim)
+    for label, d in zip(labels[mismatched], dims[mismatched]):
+        bad_rows[label] = f"dimension {d} != {dim}"
+
+    good = recognised & ~mismatched
+
+    # --- 3. One bulk parse for every candidate row ---
+    flat = _parse_joined(text[good].tolist(), dtype)
+    if flat is None or flat.size != good.sum() * dim:
+        # Somewhere a token isn't a number — locate the offending rows
+        for pos in np.flatnonzero(good):
+            if _parse_joined([text.iat[pos]], dtype) is None:
+                bad_rows[labels[pos]] = "non-numeric value"
+                good[pos] = False
+        flat = _parse_joined(text[good].tolist(), dtype)
+        if flat is None:
+            flat = np.empty(0, dtype=dtype)
+
+    matrix = flat.reshape(-1, dim)
+
+    # --- 4. np.fromstring reads "nan" / "inf" (and float32 overflow) as floats ---
+    finite = np.isfinite(matrix).all(axis=1)
+    if not finite.all():
+        dropped = np.flatnonzero(good)[~finite]
+        for label in labels[dropped]:
+            bad_rows[label] = "non-finite value"
+        good[dropped] = False
+        matrix = matrix[finite]
+
+    return np.ascontiguousarray(matrix), labels[good], bad_rows
+
+
+def _parse_joined(rows, dtype):
+    """Parse comma-separated rows in a single np.fromstring call; None on failure."""
+    if not rows:
+        return np.empty(0, dtype=dtype)
+    with warnings.catch_warnings():
+        # NumPy < 2 only warns on trailing garbage — treat it as an error
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(",".join(rows), dtype=dtype, sep=",")
+        except (ValueError, DeprecationWarning):
+            return None
+
+
+def is_arrow_embedding(arrow_type):
+    """True for the list-of-floats column types `arrow_embedding_blocks` reads directly."""
+    list_types = (pa.types.is_fixed_size_list, pa.types.is_list, pa.types.is_large_list)
+    return any(t(arrow_type) for t in list_types) and pa.types.is_floating(arrow_type.value_type)
+
+
+def arrow_embedding_block(array, dim=None, dtype=np.float32):
+    """
+    (block, ok) for an Arrow list-of-floats embedding array (one record
+    batch's column).
+
+    `block` is the array's float buffer reshaped to (rows × dim) — a view
+    on the Arrow memory, no per-row copy (one bulk cast if the floats
+    aren't `dtype`). `ok` flags rows that are usable: not null, no null,
+    NaN or inf values and, for variable-length lists, `dim` long (default:
+    the most common length). Rows that aren't ok hold arbitrary values.
+    """
+    n = len(array)
+    ok = array.is_valid().to_numpy(zero_copy_only=False)
+    if pa.types.is_fixed_size_list(array.type):
+        dim = array.type.list_size
+        # Null rows still occupy their `dim` slots, so the buffer is one regular block
+        values = array.values.slice(array.offset * dim, n * dim)
+    else:
+        lengths = pc.fill_null(pc.list_value_length(array), -1).to_numpy()
+        if dim is None:
+            dim = int(np.bincount(lengths[lengths > 0]).argmax()) if (lengths > 0).any() else 0
+        ok &= lengths == dim
+        if not ok.all():
+            # Null or ragged rows: copy the good rows into place
+            block = np.zeros((n, dim), dtype=dtype)
+            good = array.filter(pa.array(ok)).flatten().to_numpy(zero_copy_only=False)
+            block[ok] = good.reshape(-1, dim)
+            return block, ok & _finite_rows(block)
+        values = array.values.slice(int(array.offsets[0].as_py()), n * dim)
+    block = values.to_numpy(zero_copy_only=False).reshape(n, dim)
+    if block.dtype != dtype:
+        block = block.astype(dtype)
+    # Null values read as NaN; NaN / inf may also be stored as such (or overflow the cast)
+    return block, ok & _finite_rows(block)
+
+
+def _finite_rows(block):
+    """Rows with no NaN / inf: a NaN or inf anywhere makes the row sum non-finite (no n × dim mask)."""
+    return np.isfinite(block.sum(axis=1, dtype=np.float64))